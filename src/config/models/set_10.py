@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import ClassVar, List, Optional, Literal
 
 # Protocolo de validación
 class CriterioValidacion(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("parametro",)
     parametro: Literal[
         "Linealidad", "Exactitud del método (Recuperación)", "Precisión del sistema",
         "Precisión del método (´Repetibilidad)", "Precisión intermedia",
@@ -14,6 +15,7 @@ class CriterioValidacion(BaseModel):
 
 # Variables auxiliares
 class DataInyeccion(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("No", "peak_name")
     No: int = Field(..., description="Número consecutivo que identifica el pico en la data cromatográfica recuperada de la inyección.")
     peak_name: str = Field(..., description="Nombre del pico en la data cromatográfica recuperada de la inyección. Usualmente corresponde al analito de estudio")
     analito: str = Field(..., description="Nombre del analito asociado al pico. Usualmente corresponde al nombre del pico")
@@ -27,6 +29,7 @@ class DataInyeccion(BaseModel):
     amount: Optional[float] = Field(None, description="Cantidad del pico en la data cromatográfica recuperada de la inyección. Usualmente se acompaña de unidades tales como mg/mL, entre otras")
 
 class DataChromaEstFM(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre_muestra", "no_inyeccion")
     nombre_muestra: str = Field(..., description="Nombre de la muestra que se analiza en la inyeccion. Puede empezar con 'SST', 'Fase Movil', 'Solucion Estandar', entre otros")
     referencia_analitica: str = Field(..., description = "Referencia analitica de la muestra. Usualmente empieza como HT")
     dilution_factor: float = Field(..., description="Factor de dilución de la muestra. Usualmente es un número que aparece al lado del strin 'Dilution Factor', o similar")
@@ -38,6 +41,7 @@ class DataChromaEstFM(BaseModel):
     )
 
 class ExtraccionDaExtraccionArchivoDataTiempo(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre_archivo",)
     nombre_archivo: Optional[str] = Field(
         None, description= "Nombre del archivo de donde se hará la extracción de datos.. Se puede inferir el tiempo de allí, por eso es importante que lo extraigas"
     )
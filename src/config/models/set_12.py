@@ -1,13 +1,15 @@
 from pydantic import BaseModel, Field
-from typing import List, Literal
+from typing import ClassVar, List, Literal
 
 ## Modelos de extraccion de datos
 
 class DatoReplicas(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("replica",)
     replica: int = Field(..., description="Réplica del dato de robustez, se reporta para cada experimento analítico como Solucion Muestra Flujo Nominal 1, ... Solucion Muestra Flujo Nominal 3 para el experimento nominal, Solucion Muestra Flujo Bajo 1... Solucion Muestra Flujo Bajo 3, solucion muestra flujo alto 1... solucion muestra flujo alto 3, asi respectivamente para todos los demas experimentos.")
     valor: float = Field(..., description="Valor del dato de robustez, se reporta para cada réplica del experimento analítico como porcentaje en la columna de cada experimento por ejemplo Robustness Flow, Robustness Temperature, Robustness Inyection volume, Robustness Mobile phase")
 
 class DataRobustez(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre_analito", "variable_entrada")
     nombre_analito: str = Field(..., description="Nombre del ingrediente activo, impureza, o producto de degradación")
     variable_entrada: str = Field(..., description="Variable a evaluar durante la prueba de validación de robustez.. Se encuentra en las tablas de datos cerca de la clave 'Robustness'")
     promedio_nominal: float = Field(..., description="Promedio de los valores evaluados en la condición nominal de la variable de entrada. Se encuentra cerca de las claves 'Promedio' y 'nominal'")
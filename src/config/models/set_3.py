@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
+from typing import ClassVar, List, Literal, Optional
 from src.config.models.set_1 import criterios
 
 # Variables auxiliares
@@ -10,12 +10,14 @@ class LinealidadSistema(BaseModel):
     factor_respuesta: float = Field(..., description= "Factor de respuesta por cada réplica")
 
 class LinealidadSistemaExtraccion(LinealidadSistema):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nivel", "concentracion")
     nivel: str = Field(..., description = "Nivel de concentración de la muestra usada para la validación de linealidad. Se reporta de esta manera (Pueden haber más valores, no necesariamente son estos): Solucion Linealidad Nivel 1 R1, Solucion Linealidad Nivel 2 R2, Solucion Linealidad Nivel 3 R3, Solucion Linealidad Nivel 2 R1, Solucion Linealidad Nivel 2 R2, Solucion Linealidad Nivel 2 R3....")
     concentracion: float = Field(..., description = "Concentración de la muestra en mg/mL. Se reporta en la columna de Concentration")
     area_pico: float = Field(..., description = "Área del pico reportada por cada réplica. Se reporta en la columna de Response")
     factor_respuesta: float = Field(..., description= "Factor de respuesta por cada réplica. Se reporta en la columna de Response factor")
 
 class ParametroLinealidadExtraccion(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
     nombre: Optional[str] = Field(..., description="Nombre del ingrediente activo con la data de validación de linealidad")
     linealidad_sistema: Optional[List[LinealidadSistemaExtraccion]] = Field(None, description="Datos de linealidad del sistema")
     rsd_factor: Optional[float] = Field(..., description="RSD de los Factores de Respuesta (Reportado como RSD Response Factor)")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from datetime import date
 from src.config.models.set_1 import criterios
 
@@ -26,6 +26,7 @@ class DatosExactitudStrExt(BaseModel):
 
 
 class ActivoExactitudStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
     nombre: str = Field(..., description="Nombre del ingrediente activo.. El analito...")
     exactitud_metodo: List[DatosExactitudStrExt] = Field(..., description="Datos de exactitud del sistema")
 
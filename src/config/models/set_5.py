@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 
 # Variables auxiliares
 
@@ -15,10 +15,12 @@ class ActivoPrecisionSistemaStrOutput(BaseModel):
     rsd_precision_sistema: float = Field(..., description="RSD de los valores obtenidos de las repliccas evaluadas en el parametro de precision del sistema")
     
 class DatosPrecisionSistemaStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("replica",)
     replica: int = Field(..., description="replica de la solucion evaluada en el parametro de precision del sistema. Se encuentra en la columna N del reporte.. es un valor entero")
     area_activo: float = Field(..., description="Se encuentra en la columna 'Values' de la tabla.")
 
 class ActivoPrecisionsistemaStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
     nombre: str = Field(..., description="Nombre del ingrediente activo")
     precision_sistema: List[DatosPrecisionSistemaStrExt] = Field(..., description="Datos de los valores obtenidos de las replicas evaluadas en el parametro de precision del sistema")
     rsd_precision_sistema: float = Field(..., description="RSD de los valores obtenidos de las replicas evaluadas en el parametro de precision del sistema. Usualmente esta en la columna values y esta en unidades de %")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from datetime import date
 from src.config.models.set_1 import criterios
 
@@ -18,11 +18,13 @@ class ActivoPrecisionMetodoStrOutput(BaseModel):
     criterio_precision_metodo: str = Field(..., description="Criterios de aceptacion para precision del metodo")
 
 class DatosPrecisionMetodoStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("replica",)
     replica: str = Field(..., description="replica de la solucion evaluada en el parametro de precision del metodo")
     porcentaje_activo: float = Field(..., description="Results de % de recuperación")
 
 
 class ActivoPrecisionMetodoStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
     nombre: str = Field(..., description="Nombre del ingrediente activo")
     precision_metodo: List[DatosPrecisionMetodoStrExt] = Field(..., description="Datos de los porcentajes obtenidos de las replicas evaluadas en el parametro de precision del metodo")
     rsd_precision_metodo: float = Field(..., description="RSD de los porcentajes obtenidos de las replicas evaluadas en el parametro de precision del metodo")
@@ -1,14 +1,16 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import ClassVar, List
 
 # Variables auxiliares
 
 class DatosPrecisionIntermediaStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("replica",)
     replica: str = Field(..., description="replica de la solucion evaluada en el parametro de precision del metodo.")
     porcentaje_an1: float = Field(..., description="Porcentaje obtenido del activo para A1D1E1")
     porcentaje_an2: float = Field(..., description="Porcentaje obtenido del activo para A2D1E1")
     
 class ActivoPrecisionIntermediaStrExt(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
     nombre: str = Field(..., description="Nombre del ingrediente activo")
     precision_intermedia: List[DatosPrecisionIntermediaStrExt] = Field(..., description="Datos de los porcentajes obtenidos de las replicas evaluadas en el parametro de precision del metodo")
     rsd_analista: float = Field(..., description="RSD de los porcentajes obtenidos del activo evaluado realizado por el analista")
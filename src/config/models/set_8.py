@@ -1,21 +1,24 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import ClassVar, List
 from datetime import date
 from typing import Literal
 
 # Protocolo de validación
 class CriterioValidacion(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("parametro",)
     parametro: Literal["Linealidad", "Exactitud del método (Recuperación)", "Precisión del sistema", "Precisión del método (´Repetibilidad)", "Precisión intermedia", "Precisión del método (Reproducibilidad)", "Rango (Intervalo)", "Robustez del método", "Estabilidad analítica de las soluciones", "Estabilidad analítica de la fase móvil"] = Field(..., description="Nombre del parametro de validación")
     criterio_aceptacion: str = Field(..., description="Descripción de texto del criterio de aceptación del parámetro en el protocolo de validación")
 
 # Variables auxiliares
 
 class DataReplicaEstabilidadSoluciones(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("replica",)
     replica: int = Field(..., description="Réplica del dato de estabilidad de las soluciones, es un entero que inicia en 1 hacia adelante, se encuentra reportado como Solucion Muestra o Estandar R1, Solucion Muestra o Estandar R2, Solucion Muestra o Estandar R3 para cada condicion 1 y 2 y cada tiempo de estabilidad")
     area: float = Field(..., description="Área bajo la curva del pico asociado al dato de validación de la estabilidad de las soluciones, reportados en las columnas de los difrentes tiempos de estabilidad Initial Sample Stability, Sample Stability Time 1... como Results asociados con cada Solucion Muestra o Estandar R1 .. de cada condicion 1 y 2")
 
 class DataEstabilidadSoluciones(BaseModel):
     """Modelo de validación de datos de la estabilidad de las soluciones"""
+    merge_keys: ClassVar[tuple[str, ...]] = ("analito", "condicion_estabilidad", "tiempo_estabilidad")
     analito: str = Field(..., description="Nombre del analito que puede ser un ingrediente activo farmacéutico, una impureza, un producto de degradación, en general un analito de estudio de la validación")
     condicion_estabilidad: str = Field(..., description="Condición de almacenamiento de las soluciones para validación de su estabilidad, reportada para cada tiempo de estabilidad como Tiempo inicial, Condicion 1, Condición 2, Condicion 3, etc.")
     tiempo_estabilidad: str = Field(..., description="Tiempo de estabilidad de las soluciones, reportado como (Initial Sample Stability) para tiempo 0, Sample Stability Time 1 para el primer tiempo y Sample Stability Time n para los demás tiempos del reporte LIMS para estabilidad")
@@ -25,6 +28,7 @@ class DataEstabilidadSoluciones(BaseModel):
     referencia_analitica: str = Field(..., description="Lista de referencias analíticas de la solucion")
 
 class EstabilidadSoluciones(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("solucion",)
     solucion: str = Field(..., description="Nombre de la solucion que puede ser Solucion Estandar o Solucion Muestra acompañado del nombre del analito")
     tipo_solucion: Literal["Solucion_Estandar", "Solucion_Muestra"] = Field(..., description="Tipo de solucion que puede ser Solucion Estandar o Solucion Muestra")
     data_estabilidad_solucion: List[DataEstabilidadSoluciones]= Field(..., description="Listado de diccionarios que contiene toda la información relacionada con la validación de la estabilidad de la solucion identificada.",)
@@ -102,6 +102,8 @@ TEMPLATE_SETS = {
             #"dirs_bitacoras_precision_sistema",
             #"dirs_soportes_cromatograficos_precision_sistema",
         ],
+        # Palabras clave para preseleccionar paginas antes del OCR
+        "page_keywords": ["precision del sistema", "system precision"],
         "data_extraction_model": Set5ExtractionModel,
         "structured_output_supervisor": Set5StructuredOutputSupervisor,
         "tags": ["activos_precision_sistema", "refencia_precision_sistema"],
@@ -115,6 +117,8 @@ TEMPLATE_SETS = {
             #"dirs_bitacoras_precision_metodo",
             #"dirs_soportes_cromatograficos_precision_metodo",
         ],
+        # Palabras clave para preseleccionar paginas antes del OCR
+        "page_keywords": ["precision del metodo", "method precision", "repetibilidad", "repeatability"],
         "data_extraction_model": Set6ExtractionModel,
         "structured_output_supervisor": Set6StructuredOutputSupervisor,
         "tags": ["activos_precision_metodo", "refencia_precision_metodo"],
@@ -128,6 +132,8 @@ TEMPLATE_SETS = {
             #"dirs_bitacoras_precision_intermedia",
             #"dirs_soportes_cromatograficos_precision_intermedia",
         ],
+        # Palabras clave para preseleccionar paginas antes del OCR
+        "page_keywords": ["precision intermedia", "intermediate precision"],
         "data_extraction_model": Set7ExtractionModel,
         "structured_output_supervisor": Set7StructuredOutputSupervisor,
         "tags": ["activos_precision_intermedia", "refencia_precision_intermedia"],
@@ -180,6 +186,8 @@ TEMPLATE_SETS = {
             #"dirs_bitacoras_robustez",
             #"dirs_soportes_cromatograficos_robustez",
         ],
+        # Palabras clave para preseleccionar paginas antes del OCR
+        "page_keywords": ["robustez", "robustness"],
         "data_extraction_model": Set12ExtractionModel,
         "structured_output_supervisor": Set12StructuredOutputSupervisor,
         "tags": ["activos_robustez", "refencia_robustez"],
@@ -0,0 +1,357 @@
+"""Estimacion en seco de un dossier: plan OCR, bytes y tiempo sin llamar a Mistral.
+
+Uso::
+
+    python -m src.graph.dry_run estado.json [--json]
+
+``estado.json`` es el mismo estado de entrada de ``valida_graph``. Nada se
+descarga ni se recomprime: los PDFs locales, inline o ya presentes en el
+espejo de SharePoint se leen tal cual; del resto solo se piden metadatos y
+las paginas se estiman por tamano (``DRY_RUN_BYTES_PER_PAGE``). El plan no
+aplica la capa de texto ni la seleccion de paginas, asi que es un techo.
+No requiere ``MISTRAL_API_KEY``: la cache OCR y el registro de chunks solo se
+leen si ya existen.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import sys
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from pydantic import BaseModel, Field
+
+from src.graph.nodes.agent_ui import AgentUI, _descriptor_fingerprint
+from src.graph.nodes.index_node import IndexNode
+from src.graph.state import FileDescriptor
+from src.utils.document_packing import plan_packs
+from src.utils.ocr_cache import OCRResultCache, schema_fingerprint
+from src.utils.ocr_planner import build_ocr_plan, shared_consumers
+from src.utils.pdf_pipeline import PdfDocument, format_page_label
+
+
+logger = logging.getLogger(__name__)
+
+# Peso tipico de una pagina escaneada, para estimar paginas sin descargar el PDF
+BYTES_PER_PAGE = int(os.getenv("DRY_RUN_BYTES_PER_PAGE", "150000"))
+
+
+class SetEstimate(BaseModel):
+    """Plan OCR estimado de un set."""
+
+    set_name: str
+    documents: int = 0
+    pages: int = 0
+    ocr_requests: int = 0
+    cached_requests: int = 0
+    annotation_calls: int = 0
+    upload_bytes: int = 0
+    unreadable: list[str] = Field(default_factory=list)
+    estimated: list[str] = Field(default_factory=list)
+
+
+class DryRunReport(BaseModel):
+    """Resumen del dossier para programar la corrida y dimensionar limites."""
+
+    sets: list[SetEstimate]
+    unique_documents: int = 0
+    shared_documents: int = 0
+    total_pages: int = 0
+    ocr_requests: int = 0
+    cached_requests: int = 0
+    upload_bytes: int = 0
+    reasoning_calls: int = 0
+    concurrency: float = 1.0
+    latency_samples: int = 0
+    page_latency_p50_ms: Optional[float] = None
+    page_latency_p95_ms: Optional[float] = None
+    wall_seconds_p50: Optional[float] = None
+    wall_seconds_p95: Optional[float] = None
+
+
+def _base64_size(size: int) -> int:
+    return math.ceil(size / 3) * 4
+
+
+def _percentile(values: list[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def _document_key(descriptor: FileDescriptor) -> str:
+    return _descriptor_fingerprint(descriptor) or f"name:{descriptor.name}"
+
+
+def _open_without_download(
+    node: IndexNode, descriptor: FileDescriptor
+) -> tuple[Optional[PdfDocument], int]:
+    """(documento legible sin descargarlo, tamano en bytes); ``None`` si no hay copia local."""
+    if descriptor.content_base64:
+        data = base64.b64decode(descriptor.content_base64, validate=True)
+        return PdfDocument(data, name=descriptor.name), len(data)
+
+    if descriptor.source and descriptor.source.lower() == "sharepoint":
+        try:
+            client = node._get_sharepoint_client()
+            reference = node._build_sharepoint_download_reference(descriptor, client)
+            metadata = client.get_item_metadata(reference) or {}
+        except Exception as exc:
+            logger.warning("Sin metadatos de SharePoint para %s: %s", descriptor.name, exc)
+            return None, descriptor.size
+        size = int(metadata.get("size") or descriptor.size)
+        path = node.sharepoint_mirror.lookup(metadata) if node.sharepoint_mirror else None
+        if path is None:
+            return None, size
+        return PdfDocument.from_path(path, descriptor.name), size
+
+    if descriptor.url and urlparse(descriptor.url).scheme not in {"http", "https"}:
+        return PdfDocument.from_path(descriptor.url, descriptor.name), os.path.getsize(
+            descriptor.url
+        )
+    return None, descriptor.size
+
+
+async def _probe_document(node: IndexNode, descriptor: FileDescriptor) -> dict[str, Any]:
+    """Paginas, peso y chunks del documento tal como los veria ``IndexNode``.
+
+    Sin copia local las paginas se estiman por tamano y no hay huella, asi que
+    esos chunks no se buscan en la cache.
+    """
+    document, size = await asyncio.to_thread(_open_without_download, node, descriptor)
+    if document is None or node._is_image_descriptor(descriptor):
+        if document is not None:
+            await asyncio.to_thread(document.close)
+        if size <= 0:
+            raise ValueError("tamano desconocido")
+        # Cada imagen se convierte en un PDF de una pagina
+        pages = 1 if node._is_image_descriptor(descriptor) else math.ceil(size / BYTES_PER_PAGE)
+        groups = node._chunk_page_groups(list(range(pages)))
+        return {
+            "pages": pages,
+            "size": size,
+            "digest": None,
+            "estimated": not node._is_image_descriptor(descriptor),
+            "groups": groups,
+            "group_bytes": [size * len(group) // pages for group in groups],
+        }
+    try:
+        pages = await asyncio.to_thread(lambda: document.page_count)
+        groups = await node._plan_page_groups(document, list(range(pages))) if pages else [[]]
+        digest = await asyncio.to_thread(document.digest)
+    finally:
+        await asyncio.to_thread(document.close)
+    return {
+        "pages": pages,
+        "size": size,
+        "digest": digest,
+        "estimated": False,
+        "groups": groups,
+        "group_bytes": [size * len(group) // pages if pages else size for group in groups],
+    }
+
+
+async def estimate_dossier(
+    state: Any, node: Optional[IndexNode] = None, agent_ui: Optional[AgentUI] = None
+) -> DryRunReport:
+    """Resuelve los descriptores como ``AgentUI`` y planea el OCR de cada set."""
+    node = node or IndexNode(planning_only=True)
+    agent_ui = agent_ui or AgentUI()
+    documents_by_set = {
+        set_name: agent_ui.build_documents(state, set_name)
+        for set_name in agent_ui.template_sets.keys()
+    }
+    plan = build_ocr_plan(documents_by_set, _descriptor_fingerprint)
+
+    unique: dict[str, FileDescriptor] = {}
+    for documents in documents_by_set.values():
+        for descriptor in documents:
+            unique.setdefault(_document_key(descriptor), descriptor)
+
+    semaphore = asyncio.Semaphore(node.document_concurrency)
+
+    async def _probe(key: str, descriptor: FileDescriptor):
+        async with semaphore:
+            try:
+                return key, await _probe_document(node, descriptor)
+            except Exception as exc:
+                logger.warning("No se pudo leer %s: %s", descriptor.name, exc)
+                return key, None
+
+    probes = dict(await asyncio.gather(*(_probe(k, d) for k, d in unique.items())))
+
+    estimates: list[SetEstimate] = []
+    request_pages: list[int] = []
+    shared_done: set[str] = set()
+    for set_name, documents in documents_by_set.items():
+        model = agent_ui.template_sets[set_name].get("data_extraction_model")
+        schema_digest = schema_fingerprint(model)
+        estimate = SetEstimate(set_name=set_name, documents=len(documents))
+        readable = []
+        for descriptor in documents:
+            probe = probes.get(_document_key(descriptor))
+            if probe is None:
+                estimate.unreadable.append(descriptor.name)
+                continue
+            estimate.pages += probe["pages"]
+            if probe["estimated"]:
+                estimate.estimated.append(descriptor.name)
+            readable.append((descriptor, probe))
+
+        packed: set[int] = set()
+        if node._packing_enabled(model):
+            small = [
+                ((descriptor, probe), probe["pages"], probe["size"])
+                for descriptor, probe in readable
+                if node._is_pack_candidate(descriptor, model)
+                and 0 < probe["pages"] <= node.pack_max_document_pages
+            ]
+            for pack in plan_packs(small, node.max_pages_per_chunk, node.max_chunk_bytes):
+                if len(pack) < 2:
+                    continue
+                estimate.ocr_requests += 1
+                estimate.upload_bytes += _base64_size(sum(p["size"] for _, p in pack))
+                request_pages.append(sum(p["pages"] for _, p in pack))
+                packed.update(id(descriptor) for descriptor, _ in pack)
+
+        for descriptor, probe in readable:
+            if id(descriptor) in packed:
+                continue
+            key = _document_key(descriptor)
+            missing = []
+            for group, size in zip(probe["groups"], probe["group_bytes"]):
+                if node.ocr_cache is not None and probe["digest"]:
+                    cache_key = OCRResultCache.build_key(
+                        probe["digest"],
+                        schema_digest,
+                        format_page_label(group),
+                        node._result_model_id(),
+                    )
+                    if node.ocr_cache.get(cache_key) is not None:
+                        estimate.cached_requests += 1
+                        continue
+                if node.shared_ocr:
+                    # Modo compartido: OCR una vez por documento, anotacion por set
+                    estimate.annotation_calls += 1
+                    if key in shared_done:
+                        continue
+                missing.append((group, size))
+            # Modo upload (fuera del compartido): el PDF se sube una vez y los chunks
+            # lo referencian por file id, sin reenviar sus bytes
+            uploaded = (
+                node.upload_mode
+                and not node.shared_ocr
+                and probe["pages"] > 0
+                and len(missing) >= node.upload_min_chunks
+            )
+            if uploaded:
+                estimate.upload_bytes += probe["size"]
+            for group, size in missing:
+                estimate.ocr_requests += 1
+                if not uploaded:
+                    estimate.upload_bytes += _base64_size(size)
+                request_pages.append(len(group) or probe["pages"] or 1)
+            shared_done.add(key)
+        estimates.append(estimate)
+
+    history = node.chunk_ledger.latency_history() if node.chunk_ledger is not None else []
+    per_page = [latency / pages for latency, pages in history]
+    concurrency = max(1.0, node.governor.limit)
+
+    def _wall_seconds(page_ms: Optional[float]) -> Optional[float]:
+        if page_ms is None:
+            return None
+        if not request_pages:
+            return 0.0
+        busy = sum(request_pages) * page_ms / 1000
+        rate = node.governor.rate_per_second
+        return round(
+            max(
+                busy / concurrency,
+                len(request_pages) / rate if rate > 0 else 0.0,
+                max(request_pages) * page_ms / 1000,
+            ),
+            1,
+        )
+
+    p50 = _percentile(per_page, 50)
+    p95 = _percentile(per_page, 95)
+    return DryRunReport(
+        sets=estimates,
+        unique_documents=len(plan),
+        shared_documents=len(shared_consumers(plan)),
+        total_pages=sum(probe["pages"] for probe in probes.values() if probe),
+        ocr_requests=sum(e.ocr_requests for e in estimates),
+        cached_requests=sum(e.cached_requests for e in estimates),
+        upload_bytes=sum(e.upload_bytes for e in estimates),
+        # Una ejecucion del agente de razonamiento por set con supervisor de salida
+        reasoning_calls=sum(
+            1
+            for config in agent_ui.template_sets.values()
+            if config.get("structured_output_supervisor")
+        ),
+        concurrency=round(concurrency, 2),
+        latency_samples=len(per_page),
+        page_latency_p50_ms=round(p50, 1) if p50 is not None else None,
+        page_latency_p95_ms=round(p95, 1) if p95 is not None else None,
+        wall_seconds_p50=_wall_seconds(p50),
+        wall_seconds_p95=_wall_seconds(p95),
+    )
+
+
+def format_report(report: DryRunReport) -> str:
+    lines = [
+        f"{'Set':<28}{'Docs':>6}{'Pags':>7}{'OCR':>6}{'Cache':>7}{'Anot':>6}{'MB':>9}",
+    ]
+    for estimate in report.sets:
+        lines.append(
+            f"{estimate.set_name:<28}{estimate.documents:>6}{estimate.pages:>7}"
+            f"{estimate.ocr_requests:>6}{estimate.cached_requests:>7}"
+            f"{estimate.annotation_calls:>6}{estimate.upload_bytes / 2**20:>9.2f}"
+        )
+        if estimate.unreadable:
+            lines.append(f"  sin leer: {', '.join(estimate.unreadable)}")
+        if estimate.estimated:
+            lines.append(f"  paginas estimadas por tamano: {', '.join(estimate.estimated)}")
+    lines += [
+        "",
+        f"Documentos unicos: {report.unique_documents} ({report.shared_documents} compartidos)",
+        f"Paginas: {report.total_pages}",
+        f"Solicitudes OCR: {report.ocr_requests} ({report.cached_requests} en cache)",
+        f"Carga a enviar: {report.upload_bytes / 2**20:.2f} MB",
+        f"Agentes de razonamiento: {report.reasoning_calls}",
+    ]
+    if report.wall_seconds_p50 is None:
+        lines.append("Tiempo estimado: sin historico de latencias en el registro de chunks")
+    else:
+        lines.append(
+            f"Tiempo OCR estimado: p50 {report.wall_seconds_p50:.0f} s, "
+            f"p95 {report.wall_seconds_p95:.0f} s "
+            f"(concurrencia {report.concurrency:g}, {report.latency_samples} muestras, "
+            f"{report.page_latency_p50_ms:.0f} ms/pagina p50)"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("state", help="JSON con el estado de entrada de valida_graph")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(args.state, "r", encoding="utf-8") as fh:
+        state = json.load(fh)
+    report = asyncio.run(estimate_dossier(state))
+    print(report.model_dump_json(indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ import binascii
 import hashlib
 import logging
 import os
+import uuid
 from typing import Any, Iterable, Literal
 from collections.abc import Mapping
 from langsmith import traceable
@@ -20,6 +21,7 @@ from src.graph.state import (
     DocumentName,
 )
 from src.prompts.prompts_agent_ui import HUMAN_MESSAGE_PROMPT
+from src.utils.ocr_planner import build_ocr_plan, shared_consumers
 
 logger = logging.getLogger(__name__)
 
@@ -450,9 +452,13 @@ class AgentUI:
 
         unique: list[FileDescriptor] = []
         seen: set[tuple[str, str]] = set()
+        # El DocumentName viaja en el descriptor para elegir el perfil de preprocesado
+        document_name = _coerce_name(mapping[1]) if mapping else None
 
         for descriptor in descriptors:
             copy = descriptor.model_copy()
+            if document_name and not getattr(copy, "document_name", None):
+                copy.document_name = document_name
             fingerprint = _descriptor_fingerprint(copy) or f"name:{copy.name}"
             dedup_key = (fingerprint, copy.name)
             if dedup_key in seen:
@@ -488,6 +494,22 @@ class AgentUI:
         self, state: ValidaState, config: RunnableConfig
     ) -> Command[Literal["index_node"]]:
 
+        documents_by_set = {
+            set_name: self.build_documents(state, set_name)
+            for set_name in self.template_sets.keys()
+        }
+        # Plan por documento unico: los sets que comparten un archivo lo descargan una vez
+        plan = build_ocr_plan(documents_by_set, _descriptor_fingerprint)
+        document_consumers = shared_consumers(plan)
+        logger.info(
+            "Plan OCR: %d referencias, %d documentos unicos, %d compartidos entre sets",
+            sum(len(documents) for documents in documents_by_set.values()),
+            len(plan),
+            len(document_consumers),
+        )
+        # Id de corrida: el trabajo OCR compartido entre sets no sobrevive a esta corrida
+        ocr_run_id = uuid.uuid4().hex
+
         return Command(
             update={
                 "messages": [
@@ -501,11 +523,17 @@ class AgentUI:
                     "index_node",
                     {
                         "set_name": set_name,
-                        "documents": self.build_documents(state, set_name),
+                        "documents": documents_by_set[set_name],
                         "data_extraction_model": self.template_sets[set_name][
                             "data_extraction_model"
                         ],
                         "tags": self.template_sets[set_name]["tags"],
+                        "page_keywords": self.template_sets[set_name].get(
+                            "page_keywords", []
+                        ),
+                        "document_consumers": document_consumers,
+                        "ocr_run_id": ocr_run_id,
+                        "ocr_run_branches": len(self.template_sets),
                     },
                 )
                 for set_name in self.template_sets.keys()
@@ -7,8 +7,9 @@ import os
 import json
 import logging
 import tempfile
+import time
 import asyncio
-import requests
+import httpx
 from urllib.parse import urlparse
 
 from dotenv import load_dotenv
@@ -16,17 +17,64 @@ load_dotenv()
 
 from src.graph.state import IndexNodeOutput, FileDescriptor
 from src.utils.sharepoint_api import SharePointClient
+from src.utils.sharepoint_mirror import DEFAULT_MIRROR_DIR, SharePointMirror
+from src.utils.ocr_cache import (
+    DEFAULT_CACHE_DIR,
+    OCRResultCache,
+    hash_bytes,
+    schema_fingerprint,
+)
+from src.utils.pdf_pipeline import (
+    PdfChunk,
+    PdfDocument,
+    format_page_label,
+    get_split_pool,
+    image_to_pdf,
+    is_image_payload,
+    merge_documents,
+)
+from src.utils.document_packing import (
+    build_packed_model,
+    plan_packs,
+    split_packed_annotation,
+)
+from src.utils.text_layer import (
+    LOCAL_EXTRACTORS,
+    extract_from_text_layer,
+    extract_page_texts,
+)
+from src.utils.page_selector import (
+    DEFAULT_MEMORY_PATH,
+    PageRangeMemory,
+    score_pages,
+    select_relevant_pages,
+)
+from src.utils.rate_governor import (
+    RETRYABLE_STATUS,
+    OCRRateGovernor,
+    describe_failure,
+    get_ocr_governor,
+    is_transient,
+)
+from src.utils.request_hedging import get_hedge_policy
+from src.utils.pdf_compression import compress_pdf, load_profiles
+from src.utils.ocr_planner import SharedOCRWork, get_shared_ocr_runs
+from src.utils.chunk_ledger import DEFAULT_LEDGER_PATH, ChunkLedger
+from src.utils.chunk_consolidation import ChunkConsolidator
+from src.utils.schema_merge import SchemaMerger
+from src.graph.nodes.agent_ui import _descriptor_fingerprint
+from src.prompts.prompts_index_node import SHARED_ANNOTATION_PROMPT
 
 from langsmith import traceable
 from mistralai.extra import response_format_from_pydantic_model
 from mistralai import Mistral
 import base64
-from PyPDF2 import PdfReader, PdfWriter
 
 
 class NodeOutput(BaseModel):
     set_name: str
     extracted_content: List[IndexNodeOutput]
+    stats: dict[str, int] = {}
 
 
 class IndexNodeState(AgentStateWithStructuredResponse):
@@ -35,6 +83,10 @@ class IndexNodeState(AgentStateWithStructuredResponse):
     data_extraction_model: type[BaseModel]
     extracted_content: list[NodeOutput]
     doc_path_list: list[str] | None = None
+    page_keywords: list[str] | None = None
+    document_consumers: dict[str, int] | None = None
+    ocr_run_id: str | None = None
+    ocr_run_branches: int | None = None
 
 
 
@@ -96,16 +148,126 @@ def _coerce_to_descriptor(value: Any) -> FileDescriptor | None:
     return None
 
 
+# Limite de Mistral para solicitudes con document_annotation_format
+MAX_ANNOTATION_PAGES = 8
+
 
 class IndexNode:
-    def __init__(self):
+    def __init__(self, planning_only: bool = False):
+        """``planning_only`` arma solo los limites de planeacion (dry run): sin
+        cliente Mistral y con la cache y el registro abiertos en modo lectura."""
         self.logger = logging.getLogger(__name__)
-        self.max_pages_per_chunk = 8  # Mistral OCR limit
-        api_key = os.getenv("MISTRAL_API_KEY")
-        if not api_key:
-            raise EnvironmentError("Defina MISTRAL_API_KEY en el entorno")
-        self.client = Mistral(api_key=api_key, timeout_ms=300000)
+        # Techos por chunk: paginas (documentos livianos) y bytes estimados (escaneos pesados)
+        self.max_pages_per_chunk = min(
+            MAX_ANNOTATION_PAGES,
+            max(1, int(os.getenv("OCR_MAX_PAGES_PER_CHUNK", str(MAX_ANNOTATION_PAGES)))),
+        )
+        self.max_chunk_bytes = int(float(os.getenv("OCR_MAX_CHUNK_MB", "4")) * 1024 * 1024)
+        self.ocr_model = "mistral-ocr-latest"
+        self.chunk_concurrency = max(1, int(os.getenv("OCR_CHUNK_CONCURRENCY", "4")))
+        self.document_concurrency = max(
+            1, int(os.getenv("OCR_DOCUMENT_CONCURRENCY", "4"))
+        )
+        self.ocr_max_retries = max(0, int(os.getenv("OCR_MAX_RETRIES", "3")))
+        # Paginas a partir de las cuales la division se hace en un pool de procesos
+        self.split_process_min_pages = int(os.getenv("PDF_SPLIT_PROCESS_MIN_PAGES", "300"))
+        self.governor = get_ocr_governor()
+        # Subidas y anotaciones por chat no consumen la cuota del endpoint OCR
+        self.files_governor = get_ocr_governor("files")
+        self.chat_governor = get_ocr_governor("chat")
+        # Duplicacion de llamadas OCR lentas (OCR_HEDGE_*), compartida por el proceso
+        self.hedge_policy = get_hedge_policy()
+        self.text_layer_enabled = os.getenv(
+            "TEXT_LAYER_FAST_PATH", "true"
+        ).strip().lower() not in {"0", "false", "no"}
+        self.text_layer_min_chars = int(os.getenv("TEXT_LAYER_MIN_CHARS", "200"))
+        # "upload": sube cada documento una vez y pide rangos de paginas por file id
+        self.upload_mode = os.getenv("OCR_DOCUMENT_MODE", "inline").strip().lower() == "upload"
+        self.upload_min_chunks = max(1, int(os.getenv("OCR_UPLOAD_MIN_CHUNKS", "2")))
+        self.page_selection_enabled = os.getenv(
+            "PAGE_SELECTION_ENABLED", "true"
+        ).strip().lower() not in {"0", "false", "no"}
+        self.page_selection_context = int(os.getenv("PAGE_SELECTION_CONTEXT", "1"))
+        self.page_memory = PageRangeMemory(
+            os.getenv("PAGE_RANGE_MEMORY_PATH") or DEFAULT_MEMORY_PATH
+        )
+        # "shared": OCR una vez por pagina unica y anotacion de cada set sobre el markdown
+        self.shared_ocr = os.getenv("OCR_PLANNER_MODE", "per_set").strip().lower() == "shared"
+        self.annotation_model = os.getenv("OCR_ANNOTATION_MODEL", "mistral-small-latest")
+        self.shared_runs = get_shared_ocr_runs()
+        # Documentos pequenos (p. ej. soportes cromatograficos) comparten chunk OCR
+        self.pack_small_documents = os.getenv(
+            "OCR_PACK_SMALL_DOCUMENTS", "true"
+        ).strip().lower() not in {"0", "false", "no"}
+        self.pack_max_document_pages = int(os.getenv("OCR_PACK_MAX_DOCUMENT_PAGES", "4"))
+        self.pack_max_document_bytes = int(
+            float(os.getenv("OCR_PACK_MAX_DOCUMENT_MB", "5")) * 1024 * 1024
+        )
+        # Recompresion de imagenes de pagina antes del OCR, con perfil por DocumentName
+        self.compression_enabled = os.getenv(
+            "OCR_COMPRESSION_ENABLED", "false"
+        ).strip().lower() in {"1", "true", "yes"}
+        self.compression_min_bytes = int(
+            float(os.getenv("OCR_COMPRESSION_MIN_MB", "1")) * 1024 * 1024
+        )
+        self.compression_profiles = load_profiles(os.getenv("OCR_COMPRESSION_PROFILES"))
+        self.client: Optional[Mistral] = None
+        if not planning_only:
+            api_key = os.getenv("MISTRAL_API_KEY")
+            if not api_key:
+                raise EnvironmentError("Defina MISTRAL_API_KEY en el entorno")
+            self.client = Mistral(api_key=api_key, timeout_ms=300000)
         self._sharepoint_client: Optional[SharePointClient] = None
+        self.sharepoint_mirror = self._build_sharepoint_mirror()
+        self.ocr_cache = self._build_ocr_cache(read_only=planning_only)
+        self.chunk_ledger = self._build_chunk_ledger(read_only=planning_only)
+        # Rondas extra, con espera creciente, para los chunks que fallan en la corrida
+        self.chunk_retry_rounds = max(0, int(os.getenv("OCR_CHUNK_RETRY_ROUNDS", "2")))
+
+    def _build_ocr_cache(self, read_only: bool = False) -> Optional[OCRResultCache]:
+        if os.getenv("OCR_CACHE_ENABLED", "true").strip().lower() in {"0", "false", "no"}:
+            return None
+        cache_dir = os.getenv("OCR_CACHE_DIR") or DEFAULT_CACHE_DIR
+        if read_only and not os.path.isdir(cache_dir):
+            return None
+        try:
+            return OCRResultCache(
+                cache_dir=cache_dir,
+                max_bytes=int(float(os.getenv("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024),
+                max_age_seconds=float(os.getenv("OCR_CACHE_MAX_AGE_DAYS", "30")) * 86400,
+                read_only=read_only,
+            )
+        except Exception as exc:
+            self.logger.warning("Cache OCR deshabilitada: %s", exc)
+            return None
+
+    def _build_sharepoint_mirror(self) -> Optional[SharePointMirror]:
+        if os.getenv("SHAREPOINT_MIRROR_ENABLED", "true").strip().lower() in {"0", "false", "no"}:
+            return None
+        try:
+            return SharePointMirror(
+                mirror_dir=os.getenv("SHAREPOINT_MIRROR_DIR") or DEFAULT_MIRROR_DIR,
+                max_bytes=int(float(os.getenv("SHAREPOINT_MIRROR_MAX_MB", "2048")) * 1024 * 1024),
+            )
+        except Exception as exc:
+            self.logger.warning("Espejo local de SharePoint deshabilitado: %s", exc)
+            return None
+
+    def _build_chunk_ledger(self, read_only: bool = False) -> Optional[ChunkLedger]:
+        if os.getenv("OCR_LEDGER_ENABLED", "true").strip().lower() in {"0", "false", "no"}:
+            return None
+        path = os.getenv("OCR_LEDGER_PATH") or DEFAULT_LEDGER_PATH
+        if read_only and not os.path.exists(path):
+            return None
+        try:
+            return ChunkLedger(
+                path=path,
+                max_age_seconds=float(os.getenv("OCR_LEDGER_MAX_AGE_DAYS", "30")) * 86400,
+                read_only=read_only,
+            )
+        except Exception as exc:
+            self.logger.warning("Registro de chunks deshabilitado: %s", exc)
+            return None
 
     def _infer_sharepoint_host(self, descriptor: FileDescriptor) -> Optional[str]:
         for candidate in (descriptor.site_lookup, descriptor.site_url, descriptor.url):
@@ -174,126 +336,664 @@ class IndexNode:
             f"No se pudo determinar la ruta SharePoint para {descriptor.name}"
         )
 
+    def _chunk_page_groups(
+        self, pages: list[int], page_sizes: Optional[list[int]] = None
+    ) -> list[list[int]]:
+        """Agrupa los indices de pagina (base 0) que se envian en cada chunk.
+
+        Con ``page_sizes`` un chunk se cierra al llegar a ``max_pages_per_chunk``
+        paginas o al superar ``max_chunk_bytes``; una pagina mas pesada que el
+        techo viaja sola.
+        """
+        if not page_sizes or not self.max_chunk_bytes:
+            return [
+                pages[start:start + self.max_pages_per_chunk]
+                for start in range(0, len(pages), self.max_pages_per_chunk)
+            ]
+
+        groups: list[list[int]] = []
+        current: list[int] = []
+        current_bytes = 0
+        for page in pages:
+            size = page_sizes[page] if page < len(page_sizes) else 0
+            if current and (
+                len(current) >= self.max_pages_per_chunk
+                or current_bytes + size > self.max_chunk_bytes
+            ):
+                groups.append(current)
+                current, current_bytes = [], 0
+            current.append(page)
+            current_bytes += size
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _plan_page_groups(
+        self, document: PdfDocument, pages: list[int]
+    ) -> list[list[int]]:
+        """Chunks por peso de pagina solo si el PDF completo supera el techo de bytes."""
+        page_sizes = None
+        if self.max_chunk_bytes and len(pages) > 1 and document.size > self.max_chunk_bytes:
+            try:
+                page_sizes = await asyncio.to_thread(document.page_byte_sizes)
+            except Exception as exc:
+                self.logger.warning(
+                    "No se pudo estimar el peso de paginas de %s: %s", document.name, exc
+                )
+        return self._chunk_page_groups(pages, page_sizes)
+
     @traceable
-    def get_pdf_page_count(self, pdf_path: str) -> int:
-        """Get the number of pages in a PDF."""
+    def split_pdf_into_chunks(
+        self, document: PdfDocument, page_groups: list[list[int]]
+    ) -> list[PdfChunk]:
+        """Split the PDF into in-memory chunks using the already opened reader."""
         try:
-            with open(pdf_path, "rb") as pdf_file:
-                reader = PdfReader(pdf_file)
-                return len(reader.pages)
+            pool = None
+            if (
+                self.split_process_min_pages
+                and document.page_count >= self.split_process_min_pages
+                and len(page_groups) > 1
+            ):
+                pool = get_split_pool()
+            return document.build_chunks(page_groups, process_pool=pool)
         except Exception as e:
-            self.logger.error(f"Error counting pages in {pdf_path}: {e}")
-            return 0
+            self.logger.error(f"Error splitting PDF {document.name}: {e}")
+            return []
 
     @traceable
-    def split_pdf_into_chunks(self, pdf_path: str) -> list[str]:
-        """Split PDF into chunks of max_pages and return temporary file paths."""
-        temp_files = []
-        try:
-            with open(pdf_path, "rb") as pdf_file:
-                reader = PdfReader(pdf_file)
-                total_pages = len(reader.pages)
-
-                for start_page in range(0, total_pages, self.max_pages_per_chunk):
-                    end_page = min(start_page + self.max_pages_per_chunk, total_pages)
-
-                    writer = PdfWriter()
-                    for page_num in range(start_page, end_page):
-                        writer.add_page(reader.pages[page_num])
+    async def process_chunk(
+        self,
+        chunk: PdfChunk,
+        extraction_model: type[BaseModel],
+        report: Optional[dict[str, Any]] = None,
+    ):
+        """Process a single PDF chunk with Mistral OCR.
 
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-                    with open(temp_file.name, "wb") as output_file:
-                        writer.write(output_file)
+        ``report`` recibe ``seconds`` (latencia de la llamada al SDK) y, si el
+        chunk falla, ``transient``: si vale la pena reintentarlo mas tarde.
+        """
+        label = f"paginas {chunk.page_label}"
+        try:
+            if chunk.document_url:
+                # Documento ya subido: solo se indican las paginas del rango
+                request_params = {
+                    "model": self.ocr_model,
+                    "document": {
+                        "type": "document_url",
+                        "document_url": chunk.document_url,
+                    },
+                    "pages": list(chunk.pages),
+                    "include_image_base64": False,
+                }
+            else:
+                # Codificar varios MB en base64 bloquearia el event loop
+                base64_pdf = await asyncio.to_thread(chunk.to_base64)
+                if not base64_pdf:
+                    return None
+
+                request_params = {
+                    "model": self.ocr_model,
+                    "document": {
+                        "type": "document_url",
+                        "document_url": f"data:application/pdf;base64,{base64_pdf}",
+                    },
+                    "include_image_base64": False,
+                }
 
-                    temp_files.append(temp_file.name)
-                    self.logger.info(
-                        f"Created chunk {len(temp_files)}: pages {start_page+1}-{end_page}"
+            if extraction_model:
+                try:
+                    request_params["document_annotation_format"] = (
+                        response_format_from_pydantic_model(extraction_model)
+                    )
+                except Exception as exc:
+                    self.logger.warning(
+                        "No se pudo generar schema pydantic para %s: %s", label, exc
                     )
 
+            return await self._call_ocr(request_params, label, len(chunk.pages), report)
         except Exception as e:
-            self.logger.error(f"Error splitting PDF {pdf_path}: {e}")
-            for temp_file in temp_files:
-                try:
-                    os.unlink(temp_file)
-                except Exception:
-                    pass
-            return []
+            self.logger.error(f"Error processing chunk {label}: {e}")
+            if report is not None:
+                report["transient"] = is_transient(e)
+            return None
+        finally:
+            chunk.release()
 
-        return temp_files
+    async def _call_ocr(
+        self,
+        request_params: dict,
+        label: str,
+        pages: int = 1,
+        timing: Optional[dict[str, float]] = None,
+    ):
+        return await self._call_mistral(
+            self.client.ocr.process_async, request_params, label, pages, timing
+        )
 
-    @traceable
-    def encode_pdf(self, pdf_path: str) -> str:
-        """Encode the pdf to base64."""
+    async def _call_mistral(
+        self,
+        call,
+        request_params: dict,
+        label: str,
+        hedge_units: Optional[float] = None,
+        timing: Optional[dict[str, float]] = None,
+        governor: Optional[OCRRateGovernor] = None,
+    ):
+        """Llama a Mistral bajo el gobernador compartido, reintentando 429/5xx.
+
+        ``governor`` es el del endpoint llamado (OCR por defecto). Con
+        ``hedge_units`` la llamada puede duplicarse si tarda; solo se mide
+        y duplica la llamada al SDK con el slot tomado, no la cola ni los
+        reintentos. ``timing["seconds"]`` recibe esa latencia.
+        """
+        governor = governor or self.governor
+        for attempt in range(self.ocr_max_retries + 1):
+            try:
+                async with governor.async_slot():
+                    started = time.monotonic()
+                    if hedge_units is None:
+                        response = await call(**request_params)
+                    else:
+                        response = await self.hedge_policy.run(
+                            lambda: call(**request_params),
+                            units=hedge_units,
+                            try_slot=governor.try_slot,
+                        )
+                    if timing is not None:
+                        timing["seconds"] = time.monotonic() - started
+                    return response
+            except Exception as exc:
+                status, retry_after = describe_failure(exc)
+                if status not in RETRYABLE_STATUS or attempt >= self.ocr_max_retries:
+                    raise
+                self.logger.warning(
+                    "Mistral %s respondio %s; reintento %d/%d",
+                    label,
+                    status,
+                    attempt + 1,
+                    self.ocr_max_retries,
+                )
+                # Con Retry-After el gobernador ya bloquea nuevas llamadas
+                if retry_after is None:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+
+    async def _upload_document(self, document: PdfDocument) -> Optional[tuple[str, str]]:
+        """Sube el PDF una vez al almacen de archivos de Mistral y devuelve (id, url firmada)."""
         try:
-            with open(pdf_path, "rb") as pdf_file:
-                return base64.b64encode(pdf_file.read()).decode("utf-8")
-        except Exception as e:
-            self.logger.error(f"Error encoding PDF {pdf_path}: {e}")
+            async with self.files_governor.async_slot():
+                uploaded = await self.client.files.upload_async(
+                    file={
+                        "file_name": document.name or "document.pdf",
+                        "content": bytes(document.data),
+                    },
+                    purpose="ocr",
+                )
+            async with self.files_governor.async_slot():
+                signed = await self.client.files.get_signed_url_async(
+                    file_id=uploaded.id
+                )
+            return uploaded.id, signed.url
+        except Exception as exc:
+            self.logger.warning(
+                "No se pudo subir %s; se usara envio inline: %s", document.name, exc
+            )
             return None
 
-    @traceable
-    def process_chunk(self, pdf_path: str, extraction_model: type[BaseModel]):
-        """Process a single PDF chunk with Mistral OCR."""
+    async def _delete_uploaded(self, file_id: str) -> None:
         try:
-            base64_pdf = self.encode_pdf(pdf_path)
-            if not base64_pdf:
-                return None
+            await self.client.files.delete_async(file_id=file_id)
+        except Exception as exc:
+            self.logger.warning("No se pudo eliminar el archivo OCR %s: %s", file_id, exc)
 
-            request_params = {
-                "model": "mistral-ocr-latest",
-                "document": {
-                    "type": "document_url",
-                    "document_url": f"data:application/pdf;base64,{base64_pdf}",
-                },
-                "include_image_base64": False,
+    async def _cached_process_chunk(
+        self,
+        chunk: PdfChunk,
+        extraction_model: type[BaseModel],
+        cache_key: Optional[str],
+        document_digest: Optional[str] = None,
+        report: Optional[dict[str, Any]] = None,
+    ):
+        """Consulta la cache OCR antes de enviar el chunk a Mistral.
+
+        Con ``document_digest`` el resultado (o el fallo) queda en el registro
+        de chunks para retomar el documento si la corrida no termina. Una
+        anotacion vacia es un resultado valido y tambien se guarda. Si la
+        respuesta sale de la cache, ``report["cached"]`` queda en ``True``.
+        """
+        report = {} if report is None else report
+        if self.ocr_cache is not None and cache_key:
+            cached = await asyncio.to_thread(self.ocr_cache.get, cache_key)
+            if cached is not None:
+                report["cached"] = True
+                return cached
+
+        page_label = chunk.page_label
+        page_count = len(chunk.pages)
+        # Solo la llamada al SDK: la cola del gobernador y los reintentos no son latencia OCR
+        result = await self.process_chunk(chunk, extraction_model, report)
+        latency_ms = report.get("seconds", 0.0) * 1000
+
+        annotation = getattr(result, "document_annotation", None) if result else None
+        cached = result is not None and self.ocr_cache is not None and bool(cache_key)
+        if cached:
+            await asyncio.to_thread(
+                self.ocr_cache.put, cache_key, {"document_annotation": annotation}
+            )
+
+        if self.chunk_ledger is not None and cache_key and document_digest:
+            schema_digest = schema_fingerprint(extraction_model)
+            if result is None:
+                await asyncio.to_thread(
+                    self.chunk_ledger.record_failure,
+                    cache_key,
+                    document_digest,
+                    page_label,
+                    schema_digest,
+                    page_count,
+                    report.get("transient", False),
+                )
+            else:
+                await asyncio.to_thread(
+                    self.chunk_ledger.record_success,
+                    cache_key,
+                    document_digest,
+                    page_label,
+                    schema_digest,
+                    page_count,
+                    latency_ms,
+                    # Con cache la respuesta ya vive alli; el registro no la duplica
+                    None if cached else {"document_annotation": annotation},
+                )
+        return result
+
+    def _result_model_id(self) -> str:
+        """Identifica en la cache como se produjo la anotacion."""
+        if self.shared_ocr:
+            return f"{self.ocr_model}+{self.annotation_model}"
+        return self.ocr_model
+
+    @staticmethod
+    def _response_markdown(response: Any, pages: tuple[int, ...]) -> dict[int, str]:
+        """Asocia el markdown de cada pagina de la respuesta a su indice en el documento."""
+        result_pages = sorted(
+            getattr(response, "pages", None) or [], key=lambda item: item.index
+        )
+        return {page: item.markdown or "" for page, item in zip(pages, result_pages)}
+
+    async def _ocr_markdown_pages(
+        self, document: PdfDocument, digest: str, pages: list[int]
+    ) -> dict[int, str]:
+        """OCR sin anotacion de las paginas pedidas, con cache por pagina."""
+        results: dict[int, str] = {}
+        keys: dict[int, str] = {}
+        if self.ocr_cache is not None:
+            keys = {
+                page: OCRResultCache.build_key(digest, "markdown", str(page + 1), self.ocr_model)
+                for page in pages
             }
+            cached = await asyncio.to_thread(
+                lambda: {page: self.ocr_cache.get(key) for page, key in keys.items()}
+            )
+            for page, entry in cached.items():
+                if entry and "markdown" in entry:
+                    results[page] = entry["markdown"]
+
+        missing = [page for page in pages if page not in results]
+        if not missing:
+            return results
+
+        page_groups = await self._plan_page_groups(document, missing)
+        chunks = await asyncio.to_thread(self.split_pdf_into_chunks, document, page_groups)
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def _run(chunk: PdfChunk):
+            chunk_pages = chunk.pages
+            async with semaphore:
+                return chunk_pages, await self.process_chunk(chunk, None)
+
+        fresh: dict[int, str] = {}
+        for chunk_pages, response in await asyncio.gather(*(_run(c) for c in chunks)):
+            if response is not None:
+                fresh.update(self._response_markdown(response, chunk_pages))
+        if keys and fresh:
+            await asyncio.to_thread(
+                lambda: [
+                    self.ocr_cache.put(keys[page], {"markdown": markdown})
+                    for page, markdown in fresh.items()
+                ]
+            )
+        results.update(fresh)
+        return results
 
-            if extraction_model:
+    async def _annotate_markdown(
+        self, markdown: str, extraction_model: type[BaseModel], label: str
+    ) -> Optional[str]:
+        """Aplica el schema del set sobre el markdown OCR con salida estructurada."""
+        if not extraction_model:
+            return None
+        try:
+            response = await self._call_mistral(
+                self.client.chat.complete_async,
+                {
+                    "model": self.annotation_model,
+                    "messages": [
+                        {"role": "system", "content": SHARED_ANNOTATION_PROMPT},
+                        {"role": "user", "content": markdown},
+                    ],
+                    "response_format": response_format_from_pydantic_model(
+                        extraction_model
+                    ),
+                    "temperature": 0,
+                },
+                label,
+                governor=self.chat_governor,
+            )
+            return response.choices[0].message.content
+        except Exception as exc:
+            self.logger.error(f"Error anotando {label}: {exc}")
+            return None
+
+    async def _shared_process_group(
+        self,
+        document: PdfDocument,
+        group: list[int],
+        extraction_model: type[BaseModel],
+        cache_key: Optional[str],
+        shared: SharedOCRWork,
+        report: Optional[dict[str, int]] = None,
+    ):
+        """Anota un grupo de paginas sobre el markdown OCR compartido entre sets.
+
+        ``report`` recibe las paginas OCR propias y las reutilizadas de otro set.
+        """
+        label = f"{document.name} paginas {format_page_label(group)}"
+        digest = await asyncio.to_thread(document.digest)
+        markdown = await shared.page_markdown(
+            digest,
+            group,
+            lambda pages: self._ocr_markdown_pages(document, digest, pages),
+            report,
+        )
+        text = "\n\n".join(
+            f"<!-- pagina {page + 1} -->\n{markdown[page]}"
+            for page in group
+            if markdown.get(page)
+        )
+        if not text.strip():
+            return None
+
+        annotation = await self._annotate_markdown(text, extraction_model, label)
+        if not annotation:
+            return None
+        result = {"document_annotation": annotation}
+        if self.ocr_cache is not None and cache_key:
+            await asyncio.to_thread(self.ocr_cache.put, cache_key, result)
+        return result
+
+    async def _load_shared_document(
+        self, descriptor: FileDescriptor, key: str, consumers: int, shared: SharedOCRWork
+    ) -> PdfDocument:
+        """Descarga una sola vez los documentos que varios sets comparten."""
+
+        async def _load():
+            document = await self._ensure_local_pdf(descriptor)
+            try:
+                payload = document.base64_payload
+                data = await asyncio.to_thread(bytes, document.data)
+                return data, payload
+            finally:
+                await asyncio.to_thread(document.close)
+
+        data, payload = await shared.fetch_document(key, consumers, _load)
+        return PdfDocument(
+            data, name=descriptor.name or "document.pdf", base64_payload=payload
+        )
+
+    @staticmethod
+    def _shared_reference(
+        descriptor: FileDescriptor, shared: Optional[SharedOCRWork]
+    ) -> tuple[Optional[str], int]:
+        """(huella, numero de sets) si el documento es compartido con otros sets."""
+        if shared is None or not shared.consumers:
+            return None, 0
+        shared_key = _descriptor_fingerprint(descriptor)
+        return shared_key, shared.consumers.get(shared_key, 0) if shared_key else 0
+
+    async def _open_document(
+        self, descriptor: FileDescriptor, shared: Optional[SharedOCRWork] = None
+    ) -> PdfDocument:
+        # Documentos compartidos con otros sets: una sola descarga para todos
+        shared_key, shared_count = self._shared_reference(descriptor, shared)
+        if shared_count > 1:
+            return await self._load_shared_document(
+                descriptor, shared_key, shared_count, shared
+            )
+        return await self._ensure_local_pdf(descriptor)
+
+    async def _close_document(
+        self,
+        descriptor: FileDescriptor,
+        document: PdfDocument,
+        shared: Optional[SharedOCRWork] = None,
+    ) -> None:
+        await asyncio.to_thread(document.close)
+        if shared is not None:
+            shared.release_document(*self._shared_reference(descriptor, shared))
+
+    def _packing_enabled(self, extraction_model: Optional[type[BaseModel]]) -> bool:
+        # El modo compartido trabaja por documento; sin modelo no hay anotacion que separar
+        return bool(extraction_model and not self.shared_ocr)
+
+    def _is_pack_candidate(
+        self, descriptor: FileDescriptor, extraction_model: Optional[type[BaseModel]]
+    ) -> bool:
+        """Imagenes siempre (un PDF de una pagina sin capa de texto); PDFs pequenos
+        solo con ``OCR_PACK_SMALL_DOCUMENTS`` y si la capa de texto no los lee."""
+        if self._is_image_descriptor(descriptor):
+            return True
+        return bool(
+            self.pack_small_documents
+            and not (self.text_layer_enabled and extraction_model in LOCAL_EXTRACTORS)
+            and 0 < descriptor.size <= self.pack_max_document_bytes
+        )
+
+    def _pack_candidates(
+        self, documents: list[FileDescriptor], extraction_model: Optional[type[BaseModel]]
+    ) -> list[int]:
+        return [
+            i
+            for i, descriptor in enumerate(documents)
+            if self._is_pack_candidate(descriptor, extraction_model)
+        ]
+
+    async def _pack_small_documents(
+        self,
+        documents: list[FileDescriptor],
+        slots: dict[int, asyncio.Future],
+        extraction_model: type[BaseModel],
+        stats: dict[str, int],
+        shared: Optional[SharedOCRWork] = None,
+    ) -> None:
+        """Empaqueta documentos pequenos en chunks OCR de hasta max_pages_per_chunk.
+
+        Cada candidato recibe en ``slots[i]`` una tupla (respuestas, documento)
+        apenas se conoce su destino: las respuestas si viajo en un paquete, o
+        el documento ya abierto (``None`` si no se pudo abrir) para la ruta
+        individual, asi no espera al OCR de paquetes ajenos. Si algo falla, los
+        documentos abiertos se cierran antes de propagar.
+        """
+        semaphore = asyncio.Semaphore(self.document_concurrency)
+        preloaded: dict[int, PdfDocument] = {}
+        page_counts: dict[int, int] = {}
+
+        def _resolve(i: int, responses: Optional[list] = None, document=None) -> None:
+            if not slots[i].done():
+                slots[i].set_result((responses, document))
+
+        async def _load(i: int):
+            async with semaphore:
                 try:
-                    request_params["document_annotation_format"] = (
-                        response_format_from_pydantic_model(extraction_model)
-                    )
+                    preloaded[i] = await self._open_document(documents[i], shared)
+                    page_counts[i] = await asyncio.to_thread(lambda: preloaded[i].page_count)
                 except Exception as exc:
+                    # Se reintenta por la ruta normal, que registra el error
                     self.logger.warning(
-                        "No se pudo generar schema pydantic para %s: %s", pdf_path, exc
+                        "No se pudo abrir %s para empaquetar: %s", documents[i].name, exc
                     )
 
-            return self.client.ocr.process(**request_params)
-        except Exception as e:
-            self.logger.error(f"Error processing chunk {pdf_path}: {e}")
+        chunk_semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def _run_pack(pack) -> bool:
+            report: dict[str, Any] = {}
+            try:
+                async with chunk_semaphore:
+                    results = await self._process_pack(pack, extraction_model, report)
+            except Exception as exc:
+                self.logger.error(f"Error empaquetando documentos: {exc}")
+                results = None
+            if results is None:
+                # Si el paquete falla cada documento sigue la ruta individual
+                for i, _, _ in pack:
+                    _resolve(i, document=preloaded.pop(i))
+                return False
+            counter = "pages_cached" if report.get("cached") else "pages_ocr"
+            for (i, _, pages), result in zip(pack, results):
+                stats["pages"] = stats.get("pages", 0) + pages
+                stats[counter] = stats.get(counter, 0) + pages
+                stats["documents_packed"] = stats.get("documents_packed", 0) + 1
+                await self._close_document(documents[i], preloaded.pop(i), shared)
+                _resolve(i, responses=[result] if result else [])
+            return True
+
+        try:
+            await asyncio.gather(*(_load(i) for i in slots))
+            small = [
+                ((i, preloaded[i], page_counts[i]), page_counts[i], preloaded[i].size)
+                for i in slots
+                if 0 < page_counts.get(i, 0) <= self.pack_max_document_pages
+            ]
+            packs = [
+                pack
+                for pack in plan_packs(small, self.max_pages_per_chunk, self.max_chunk_bytes)
+                if len(pack) > 1
+            ]
+            packed = {i for pack in packs for i, _, _ in pack}
+            for i in slots:
+                if i not in packed:
+                    _resolve(i, document=preloaded.pop(i, None))
+            if not packs:
+                return
+
+            outcomes = await asyncio.gather(*(_run_pack(pack) for pack in packs))
+            self.logger.info(
+                "%d documentos pequenos empaquetados en %d paquetes OCR",
+                sum(len(pack) for pack, ok in zip(packs, outcomes) if ok),
+                sum(outcomes),
+            )
+        except BaseException:
+            await self._close_preloaded(documents, preloaded, shared)
+            raise
+        finally:
+            # Lo que no se resolvio sigue la ruta individual
+            for i in slots:
+                _resolve(i)
+
+    async def _close_preloaded(
+        self,
+        documents: list[FileDescriptor],
+        preloaded: dict[int, PdfDocument],
+        shared: Optional[SharedOCRWork] = None,
+    ) -> None:
+        while preloaded:
+            i, document = preloaded.popitem()
+            try:
+                await self._close_document(documents[i], document, shared)
+            except Exception as exc:
+                self.logger.warning("No se pudo cerrar %s: %s", documents[i].name, exc)
+
+    async def _process_pack(
+        self,
+        pack: list[tuple[int, PdfDocument, int]],
+        extraction_model: type[BaseModel],
+        report: Optional[dict[str, Any]] = None,
+    ) -> Optional[list[Optional[dict]]]:
+        """Un solo OCR para varios documentos; la anotacion se separa por documento."""
+        sections: list[tuple[str, int, int]] = []
+        first_page = 1
+        for _, document, pages in pack:
+            sections.append((document.name, first_page, first_page + pages - 1))
+            first_page += pages
+        documents = [document for _, document, _ in pack]
+        try:
+            packed_model = build_packed_model(extraction_model, sections)
+            data = await asyncio.to_thread(
+                merge_documents, [document.reader for document in documents]
+            )
+        except Exception as exc:
+            self.logger.error(f"Error empaquetando documentos: {exc}")
+            return None
+
+        cache_key = None
+        if self.ocr_cache is not None:
+            digests = await asyncio.to_thread(
+                lambda: "|".join(document.digest() for document in documents)
+            )
+            cache_key = OCRResultCache.build_key(
+                hash_bytes(digests.encode("utf-8")),
+                schema_fingerprint(packed_model),
+                "pack",
+                self._result_model_id(),
+            )
+        chunk = PdfChunk(range(first_page - 1), data=data)
+        response = await self._cached_process_chunk(
+            chunk, packed_model, cache_key, report=report
+        )
+        if response is None:
             return None
+        return split_packed_annotation(response, len(pack))
 
     @traceable
-    def _resolve_pdf_path(self, pdf_path: str) -> tuple[str, list[str]]:
-        """Ensure a local copy of the PDF and list temp paths for cleanup."""
-        cleanup: list[str] = []
+    async def _resolve_pdf_path(self, pdf_path: str) -> PdfDocument:
+        """Open a local PDF (memory-mapped) or download a remote one into memory."""
         try:
             parsed = urlparse(str(pdf_path))
         except Exception:
             parsed = None
 
         if parsed and parsed.scheme in {"http", "https"}:
-            tmp_handle = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            tmp_path = tmp_handle.name
-            tmp_handle.close()
+            buffer = bytearray()
             try:
-                with requests.get(pdf_path, stream=True, timeout=(10, 120)) as response:
-                    response.raise_for_status()
-                    with open(tmp_path, "wb") as fh:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                fh.write(chunk)
-                cleanup.append(tmp_path)
-                return tmp_path, cleanup
+                timeout = httpx.Timeout(120.0, connect=10.0)
+                async with httpx.AsyncClient(
+                    timeout=timeout, follow_redirects=True
+                ) as http_client:
+                    async with http_client.stream("GET", pdf_path) as response:
+                        response.raise_for_status()
+                        async for chunk in response.aiter_bytes(65536):
+                            buffer.extend(chunk)
             except Exception as exc:
                 self.logger.error(f"No se pudo descargar PDF {pdf_path}: {exc}")
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
                 raise
+            name = os.path.basename(parsed.path) or "document.pdf"
+            return PdfDocument(bytes(buffer), name=name)
 
-        return pdf_path, cleanup
+        return await asyncio.to_thread(PdfDocument.from_path, pdf_path)
+
+    def _mirrored_sharepoint_document(
+        self, client: SharePointClient, reference: str, descriptor: FileDescriptor
+    ) -> Optional[PdfDocument]:
+        """Documento desde el espejo local; solo descarga si cambio el eTag/cTag."""
+        metadata = client.get_item_metadata(reference)
+        if not metadata or "file" not in metadata:
+            return None
+        path = self.sharepoint_mirror.fetch(
+            metadata,
+            lambda directory, name: client.download_file(reference, directory, name),
+        )
+        if path is None:
+            return None
+        # Sin cleanup: la copia pertenece al espejo y sirve a las siguientes corridas
+        return PdfDocument.from_path(path, descriptor.name)
 
     def _get_sharepoint_client(self) -> SharePointClient:
         if self._sharepoint_client is None:
@@ -315,106 +1015,472 @@ class IndexNode:
             )
         return self._sharepoint_client
 
-    def _ensure_local_pdf(self, descriptor: FileDescriptor) -> tuple[str, list[str]]:
-        cleanup: list[str] = []
+    @staticmethod
+    def _is_image_descriptor(descriptor: FileDescriptor) -> bool:
+        if (descriptor.content_type or "").lower() in {"image/png", "image/jpeg"}:
+            return True
+        extension = os.path.splitext(descriptor.name or "")[1].lower()
+        return extension in {".png", ".jpg", ".jpeg"}
+
+    async def _ensure_local_pdf(self, descriptor: FileDescriptor) -> PdfDocument:
+        """Documento listo para el OCR; las imagenes se convierten a PDF en memoria."""
+        document = await self._fetch_document(descriptor)
+        if is_image_payload(document.data):
+            # Fotos de bitacoras: un PDF de una pagina que luego se empaqueta con las demas
+            try:
+                data = await asyncio.to_thread(image_to_pdf, document.data)
+            finally:
+                await asyncio.to_thread(document.close)
+            name = os.path.splitext(document.name or "imagen")[0] + ".pdf"
+            document = PdfDocument(data, name=name)
+        if self.compression_enabled and document.size >= self.compression_min_bytes:
+            document = await self._compress_document(document, descriptor)
+        return document
+
+    async def _compress_document(
+        self, document: PdfDocument, descriptor: FileDescriptor
+    ) -> PdfDocument:
+        """Reduce las imagenes escaneadas segun el perfil del grupo del documento."""
+        group = getattr(descriptor, "document_name", None) or "*"
+        profile = self.compression_profiles.get(group, self.compression_profiles["*"])
+        try:
+            data = await asyncio.to_thread(compress_pdf, document.data, profile)
+        except Exception as exc:
+            self.logger.warning("No se pudo recomprimir %s: %s", document.name, exc)
+            return document
+        if data is None:
+            return document
+        self.logger.info(
+            "%s recomprimido (%s): %.2f MB -> %.2f MB",
+            document.name,
+            group,
+            document.size / (1024 * 1024),
+            len(data) / (1024 * 1024),
+        )
+        name = document.name
+        await asyncio.to_thread(document.close)
+        return PdfDocument(data, name=name)
 
+    async def _fetch_document(self, descriptor: FileDescriptor) -> PdfDocument:
         if descriptor.content_base64:
-            suffix = os.path.splitext(descriptor.name or "")[1] or ".pdf"
-            tmp_handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            tmp_handle.close()
             try:
                 decoded = base64.b64decode(descriptor.content_base64, validate=True)
             except Exception as exc:
-                try:
-                    os.unlink(tmp_handle.name)
-                except Exception:
-                    pass
                 raise ValueError(
                     f"Contenido base64 invalido para {descriptor.name}: {exc}"
                 ) from exc
-            with open(tmp_handle.name, "wb") as fh:
-                fh.write(decoded)
-            cleanup.append(tmp_handle.name)
-            return tmp_handle.name, cleanup
+            # Se conserva el payload original: los PDFs pequenos se reenvian tal cual
+            return PdfDocument(
+                decoded,
+                name=descriptor.name or "document.pdf",
+                base64_payload=descriptor.content_base64,
+            )
 
         if descriptor.source and descriptor.source.lower() == "sharepoint":
             client = self._get_sharepoint_client()
             reference = self._build_sharepoint_download_reference(descriptor, client)
+            if self.sharepoint_mirror is not None:
+                try:
+                    mirrored = await asyncio.to_thread(
+                        self._mirrored_sharepoint_document, client, reference, descriptor
+                    )
+                    if mirrored is not None:
+                        return mirrored
+                except Exception as exc:
+                    self.logger.warning(
+                        "Espejo local no disponible para %s, descarga directa: %s",
+                        descriptor.name,
+                        exc,
+                    )
             suffix = os.path.splitext(descriptor.name or "")[1] or ".pdf"
             tmp_handle = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
             tmp_handle.close()
             target_dir = os.path.dirname(tmp_handle.name)
             target_name = os.path.basename(tmp_handle.name)
             try:
-                client.download_file(reference, target_dir, target_name)
+                # SharePointClient es bloqueante: solo la descarga sale del event loop
+                await asyncio.to_thread(
+                    client.download_file, reference, target_dir, target_name
+                )
+                return await asyncio.to_thread(
+                    PdfDocument.from_path, tmp_handle.name, descriptor.name, True
+                )
             except Exception:
                 try:
                     os.unlink(tmp_handle.name)
                 except Exception:
                     pass
                 raise
-            cleanup.append(tmp_handle.name)
-            return tmp_handle.name, cleanup
 
         if descriptor.url:
-            return self._resolve_pdf_path(descriptor.url)
+            return await self._resolve_pdf_path(descriptor.url)
 
         raise ValueError("Descriptor sin ubicacion accesible")
 
-    def _process_document_sync(
-        self, descriptor: FileDescriptor, extraction_model: type[BaseModel]
-    ) -> list:
-        label = descriptor.url or descriptor.name or "<sin nombre>"
-
+    def _page_texts(self, document: PdfDocument) -> list[str]:
         try:
-            local_path, cleanup_paths = self._ensure_local_pdf(descriptor)
+            return extract_page_texts(document.reader)
         except Exception as exc:
-            self.logger.error(f"No se pudo preparar el PDF {label}: {exc}")
+            self.logger.warning(
+                "No se pudo leer la capa de texto de %s: %s", document.name, exc
+            )
             return []
 
-        results: list = []
-        chunk_files: list[str] = []
+    def _text_layer_pass(
+        self, page_texts: list[str], extraction_model: type[BaseModel], label: str
+    ) -> Optional[tuple[dict, list[int]]]:
+        """Extrae localmente las paginas digitales cuando el modelo lo permite."""
+        try:
+            return extract_from_text_layer(
+                page_texts, extraction_model, self.text_layer_min_chars
+            )
+        except Exception as exc:
+            self.logger.warning(
+                "Fallo la extraccion por capa de texto en %s: %s", label, exc
+            )
+            return None
+
+    @staticmethod
+    def _has_annotation_data(response: Any) -> bool:
+        """Indica si la respuesta de un chunk trae algun valor no vacio."""
+        annotation = getattr(response, "document_annotation", None)
+        if annotation is None and isinstance(response, dict):
+            annotation = response.get("document_annotation")
+        if isinstance(annotation, str):
+            try:
+                annotation = json.loads(annotation)
+            except json.JSONDecodeError:
+                return bool(annotation.strip())
+        if isinstance(annotation, dict):
+            return any(value not in (None, "", [], {}) for value in annotation.values())
+        return bool(annotation)
+
+    async def process_document(
+        self,
+        descriptor: FileDescriptor,
+        extraction_model: type[BaseModel],
+        stats: Optional[dict[str, int]] = None,
+        set_name: Optional[str] = None,
+        page_keywords: Optional[list[str]] = None,
+        shared: Optional[SharedOCRWork] = None,
+        document: Optional[PdfDocument] = None,
+        consolidator: Optional[ChunkConsolidator] = None,
+    ) -> list:
+        """OCR a document on the event loop; only CPU-bound PDF work uses threads.
+
+        Con ``consolidator`` cada anotacion se fusiona al llegar y el metodo
+        devuelve una lista vacia; sin el, devuelve las respuestas en orden de
+        paginas.
+        """
+        label = descriptor.url or descriptor.name or "<sin nombre>"
+        stats = stats if stats is not None else {}
+
+        if shared is None:
+            shared = SharedOCRWork()
+        if document is None:
+            try:
+                document = await self._open_document(descriptor, shared)
+            except Exception as exc:
+                shared.release_document(*self._shared_reference(descriptor, shared))
+                self.logger.error(f"No se pudo preparar el PDF {label}: {exc}")
+                return []
+
+        # (primera pagina, respuesta) para reensamblar en orden de paginas
+        partial: list[tuple[int, Any]] = []
+        uploaded_file_id: Optional[str] = None
+
+        # Por chunk: None mientras falta, luego si trajo datos; la respuesta no se retiene
+        outcome: list[Optional[bool]] = []
+
+        def _deliver(position: int, result: Any, index: Optional[int] = None) -> None:
+            if index is not None:
+                outcome[index] = bool(result) and self._has_annotation_data(result)
+            if consolidator is not None:
+                consolidator.add(position, result)
+            elif result:
+                partial.append((position, result))
 
         try:
-            total_pages = self.get_pdf_page_count(local_path)
+            total_pages = await asyncio.to_thread(lambda: document.page_count)
             self.logger.info(f"Processing PDF {label} with {total_pages} pages")
+            stats["pages"] = stats.get("pages", 0) + total_pages
 
-            if total_pages <= self.max_pages_per_chunk:
-                result = self.process_chunk(local_path, extraction_model)
-                if result:
-                    results.append(result)
-            else:
-                chunk_files = self.split_pdf_into_chunks(local_path)
-                for i, chunk_file in enumerate(chunk_files):
-                    self.logger.info(f"Processing chunk {i+1}/{len(chunk_files)}")
-                    result = self.process_chunk(chunk_file, extraction_model)
-                    if result:
-                        results.append(result)
-        finally:
-            for chunk_file in chunk_files:
-                try:
-                    os.unlink(chunk_file)
-                except Exception as e:
-                    self.logger.warning(
-                        f"Could not delete temporary file {chunk_file}: {e}"
+            ocr_pages = list(range(total_pages))
+            use_text_layer = bool(
+                self.text_layer_enabled
+                and total_pages
+                and extraction_model in LOCAL_EXTRACTORS
+            )
+            use_page_selection = bool(
+                self.page_selection_enabled and total_pages and page_keywords
+            )
+            page_texts: list[str] = []
+            if use_text_layer or use_page_selection:
+                page_texts = await asyncio.to_thread(self._page_texts, document)
+            if len(page_texts) != total_pages:
+                page_texts = [""] * total_pages
+
+            text_layer_result: Optional[tuple[int, dict]] = None
+            if use_text_layer:
+                fast = await asyncio.to_thread(
+                    self._text_layer_pass, page_texts, extraction_model, label
+                )
+                if fast:
+                    annotation, fast_pages = fast
+                    # Se entrega despues de registrar los chunks OCR, en orden de paginas
+                    text_layer_result = (fast_pages[0], {"document_annotation": annotation})
+                    covered = set(fast_pages)
+                    ocr_pages = [page for page in ocr_pages if page not in covered]
+                    stats["pages_text_layer"] = (
+                        stats.get("pages_text_layer", 0) + len(fast_pages)
+                    )
+                    self.logger.info(
+                        "%s: %d paginas por capa de texto, %d al OCR",
+                        label,
+                        len(fast_pages),
+                        len(ocr_pages),
                     )
-            for temp_path in cleanup_paths:
+
+            learned_key = None
+            if use_page_selection and ocr_pages:
+                learned: list[int] = []
+                if set_name:
+                    learned_key = await asyncio.to_thread(document.digest)
+                    learned = await asyncio.to_thread(
+                        self.page_memory.get, set_name, learned_key
+                    )
+                selected = select_relevant_pages(
+                    page_texts,
+                    page_keywords,
+                    learned,
+                    self.page_selection_context,
+                    self.text_layer_min_chars,
+                )
+                if selected is None:
+                    self.logger.info(
+                        "%s: ninguna pagina coincide con %s; se procesa completo",
+                        label,
+                        page_keywords,
+                    )
+                else:
+                    keep = set(selected)
+                    skipped = [page for page in ocr_pages if page not in keep]
+                    ocr_pages = [page for page in ocr_pages if page in keep]
+                    stats["pages_skipped"] = stats.get("pages_skipped", 0) + len(skipped)
+                    self.logger.info(
+                        "%s: %d paginas relevantes, %d descartadas",
+                        label,
+                        len(ocr_pages),
+                        len(skipped),
+                    )
+
+            # PDF ilegible (0 paginas): se envia completo y el OCR decide
+            page_groups = (
+                await self._plan_page_groups(document, ocr_pages) if total_pages else [[]]
+            )
+            cache_keys: list[Optional[str]] = []
+            content_digest: Optional[str] = None
+            if (self.ocr_cache is not None or self.chunk_ledger is not None) and total_pages:
                 try:
-                    os.unlink(temp_path)
-                except Exception as e:
+                    content_digest = await asyncio.to_thread(document.digest)
+                    schema_digest = schema_fingerprint(extraction_model)
+                    cache_keys = [
+                        OCRResultCache.build_key(
+                            content_digest,
+                            schema_digest,
+                            format_page_label(group),
+                            self._result_model_id(),
+                        )
+                        for group in page_groups
+                    ]
+                except Exception as exc:
                     self.logger.warning(
-                        f"Could not delete temporary file {temp_path}: {e}"
+                        "No se pudo calcular la clave de cache para %s: %s", label, exc
                     )
+            if len(cache_keys) != len(page_groups):
+                cache_keys = [None] * len(page_groups)
+
+            positions = [group[0] if group else 0 for group in page_groups]
+            outcome.extend([None] * len(page_groups))
+            if consolidator is not None:
+                consolidator.expect(
+                    positions + ([text_layer_result[0]] if text_layer_result else [])
+                )
+            if text_layer_result is not None:
+                _deliver(*text_layer_result)
 
-        return results
-
-    async def process_document(
-        self, descriptor: FileDescriptor, extraction_model: type[BaseModel]
-    ) -> list:
-        """Run blocking document processing in a worker thread."""
-        return await asyncio.to_thread(
-            self._process_document_sync, descriptor, extraction_model
-        )
+            stored: list = [None] * len(page_groups)
+            if self.ocr_cache is not None:
+                stored = await asyncio.to_thread(
+                    lambda: [self.ocr_cache.get(key) if key else None for key in cache_keys]
+                )
+            for i, item in enumerate(stored):
+                if item is not None:
+                    stats["pages_cached"] = stats.get("pages_cached", 0) + len(page_groups[i])
+                    self.logger.info(f"Chunk {i+1}/{len(page_groups)} servido desde cache")
+            if self.ocr_cache is None and self.chunk_ledger is not None:
+                # Sin cache: chunks completados en una corrida anterior que no termino
+                resumed = await asyncio.to_thread(
+                    lambda: [
+                        self.chunk_ledger.completed(key) if key and item is None else None
+                        for key, item in zip(cache_keys, stored)
+                    ]
+                )
+                for i, item in enumerate(resumed):
+                    if item is not None:
+                        stored[i] = item
+                        stats["pages_resumed"] = (
+                            stats.get("pages_resumed", 0) + len(page_groups[i])
+                        )
+                        self.logger.info(
+                            f"Chunk {i+1}/{len(page_groups)} retomado del registro"
+                        )
+            for i, item in enumerate(stored):
+                if item is not None:
+                    _deliver(positions[i], item, i)
+            del stored
+            pending = [i for i, done in enumerate(outcome) if done is None]
+            # Paginas donde el markdown del OCR menciona las palabras clave, por chunk
+            ocr_hits: dict[int, list[int]] = {}
+
+            if pending and self.shared_ocr and total_pages:
+
+                async def _run_shared(i: int):
+                    report: dict[str, int] = {}
+                    result = await self._shared_process_group(
+                        document,
+                        page_groups[i],
+                        extraction_model,
+                        cache_keys[i],
+                        shared,
+                        report,
+                    )
+                    # Cada pagina cuenta como OCR solo en el set que la proceso
+                    for key in ("pages_ocr", "pages_reused"):
+                        stats[key] = stats.get(key, 0) + report.get(key, 0)
+                    if result is not None:
+                        _deliver(positions[i], result, i)
+
+                await asyncio.gather(*(_run_shared(i) for i in pending))
+                pending = [i for i in pending if outcome[i] is None]
+            elif pending:
+                if self.upload_mode and total_pages and len(pending) >= self.upload_min_chunks:
+                    uploaded = await self._upload_document(document)
+                    if uploaded:
+                        uploaded_file_id, signed_url = uploaded
+
+                semaphore = asyncio.Semaphore(self.chunk_concurrency)
+                retry_round = 0
+                # Chunks cuyo error no se resuelve reintentando (p. ej. 400 o PDF invalido)
+                permanent: set[int] = set()
+                attempt = pending
+                while True:
+                    if uploaded_file_id:
+                        # Un solo upload; cada chunk referencia su rango de paginas
+                        chunk_list = [
+                            PdfChunk(page_groups[i], document_url=signed_url)
+                            for i in attempt
+                        ]
+                    else:
+                        # Si el documento cabe en un chunk se envia el PDF original sin reescribirlo
+                        chunk_list = await asyncio.to_thread(
+                            self.split_pdf_into_chunks,
+                            document,
+                            [page_groups[i] for i in attempt],
+                        )
+                    chunks = dict(zip(attempt, chunk_list))
+
+                    async def _run_chunk(i: int):
+                        report: dict[str, Any] = {}
+                        async with semaphore:
+                            self.logger.info(f"Processing chunk {i+1}/{len(page_groups)}")
+                            result = await self._cached_process_chunk(
+                                chunks.pop(i),
+                                extraction_model,
+                                cache_keys[i],
+                                content_digest,
+                                report,
+                            )
+                        if result is None and not report.get("transient", False):
+                            permanent.add(i)
+                        if learned_key and result is not None:
+                            ocr_hits[i] = self._ocr_keyword_pages(
+                                result, page_groups[i], page_keywords
+                            )
+                        # Solo se conserva la anotacion; el markdown se libera aqui
+                        result = self._slim_response(result)
+                        if result is not None:
+                            stats["pages_ocr"] = (
+                                stats.get("pages_ocr", 0) + len(page_groups[i])
+                            )
+                            _deliver(positions[i], result, i)
+
+                    runnable = [i for i in attempt if i in chunks]
+                    await asyncio.gather(*(_run_chunk(i) for i in runnable))
+
+                    pending = [i for i in pending if outcome[i] is None]
+                    attempt = [i for i in pending if i not in permanent]
+                    if not attempt or retry_round >= self.chunk_retry_rounds:
+                        break
+                    retry_round += 1
+                    delay = min(2 ** retry_round, 30)
+                    self.logger.warning(
+                        "%s: %d chunks con error transitorio; ronda de reintento %d/%d en %ds",
+                        label,
+                        len(attempt),
+                        retry_round,
+                        self.chunk_retry_rounds,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+
+            if pending:
+                stats["chunks_failed"] = stats.get("chunks_failed", 0) + len(pending)
+                # Los chunks fallidos no bloquean la fusion de los siguientes
+                for i in pending:
+                    _deliver(positions[i], None)
+
+            if (
+                self.chunk_ledger is not None
+                and content_digest
+                and all(done is not None for done in outcome)
+            ):
+                await asyncio.to_thread(self.chunk_ledger.release_responses, content_digest)
+
+            if learned_key:
+                # Lo que devolvio el OCR, no la seleccion: asi la memoria puede ampliarse
+                useful_pages = [
+                    page
+                    for i, (group, has_data) in enumerate(zip(page_groups, outcome))
+                    if has_data
+                    for page in ocr_hits.get(i) or group
+                ]
+                await asyncio.to_thread(
+                    self.page_memory.record, set_name, learned_key, useful_pages
+                )
+        finally:
+            if uploaded_file_id:
+                await self._delete_uploaded(uploaded_file_id)
+            await self._close_document(descriptor, document, shared)
+
+        # Reensamblar en orden de paginas antes de consolidar
+        partial.sort(key=lambda item: item[0])
+        return [result for _, result in partial]
+
+    def _ocr_keyword_pages(
+        self, response: Any, group: list[int], keywords: list[str]
+    ) -> list[int]:
+        """Paginas del chunk cuyo markdown OCR contiene alguna palabra clave."""
+        markdown = self._response_markdown(response, tuple(group))
+        scores = score_pages(list(markdown.values()), keywords)
+        return [page for page, score in zip(markdown, scores) if score > 0]
+
+    @staticmethod
+    def _slim_response(response: Any) -> Any:
+        """Conserva solo ``document_annotation`` de una respuesta OCR."""
+        if response is None or isinstance(response, dict):
+            return response
+        return {"document_annotation": getattr(response, "document_annotation", None)}
 
     def consolidate_chunks_data(
         self,
@@ -429,77 +1495,44 @@ class IndexNode:
                 return None
 
             # Consolidar todos los datos de los chunks
-            all_chunk_data = {}
-
+            consolidator = ChunkConsolidator(SchemaMerger(extraction_model).merge)
+            consolidator.expect(range(len(chunk_responses)))
             for i, response in enumerate(chunk_responses):
-                if not response:
-                    continue
-
-                # Extraer document_annotation del chunk
-                annotation_data = None
-                if hasattr(response, "document_annotation"):
-                    annotation_data = response.document_annotation
-                elif isinstance(response, dict) and "document_annotation" in response:
-                    annotation_data = response["document_annotation"]
-
-                if annotation_data:
-                    try:
-                        # Convertir a dict si es necesario
-                        if isinstance(annotation_data, str):
-                            chunk_data = json.loads(annotation_data)
-                        elif isinstance(annotation_data, dict):
-                            chunk_data = annotation_data
-                        else:
-                            chunk_data = json.loads(str(annotation_data))
-
-                        # Mergear datos del chunk con el consolidado
-                        self._merge_chunk_data(all_chunk_data, chunk_data)
-                        self.logger.debug(f"Merged chunk {i+1} data")
-
-                    except (json.JSONDecodeError, TypeError) as e:
-                        self.logger.warning(
-                            f"Error parsing chunk {i+1} annotation: {e}"
-                        )
-
-            # Crear instancia del modelo Pydantic con los datos consolidados
-            if all_chunk_data and extraction_model:
-                try:
-                    model_instance = extraction_model(**all_chunk_data)
-                    self.logger.info(
-                        f"Created {extraction_model.__name__} instance for {document_name}"
-                    )
-                    return model_instance
-                except Exception as e:
-                    self.logger.error(
-                        f"Error creating model instance for {document_name}: {e}"
-                    )
-                    # Fallback: retornar los datos raw
-                    return all_chunk_data
-
-            self.logger.warning(
-                f"No valid data to create model instance for {document_name}"
+                consolidator.add(i, response)
+            return self.build_model_instance(
+                consolidator.finish(), document_name, extraction_model
             )
-            return None
 
         except Exception as e:
             self.logger.error(f"Error consolidating chunks for {document_name}: {e}")
             return None
 
-    def _merge_chunk_data(self, target: dict, source: dict):
-        """Mergea datos de un chunk con el diccionario consolidado."""
-        for key, value in source.items():
-            if key in target:
-                # Si ambos son listas, concatenar
-                if isinstance(target[key], list) and isinstance(value, list):
-                    target[key].extend(value)
-                # Si ambos son dicts, mergear recursivamente
-                elif isinstance(target[key], dict) and isinstance(value, dict):
-                    self._merge_chunk_data(target[key], value)
-                # Si son del mismo tipo pero no lista/dict, mantener el ÃƒÆ’Ã‚Âºltimo valor
-                else:
-                    target[key] = value
-            else:
-                target[key] = value
+    def build_model_instance(
+        self,
+        all_chunk_data: dict,
+        document_name: str,
+        extraction_model: type[BaseModel],
+    ):
+        """Crea la instancia del modelo Pydantic a partir de los datos consolidados."""
+        # Crear instancia del modelo Pydantic con los datos consolidados
+        if all_chunk_data and extraction_model:
+            try:
+                model_instance = extraction_model(**all_chunk_data)
+                self.logger.info(
+                    f"Created {extraction_model.__name__} instance for {document_name}"
+                )
+                return model_instance
+            except Exception as e:
+                self.logger.error(
+                    f"Error creating model instance for {document_name}: {e}"
+                )
+                # Fallback: retornar los datos raw
+                return all_chunk_data
+
+        self.logger.warning(
+            f"No valid data to create model instance for {document_name}"
+        )
+        return None
 
     @traceable
     async def run(
@@ -522,7 +1555,98 @@ class IndexNode:
             documents.append(descriptor)
 
         extraction_model = state.get("data_extraction_model")
+        set_name = state.get("set_name")
+        page_keywords = state.get("page_keywords") or []
+        document_consumers = state.get("document_consumers") or {}
+        # Trabajo compartido con los demas sets de la misma corrida de AgentUI
+        run_id = state.get("ocr_run_id")
+        if run_id:
+            shared = self.shared_runs.open(
+                run_id, state.get("ocr_run_branches") or 1, document_consumers
+            )
+        else:
+            shared = SharedOCRWork(document_consumers)
+        semaphore = asyncio.Semaphore(self.document_concurrency)
+        stats: dict[str, int] = {
+            "documents": len(documents),
+            "pages": 0,
+            "pages_text_layer": 0,
+            "pages_cached": 0,
+            "pages_resumed": 0,
+            "pages_skipped": 0,
+            "pages_ocr": 0,
+            "pages_reused": 0,
+            "documents_packed": 0,
+            "chunks_failed": 0,
+        }
+
+        pack_slots: dict[int, asyncio.Future] = {}
+        pack_task: Optional[asyncio.Task] = None
+        if self._packing_enabled(extraction_model):
+            candidates = self._pack_candidates(documents, extraction_model)
+            if len(candidates) > 1:
+                loop = asyncio.get_running_loop()
+                pack_slots = {i: loop.create_future() for i in candidates}
+                # Los paquetes corren en paralelo con los documentos grandes
+                pack_task = asyncio.create_task(
+                    self._pack_small_documents(
+                        documents, pack_slots, extraction_model, stats, shared
+                    )
+                )
+        else:
+            images = sum(1 for descriptor in documents if self._is_image_descriptor(descriptor))
+            if images > 1:
+                self.logger.info(
+                    "%s: %d imagenes sin agrupar (%s); cada una va en su propia solicitud OCR",
+                    set_name,
+                    images,
+                    "modo compartido" if self.shared_ocr else "sin modelo de extraccion",
+                )
+
+        async def _process(index: int, descriptor: FileDescriptor, document_name: str):
+            packed, document = None, None
+            if index in pack_slots:
+                packed, document = await asyncio.shield(pack_slots[index])
+                del pack_slots[index]
+            try:
+                await semaphore.acquire()
+            except BaseException:
+                if document is not None:
+                    await self._close_document(descriptor, document, shared)
+                raise
+            try:
+                if packed is not None:
+                    model_instance = await asyncio.to_thread(
+                        self.consolidate_chunks_data,
+                        packed,
+                        document_name,
+                        extraction_model,
+                    )
+                else:
+                    # Las anotaciones se fusionan a medida que llegan los chunks
+                    consolidator = ChunkConsolidator(SchemaMerger(extraction_model).merge)
+                    await self.process_document(
+                        descriptor,
+                        extraction_model,
+                        stats,
+                        set_name=set_name,
+                        page_keywords=page_keywords,
+                        shared=shared,
+                        document=document,
+                        consolidator=consolidator,
+                    )
+                    model_instance = await asyncio.to_thread(
+                        self.build_model_instance,
+                        consolidator.finish(),
+                        document_name,
+                        extraction_model,
+                    )
+            finally:
+                semaphore.release()
+            self.logger.info("Completed processing %s", document_name)
+            return model_instance
 
+        document_names: list[str] = []
         for descriptor in documents:
             document_name = descriptor.name
             if not document_name:
@@ -530,22 +1654,59 @@ class IndexNode:
                     document_name = os.path.basename(descriptor.url) or descriptor.url
                 else:
                     document_name = "documento.pdf"
+            document_names.append(document_name)
 
-            chunk_responses = await self.process_document(descriptor, extraction_model)
-            model_instance = await asyncio.to_thread(
-                self.consolidate_chunks_data,
-                chunk_responses,
-                document_name,
-                extraction_model,
+        # Un fallo en un documento no cancela el resto; el orden se conserva
+        try:
+            outcomes = await asyncio.gather(
+                *(
+                    _process(index, descriptor, document_name)
+                    for index, (descriptor, document_name) in enumerate(
+                        zip(documents, document_names)
+                    )
+                ),
+                return_exceptions=True,
             )
-
+        finally:
+            if pack_task is not None:
+                if not pack_task.done():
+                    pack_task.cancel()
+                await asyncio.gather(pack_task, return_exceptions=True)
+            # Documentos abiertos para empaquetar que ningun _process alcanzo a tomar
+            for index, slot in pack_slots.items():
+                if slot.done() and not slot.cancelled() and slot.result()[1] is not None:
+                    await self._close_document(documents[index], slot.result()[1], shared)
+            if run_id:
+                self.shared_runs.close(run_id)
+
+        for document_name, outcome in zip(document_names, outcomes):
+            if isinstance(outcome, BaseException):
+                self.logger.error(
+                    "Error procesando documento %s: %s", document_name, outcome
+                )
+                outcome = None
             extraction_content.append(
                 IndexNodeOutput(
-                    document_name=document_name, extracted_content=model_instance
+                    document_name=document_name, extracted_content=outcome
                 )
             )
 
-            self.logger.info("Completed processing %s", document_name)
+        self.logger.info("Paginas de %s: %s", state.get("set_name"), stats)
+        self.logger.info(
+            "Gobernador OCR tras %s: %s", state.get("set_name"), self.governor.metrics()
+        )
+        if self.hedge_policy.enabled:
+            self.logger.info(
+                "Duplicacion OCR tras %s: %s",
+                state.get("set_name"),
+                self.hedge_policy.metrics(),
+            )
+        if document_consumers or self.shared_ocr:
+            self.logger.info(
+                "Trabajo OCR compartido tras %s: %s",
+                state.get("set_name"),
+                shared.metrics(),
+            )
 
         return Command(
             update={
@@ -558,6 +1719,7 @@ class IndexNode:
                     NodeOutput(
                         set_name=state.get("set_name"),
                         extracted_content=extraction_content,
+                        stats=stats,
                     )
                 ],
             },
@@ -0,0 +1,6 @@
+SHARED_ANNOTATION_PROMPT = """
+Eres un extractor de datos de documentos de validacion analitica.
+Recibiras el markdown OCR de un rango de paginas (cada pagina inicia con un comentario <!-- pagina N -->).
+Completa el schema JSON solicitado usando unicamente informacion presente en el texto; deja en null los campos que no aparezcan.
+Conserva los valores numericos tal como estan reportados, sin redondear ni convertir unidades.
+"""
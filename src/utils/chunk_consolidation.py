@@ -0,0 +1,85 @@
+import heapq
+import json
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_annotation(response: Any) -> Optional[dict]:
+    """Extrae el ``document_annotation`` de una respuesta de chunk como dict."""
+    if not response:
+        return None
+    annotation = None
+    if hasattr(response, "document_annotation"):
+        annotation = response.document_annotation
+    elif isinstance(response, dict) and "document_annotation" in response:
+        annotation = response["document_annotation"]
+    if not annotation:
+        return None
+    # Convertir a dict si es necesario
+    if isinstance(annotation, dict):
+        return annotation
+    if isinstance(annotation, str):
+        return json.loads(annotation)
+    return json.loads(str(annotation))
+
+
+class ChunkConsolidator:
+    """Consolida las anotaciones de un documento a medida que llegan los chunks.
+
+    Cada respuesta se convierte en dict al llegar y la respuesta original se
+    descarta. Las fusiones se aplican en orden de ``position`` (primera pagina
+    del chunk): una anotacion que llega antes que las anteriores espera en un
+    buffer hasta que estas lleguen o se marquen como fallidas con ``None``.
+    """
+
+    def __init__(self, merge: Callable[[dict, dict], None]):
+        self.merge = merge
+        self.data: dict = {}
+        self.merged = 0
+        self._expected: list[int] = []
+        self._expected_set: set[int] = set()
+        self._arrived: dict[int, Optional[dict]] = {}
+
+    def expect(self, positions: Iterable[int]) -> None:
+        """Registra las posiciones que deben llegar antes de fusionar las siguientes."""
+        for position in positions:
+            if position not in self._expected_set:
+                self._expected_set.add(position)
+                heapq.heappush(self._expected, position)
+        self._flush()
+
+    def add(self, position: int, response: Any) -> None:
+        try:
+            annotation = parse_annotation(response)
+        except (json.JSONDecodeError, TypeError) as exc:
+            logger.warning("Error parsing chunk %s annotation: %s", position, exc)
+            annotation = None
+        self._arrived[position] = annotation
+        self._flush()
+
+    def _flush(self) -> None:
+        while self._expected and self._expected[0] in self._arrived:
+            position = heapq.heappop(self._expected)
+            self._expected_set.discard(position)
+            self._merge(self._arrived.pop(position))
+
+    def _merge(self, annotation: Optional[dict]) -> None:
+        if annotation:
+            self.merge(self.data, annotation)
+            self.merged += 1
+
+    @property
+    def pending(self) -> int:
+        """Chunks que llegaron pero esperan a uno anterior."""
+        return len(self._arrived)
+
+    def finish(self) -> dict:
+        """Fusiona lo que quede en el buffer en orden y devuelve el consolidado."""
+        for position in sorted(self._arrived):
+            self._merge(self._arrived.pop(position))
+        self._expected = []
+        self._expected_set.clear()
+        return self.data
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "valida", "ocr_ledger.sqlite3"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    key TEXT PRIMARY KEY,
+    document TEXT NOT NULL,
+    page_range TEXT NOT NULL,
+    schema TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    pages INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL,
+    response TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document);
+"""
+
+
+class ChunkLedger:
+    """Registro durable del estado de cada chunk OCR en SQLite.
+
+    La clave es la misma de la cache OCR (huella del documento, rango de
+    paginas, hash del schema y modelo). Sin cache OCR, los chunks completados
+    guardan su respuesta (una anotacion vacia tambien) hasta que el documento
+    termina, de modo que un reintento o una nueva corrida solo procesa los
+    chunks faltantes; con cache la respuesta vive solo alli. Los fallidos
+    acumulan intentos y la clase de error (``transient`` o ``permanent``). La
+    latencia de cada chunk queda como historico. Con ``read_only`` se abre un
+    registro existente solo para consultas.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_LEDGER_PATH,
+        max_age_seconds: float = 30 * 86400,
+        read_only: bool = False,
+    ):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        if read_only:
+            self._conn = sqlite3.connect(
+                f"{Path(path).resolve().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                timeout=30,
+            )
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "error" not in columns:
+            # Registros creados antes de guardar la clase de error
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN error TEXT")
+        self.prune()
+
+    def completed(self, key: str) -> Optional[dict[str, Any]]:
+        """Respuesta guardada de un chunk completado, o ``None``.
+
+        ``None`` tambien si la respuesta no se guardo aqui (vive en la cache
+        OCR) o ya se libero al terminar el documento.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM chunks WHERE key = ? AND status = 'done'",
+                (key,),
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            return None
+
+    def record_success(
+        self,
+        key: str,
+        document: str,
+        page_range: str,
+        schema: str,
+        pages: int,
+        latency_ms: float,
+        response: Optional[dict[str, Any]],
+    ) -> None:
+        """Marca el chunk como completado; ``response=None`` si la guarda la cache OCR."""
+        payload = json.dumps(response, ensure_ascii=False) if response is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO chunks
+                    (key, document, page_range, schema, status, attempts, pages,
+                     latency_ms, response, updated_at)
+                VALUES (?, ?, ?, ?, 'done', 1, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    status = 'done',
+                    attempts = attempts + 1,
+                    pages = excluded.pages,
+                    latency_ms = excluded.latency_ms,
+                    response = excluded.response,
+                    error = NULL,
+                    updated_at = excluded.updated_at
+                """,
+                (key, document, page_range, schema, pages, latency_ms, payload, time.time()),
+            )
+
+    def record_failure(
+        self,
+        key: str,
+        document: str,
+        page_range: str,
+        schema: str,
+        pages: int,
+        transient: bool = True,
+    ) -> int:
+        """Marca el chunk como fallido y devuelve los intentos acumulados."""
+        error = "transient" if transient else "permanent"
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO chunks
+                    (key, document, page_range, schema, status, attempts, pages, error,
+                     updated_at)
+                VALUES (?, ?, ?, ?, 'failed', 1, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    status = 'failed',
+                    attempts = attempts + 1,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (key, document, page_range, schema, pages, error, time.time()),
+            )
+            row = self._conn.execute(
+                "SELECT attempts FROM chunks WHERE key = ?", (key,)
+            ).fetchone()
+        return int(row[0]) if row else 1
+
+    def latency_history(self, limit: int = 1000) -> list[tuple[float, int]]:
+        """(latencia en ms, paginas) de los chunks completados mas recientes."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT latency_ms, pages FROM chunks
+                WHERE status = 'done' AND latency_ms IS NOT NULL AND pages > 0
+                ORDER BY updated_at DESC LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [(float(latency), int(pages)) for latency, pages in rows]
+
+    def release_responses(self, document: str) -> None:
+        """Documento terminado: las respuestas ya viven en la cache OCR."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET response = NULL WHERE document = ?", (document,)
+            )
+
+    def prune(self) -> None:
+        if not self.max_age_seconds:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE updated_at < ?", (cutoff,))
+        except sqlite3.Error as exc:
+            logger.warning("No se pudo depurar el registro de chunks: %s", exc)
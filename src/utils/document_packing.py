@@ -0,0 +1,79 @@
+import json
+import logging
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, create_model
+
+
+logger = logging.getLogger(__name__)
+
+PACK_FIELD_PREFIX = "documento_"
+
+
+def plan_packs(
+    sizes: list[tuple[Any, int, int]], max_pages: int, max_bytes: int = 0
+) -> list[list[Any]]:
+    """Agrupa documentos (item, paginas, bytes) en orden sin superar los techos por paquete."""
+    packs: list[list[Any]] = []
+    current: list[Any] = []
+    current_pages = 0
+    current_bytes = 0
+    for item, pages, size in sizes:
+        if current and (
+            current_pages + pages > max_pages
+            or (max_bytes and current_bytes + size > max_bytes)
+        ):
+            packs.append(current)
+            current, current_pages, current_bytes = [], 0, 0
+        current.append(item)
+        current_pages += pages
+        current_bytes += size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_model(
+    extraction_model: type[BaseModel], sections: list[tuple[str, int, int]]
+) -> type[BaseModel]:
+    """Modelo con un campo por documento del paquete.
+
+    ``sections`` trae (nombre, primera pagina, ultima pagina) en base 1 dentro
+    del PDF empaquetado; la descripcion de cada campo le indica al OCR de que
+    paginas debe salir la anotacion.
+    """
+    fields: dict[str, Any] = {}
+    for position, (name, first_page, last_page) in enumerate(sections, start=1):
+        pages = f"{first_page}" if first_page == last_page else f"{first_page}-{last_page}"
+        fields[f"{PACK_FIELD_PREFIX}{position}"] = (
+            Optional[extraction_model],
+            Field(
+                None,
+                description=(
+                    f"Datos del archivo '{name}', tomados unicamente de las paginas "
+                    f"{pages} de este PDF. No mezclar con otras paginas."
+                ),
+            ),
+        )
+    return create_model(f"Paquete{extraction_model.__name__}", **fields)
+
+
+def split_packed_annotation(response: Any, document_count: int) -> list[Optional[dict]]:
+    """Separa la anotacion del paquete en una respuesta por documento."""
+    annotation = getattr(response, "document_annotation", None)
+    if annotation is None and isinstance(response, dict):
+        annotation = response.get("document_annotation")
+    if isinstance(annotation, str):
+        try:
+            annotation = json.loads(annotation)
+        except json.JSONDecodeError as exc:
+            logger.warning("Anotacion de paquete ilegible: %s", exc)
+            annotation = None
+    if not isinstance(annotation, dict):
+        return [None] * document_count
+
+    results: list[Optional[dict]] = []
+    for position in range(1, document_count + 1):
+        value = annotation.get(f"{PACK_FIELD_PREFIX}{position}")
+        results.append({"document_annotation": value} if value else None)
+    return results
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "valida", "ocr")
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hexadecimal del contenido binario."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def schema_fingerprint(extraction_model: Optional[type[BaseModel]]) -> str:
+    """Hash estable del JSON schema del modelo de extraccion."""
+    if extraction_model is None:
+        return "no-schema"
+    try:
+        schema = extraction_model.model_json_schema()
+    except Exception:
+        return f"model:{getattr(extraction_model, '__name__', str(extraction_model))}"
+    encoded = json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class OCRResultCache:
+    """Cache en disco de anotaciones OCR direccionado por contenido.
+
+    Cada entrada es un JSON con el ``document_annotation`` devuelto por el OCR.
+    La clave combina el hash del PDF, el rango de paginas enviado, el hash del
+    schema de extraccion y el modelo OCR. Las entradas se expulsan cuando llevan
+    mas de ``max_age_seconds`` sin usarse y, si el directorio supera
+    ``max_bytes``, por orden de ultimo acceso. El directorio se recorre al
+    iniciar; despues ``put`` lleva un total estimado y solo recorta al
+    superar el limite. Con ``read_only`` solo se consultan entradas, sin crear,
+    expulsar ni refrescar archivos.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age_seconds: float = 30 * 24 * 3600,
+        read_only: bool = False,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._approx_bytes = 0
+        if not read_only:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.evict()
+
+    @staticmethod
+    def build_key(
+        content_digest: str,
+        schema_digest: str,
+        page_range: str = "all",
+        ocr_model: str = "",
+    ) -> str:
+        raw = f"{content_digest}|{page_range}|{schema_digest}|{ocr_model}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if self.max_age_seconds and time.time() - stat.st_mtime > self.max_age_seconds:
+            if not self.read_only:
+                self._remove(path)
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Entrada de cache OCR corrupta %s: %s", path, exc)
+            if not self.read_only:
+                self._remove(path)
+            return None
+
+        if not self.read_only:
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        return payload
+
+    def put(self, key: str, payload: dict[str, Any]) -> None:
+        if self.read_only:
+            return
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as exc:
+            logger.warning("No se pudo escribir la cache OCR %s: %s", path, exc)
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self._approx_bytes += size - previous
+            over_limit = bool(self.max_bytes) and self._approx_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> None:
+        """Elimina entradas expiradas y, si se supera ``max_bytes``, recorta al 90%."""
+        now = time.time()
+        entries: list[tuple[float, int, str]] = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if self.max_bytes and total > self.max_bytes:
+            # Se recorta con margen para que las escrituras siguientes no recorran de nuevo
+            target = int(self.max_bytes * 0.9)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+        with self._lock:
+            self._approx_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
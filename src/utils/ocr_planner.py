@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlannedDocument(BaseModel):
+    """Documento unico del plan OCR y los sets que lo consumen."""
+
+    fingerprint: str
+    name: str
+    sets: list[str] = []
+
+
+def build_ocr_plan(
+    documents_by_set: dict[str, list[Any]],
+    fingerprint: Callable[[Any], Optional[str]],
+) -> dict[str, PlannedDocument]:
+    """Agrupa los descriptores de todos los sets por documento unico."""
+    plan: dict[str, PlannedDocument] = {}
+    for set_name, documents in documents_by_set.items():
+        for descriptor in documents:
+            key = fingerprint(descriptor)
+            if not key:
+                continue
+            planned = plan.get(key)
+            if planned is None:
+                planned = plan[key] = PlannedDocument(
+                    fingerprint=key, name=getattr(descriptor, "name", "") or key
+                )
+            if set_name not in planned.sets:
+                planned.sets.append(set_name)
+    return plan
+
+
+def shared_consumers(plan: dict[str, PlannedDocument]) -> dict[str, int]:
+    """Numero de sets por documento, solo para los documentos compartidos."""
+    return {key: len(doc.sets) for key, doc in plan.items() if len(doc.sets) > 1}
+
+
+class SharedOCRWork:
+    """Descargas y OCR compartidos entre las ramas ``index_node`` de una corrida.
+
+    Las ramas corren en el mismo event loop: la primera que necesita un
+    documento o una pagina lo obtiene y las demas esperan el mismo futuro.
+    ``consumers`` es el numero de sets por huella de documento compartido.
+    Los documentos se liberan cuando todos sus consumidores llaman
+    ``release_document`` o al cerrar la corrida; el markdown de paginas se
+    conserva con limite LRU.
+    """
+
+    def __init__(self, consumers: Optional[dict[str, int]] = None, max_pages: int = 4096):
+        self.consumers = dict(consumers or {})
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._documents: dict[str, dict[str, Any]] = {}
+        self._pages: OrderedDict[tuple[str, int], asyncio.Future] = OrderedDict()
+        self._counters = {
+            "documents_loaded": 0,
+            "documents_reused": 0,
+            "pages_ocr": 0,
+            "pages_reused": 0,
+        }
+
+    def _document_entry(self, key: str, consumers: int) -> dict[str, Any]:
+        entry = self._documents.get(key)
+        if entry is None:
+            entry = {"future": None, "remaining": consumers, "loop": None}
+            self._documents[key] = entry
+        return entry
+
+    async def fetch_document(
+        self, key: Optional[str], consumers: int, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Carga el documento una sola vez para todos sus consumidores."""
+        if not key or consumers <= 1:
+            return await loader()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._document_entry(key, consumers)
+            owner = entry["future"] is None or entry["loop"] is not loop
+            if owner:
+                entry["future"] = loop.create_future()
+                entry["loop"] = loop
+                self._counters["documents_loaded"] += 1
+            else:
+                self._counters["documents_reused"] += 1
+            future = entry["future"]
+
+        if owner:
+            try:
+                future.set_result(await loader())
+            except BaseException as exc:
+                failure = exc if isinstance(exc, Exception) else RuntimeError("carga cancelada")
+                future.set_exception(failure)
+                future.exception()
+                with self._lock:
+                    if self._documents.get(key) is entry:
+                        entry["future"] = None
+                raise
+        return await asyncio.shield(future)
+
+    def release_document(self, key: Optional[str], consumers: int) -> None:
+        """Un consumidor termino con el documento; el ultimo lo libera."""
+        if not key or consumers <= 1:
+            return
+        with self._lock:
+            entry = self._document_entry(key, consumers)
+            entry["remaining"] -= 1
+            if entry["remaining"] <= 0:
+                self._documents.pop(key, None)
+
+    async def page_markdown(
+        self,
+        digest: str,
+        pages: list[int],
+        fetch: Callable[[list[int]], Awaitable[dict[int, str]]],
+        report: Optional[dict[str, int]] = None,
+    ) -> dict[int, str]:
+        """Markdown por pagina; ``fetch`` recibe solo las paginas que nadie mas procesa.
+
+        En ``report`` quedan las paginas que esta llamada envio al OCR
+        (``pages_ocr``) y las que tomo de otra rama (``pages_reused``).
+        """
+        loop = asyncio.get_running_loop()
+        claimed: list[int] = []
+        futures: dict[int, asyncio.Future] = {}
+        with self._lock:
+            for page in pages:
+                key = (digest, page)
+                future = self._pages.get(key)
+                if future is None or future.get_loop() is not loop:
+                    future = loop.create_future()
+                    self._pages[key] = future
+                    claimed.append(page)
+                else:
+                    self._pages.move_to_end(key)
+                    self._counters["pages_reused"] += 1
+                futures[page] = future
+            self._counters["pages_ocr"] += len(claimed)
+            self._evict()
+        if report is not None:
+            report["pages_ocr"] = len(claimed)
+            report["pages_reused"] = len(pages) - len(claimed)
+
+        if claimed:
+            try:
+                fetched = await fetch(claimed)
+            except BaseException as exc:
+                failure = exc if isinstance(exc, Exception) else RuntimeError("OCR cancelado")
+                self._fail_pages(digest, claimed, futures, failure)
+                raise
+            missing = [page for page in claimed if fetched.get(page) is None]
+            for page in claimed:
+                if page in fetched and fetched[page] is not None:
+                    futures[page].set_result(fetched[page])
+            if missing:
+                self._fail_pages(
+                    digest, missing, futures, RuntimeError("pagina sin markdown")
+                )
+
+        results: dict[int, str] = {}
+        for page, future in futures.items():
+            try:
+                results[page] = await asyncio.shield(future)
+            except Exception as exc:
+                logger.warning("Pagina %d sin OCR compartido: %s", page + 1, exc)
+        return results
+
+    def _fail_pages(
+        self,
+        digest: str,
+        pages: list[int],
+        futures: dict[int, asyncio.Future],
+        failure: Exception,
+    ) -> None:
+        # Las paginas fallidas se olvidan para que otra rama pueda reintentarlas
+        with self._lock:
+            for page in pages:
+                future = futures[page]
+                if self._pages.get((digest, page)) is future:
+                    del self._pages[(digest, page)]
+                if not future.done():
+                    future.set_exception(failure)
+                    future.exception()
+
+    def _evict(self) -> None:
+        while len(self._pages) > self.max_pages:
+            key, future = next(iter(self._pages.items()))
+            if not future.done():
+                break
+            del self._pages[key]
+
+    def clear(self) -> None:
+        """Suelta documentos y paginas retenidos, p. ej. de consumidores que fallaron."""
+        with self._lock:
+            self._documents.clear()
+            self._pages.clear()
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "documents_held": len(self._documents),
+                "pages_held": len(self._pages),
+            }
+
+
+class SharedOCRRuns:
+    """Trabajo OCR compartido por corrida de ``AgentUI``.
+
+    Cada corrida tiene su propio ``SharedOCRWork``, identificado por el id que
+    viaja en el ``Send`` de cada set; se descarta cuando terminan sus
+    ``branches`` ramas, asi nada de una corrida queda retenido ni se entrega
+    a la siguiente. Se conservan como maximo ``max_runs`` corridas abiertas.
+    """
+
+    def __init__(self, max_runs: int = 16):
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._runs: OrderedDict[str, list] = OrderedDict()
+
+    def open(self, run_id: str, branches: int, consumers: Optional[dict[str, int]]) -> SharedOCRWork:
+        with self._lock:
+            entry = self._runs.get(run_id)
+            if entry is None:
+                entry = self._runs[run_id] = [SharedOCRWork(consumers), max(1, branches)]
+                while len(self._runs) > self.max_runs:
+                    _, (stale, _) = self._runs.popitem(last=False)
+                    stale.clear()
+            return entry[0]
+
+    def close(self, run_id: str) -> None:
+        """Una rama termino; la ultima descarta el trabajo de la corrida."""
+        with self._lock:
+            entry = self._runs.get(run_id)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._runs[run_id]
+        entry[0].clear()
+
+
+_shared_runs: Optional[SharedOCRRuns] = None
+_shared_runs_lock = threading.Lock()
+
+
+def get_shared_ocr_runs() -> SharedOCRRuns:
+    """Instancia unica del registro de corridas con trabajo OCR compartido."""
+    global _shared_runs
+    with _shared_runs_lock:
+        if _shared_runs is None:
+            _shared_runs = SharedOCRRuns()
+        return _shared_runs
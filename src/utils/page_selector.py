@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import unicodedata
+from typing import Optional
+
+from src.utils.text_layer import has_usable_text
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "valida", "page_ranges.json"
+)
+
+
+def normalize_text(text: str) -> str:
+    """Minusculas sin tildes ni espacios repetidos, para comparar palabras clave."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+def score_pages(page_texts: list[str], keywords: list[str]) -> list[float]:
+    """Numero de apariciones de las palabras clave en cada pagina."""
+    normalized_keywords = [normalize_text(keyword) for keyword in keywords if keyword]
+    scores: list[float] = []
+    for text in page_texts:
+        normalized = normalize_text(text)
+        scores.append(float(sum(normalized.count(keyword) for keyword in normalized_keywords)))
+    return scores
+
+
+class PageRangeMemory:
+    """Paginas utiles aprendidas por (set, documento), persistidas en JSON."""
+
+    def __init__(self, path: str = DEFAULT_MEMORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[dict[str, list[int]]] = None
+
+    def _load(self) -> dict[str, list[int]]:
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as fh:
+                    self._data = json.load(fh)
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning("Memoria de paginas ilegible %s: %s", self.path, exc)
+                self._data = {}
+        return self._data
+
+    @staticmethod
+    def _key(set_name: str, document_digest: str) -> str:
+        return f"{set_name}|{document_digest}"
+
+    def get(self, set_name: str, document_digest: str) -> list[int]:
+        with self._lock:
+            return list(self._load().get(self._key(set_name, document_digest), []))
+
+    def record(self, set_name: str, document_digest: str, pages: list[int]) -> None:
+        if not pages:
+            return
+        with self._lock:
+            data = self._load()
+            data[self._key(set_name, document_digest)] = sorted(set(pages))
+            directory = os.path.dirname(self.path)
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump(data, fh)
+                os.replace(tmp_path, self.path)
+            except OSError as exc:
+                logger.warning("No se pudo guardar la memoria de paginas: %s", exc)
+
+
+def select_relevant_pages(
+    page_texts: list[str],
+    keywords: list[str],
+    learned_pages: Optional[list[int]] = None,
+    context: int = 1,
+    min_chars: int = 200,
+) -> Optional[list[int]]:
+    """Selecciona las paginas relevantes para un set.
+
+    Una pagina es relevante si contiene alguna palabra clave o fue util en una
+    corrida anterior; se anaden ``context`` paginas vecinas porque las tablas
+    suelen continuar en la pagina siguiente. Las paginas sin capa de texto
+    (escaneos; el mismo umbral ``min_chars`` de la capa de texto) no se pueden
+    puntuar y siempre se conservan. Devuelve ``None``
+    cuando nada coincide, para que el documento completo vaya al OCR.
+    """
+    total_pages = len(page_texts)
+    scores = score_pages(page_texts, keywords) if keywords else [0.0] * total_pages
+    for page in learned_pages or []:
+        if 0 <= page < total_pages:
+            scores[page] += 1.0
+
+    hits = [page for page, score in enumerate(scores) if score > 0]
+    if not hits:
+        return None
+
+    selected = {page for page, text in enumerate(page_texts) if not has_usable_text(text, min_chars)}
+    for page in hits:
+        for neighbor in range(page - context, page + context + 1):
+            if 0 <= neighbor < total_pages:
+                selected.add(neighbor)
+    return sorted(selected)
@@ -0,0 +1,169 @@
+import json
+import logging
+from io import BytesIO
+from typing import Any, Optional
+
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, NameObject, NumberObject
+from pydantic import BaseModel, Field
+
+from src.graph.state import DocumentName
+
+
+logger = logging.getLogger(__name__)
+
+# Filtros bitonales ya compactos: recomprimirlos en JPEG empeora el OCR
+_BILEVEL_FILTERS = {"/CCITTFaxDecode", "/JBIG2Decode"}
+
+
+class CompressionProfile(BaseModel):
+    """Ajustes de recompresion de imagenes para un tipo de documento."""
+
+    target_dpi: int = Field(200, description="Resolucion efectiva maxima de las imagenes de pagina")
+    jpeg_quality: int = Field(75, description="Calidad JPEG de las imagenes recomprimidas")
+    min_image_bytes: int = Field(64 * 1024, description="Imagenes mas pequenas se dejan intactas")
+    grayscale: bool = Field(False, description="Convierte las imagenes a escala de grises")
+
+
+# Escaneos manuscritos toleran escala de grises; los cromatogramas conservan color y detalle
+DEFAULT_PROFILES: dict[str, CompressionProfile] = {
+    "*": CompressionProfile(),
+    DocumentName.BITACORAS.value: CompressionProfile(grayscale=True, jpeg_quality=70),
+    DocumentName.PREPARACION_BITACORAS.value: CompressionProfile(grayscale=True, jpeg_quality=70),
+    DocumentName.HOJAS_TRABAJO.value: CompressionProfile(grayscale=True, jpeg_quality=70),
+    DocumentName.HOJAS_TRABAJO_PREPARACION.value: CompressionProfile(grayscale=True, jpeg_quality=70),
+    DocumentName.SOPORTES_CROMATOGRAFICOS.value: CompressionProfile(target_dpi=250, jpeg_quality=85),
+}
+
+
+def load_profiles(overrides: Optional[str] = None) -> dict[str, CompressionProfile]:
+    """Perfiles por ``DocumentName``; ``overrides`` es un JSON {nombre: {campo: valor}}."""
+    profiles = dict(DEFAULT_PROFILES)
+    if not overrides:
+        return profiles
+    try:
+        for name, values in json.loads(overrides).items():
+            base = profiles.get(name, profiles["*"])
+            profiles[name] = base.model_copy(update=values)
+    except (json.JSONDecodeError, AttributeError, TypeError) as exc:
+        logger.warning("Perfiles de compresion invalidos, se usan los predeterminados: %s", exc)
+    return profiles
+
+
+def _page_inches(page) -> tuple[float, float]:
+    box = page.mediabox
+    return float(box.width) / 72 or 1.0, float(box.height) / 72 or 1.0
+
+
+def _stream_length(xobject) -> int:
+    """Bytes codificados del stream, sin decodificarlo.
+
+    PyPDF2 3.0.1 (fijado en requirements.txt) descarta ``/Length`` al leer y
+    no tiene otro acceso publico a los bytes codificados; es el unico interno
+    que se usa y tests/test_pdf_compression.py falla si desaparece.
+    """
+    return len(xobject._data or b"")
+
+
+def _recompress_image(
+    xobject,
+    payload: Optional[bytes],
+    page_inches: tuple[float, float],
+    profile: CompressionProfile,
+) -> Optional[DecodedStreamObject]:
+    """XObject nuevo con la imagen en JPEG reducido, o ``None`` si no conviene.
+
+    Se arma con la API publica (``set_data`` de un stream decodificado, que el
+    escritor guarda tal cual) en lugar de parchar el stream leido.
+    """
+    original = _stream_length(xobject)
+    if original < profile.min_image_bytes or not payload:
+        return None
+    filters = xobject.get("/Filter")
+    filters = [filters] if isinstance(filters, str) else list(filters or [])
+    if xobject.get("/ImageMask") or "/SMask" in xobject or _BILEVEL_FILTERS & set(filters):
+        return None
+
+    with Image.open(BytesIO(payload)) as image:
+        if image.mode == "1":
+            return None
+        # Se asume que la imagen cubre la pagina: es el caso de los escaneos
+        dpi = max(image.width / page_inches[0], image.height / page_inches[1])
+        scale = min(1.0, profile.target_dpi / dpi) if dpi else 1.0
+        if scale >= 1.0 and "/DCTDecode" in filters and not profile.grayscale:
+            return None
+        converted = image.convert("L" if profile.grayscale or image.mode == "L" else "RGB")
+        if scale < 1.0:
+            converted = converted.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.LANCZOS,
+            )
+        buffer = BytesIO()
+        converted.save(buffer, format="JPEG", quality=profile.jpeg_quality, optimize=True)
+
+    data = buffer.getvalue()
+    if len(data) >= original:
+        return None
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    for key, value in xobject.items():
+        if key not in {"/Filter", "/DecodeParms", "/Decode", "/Length", "/ColorSpace"}:
+            stream[NameObject(key)] = value
+    stream[NameObject("/Filter")] = NameObject("/DCTDecode")
+    stream[NameObject("/Width")] = NumberObject(converted.width)
+    stream[NameObject("/Height")] = NumberObject(converted.height)
+    stream[NameObject("/BitsPerComponent")] = NumberObject(8)
+    stream[NameObject("/ColorSpace")] = NameObject(
+        "/DeviceGray" if converted.mode == "L" else "/DeviceRGB"
+    )
+    return stream
+
+
+def compress_pdf(data: Any, profile: CompressionProfile) -> Optional[bytes]:
+    """Reduce las imagenes de pagina y reescribe solo los objetos alcanzables.
+
+    Devuelve ``None`` si el resultado no es mas pequeno que el original.
+    """
+    reader = PdfReader(BytesIO(bytes(data)))
+    writer = PdfWriter()
+    saved = 0
+    for index, page in enumerate(reader.pages):
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources is not None else None
+        candidates = {}
+        for name, reference in xobjects.get_object().items() if xobjects is not None else ():
+            xobject = reference.get_object()
+            if xobject.get("/Subtype") == "/Image" and _stream_length(xobject) >= profile.min_image_bytes:
+                candidates[name] = xobject
+        if candidates:
+            inches = _page_inches(page)
+            try:
+                # page.images nombra cada imagen como su XObject mas la extension
+                payloads = {
+                    "/" + image.name.rsplit(".", 1)[0]: image.data for image in page.images
+                }
+            except Exception as exc:
+                logger.debug("Imagenes de la pagina %d ilegibles: %s", index + 1, exc)
+                payloads = {}
+            for name, xobject in candidates.items():
+                try:
+                    rebuilt = _recompress_image(xobject, payloads.get(name), inches, profile)
+                except Exception as exc:
+                    logger.debug("Imagen %s de la pagina %d sin recomprimir: %s", name, index + 1, exc)
+                    continue
+                if rebuilt is not None:
+                    # El escritor vuelve objeto indirecto el stream al guardar la pagina
+                    xobjects.get_object()[NameObject(name)] = rebuilt
+                    saved += _stream_length(xobject) - len(rebuilt.get_data())
+        writer.add_page(page)
+    for page in writer.pages:
+        page.compress_content_streams()
+
+    buffer = BytesIO()
+    writer.write(buffer)
+    result = buffer.getvalue()
+    if len(result) >= len(data):
+        return None
+    logger.debug("Imagenes recomprimidas: %d bytes menos", saved)
+    return result
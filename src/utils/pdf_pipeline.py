@@ -0,0 +1,290 @@
+import base64
+import hashlib
+import logging
+import math
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional, Sequence, Union
+
+from PIL import Image, ImageOps
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject
+
+
+logger = logging.getLogger(__name__)
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# Procesos del pool de division; cada uno recibe un lote contiguo de grupos
+SPLIT_PROCESSES = int(os.getenv("PDF_SPLIT_PROCESSES", "0")) or os.cpu_count() or 1
+
+# Firmas de los formatos de imagen que llegan como adjuntos (PNG y JPEG)
+IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff")
+
+
+def format_page_label(pages: Sequence[int]) -> str:
+    """Etiqueta 1-based de un grupo de paginas ("1-8" o "3,5,9")."""
+    if not pages:
+        return "none"
+    ordered = list(pages)
+    if ordered == list(range(ordered[0], ordered[0] + len(ordered))):
+        return f"{ordered[0] + 1}-{ordered[-1] + 1}"
+    return ",".join(str(page + 1) for page in ordered)
+
+
+def is_image_payload(data: Buffer) -> bool:
+    head = bytes(data[:8])
+    return any(head.startswith(signature) for signature in IMAGE_SIGNATURES)
+
+
+def image_to_pdf(data: Buffer, resolution: float = 150.0) -> bytes:
+    """Convierte una imagen PNG/JPEG en un PDF de una pagina en memoria."""
+    with Image.open(BytesIO(bytes(data))) as image:
+        # Las fotos de celular traen la rotacion en EXIF
+        page = ImageOps.exif_transpose(image)
+        if page.mode not in ("RGB", "L"):
+            page = page.convert("RGB")
+        buffer = BytesIO()
+        page.save(buffer, format="PDF", resolution=resolution)
+        return buffer.getvalue()
+
+
+def _stream_size(obj) -> int:
+    obj = obj.get_object()
+    data = getattr(obj, "_data", None)
+    if data is not None:
+        return len(data)
+    try:
+        return int(obj.get("/Length", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def estimate_page_bytes(page) -> int:
+    """Bytes comprimidos de los content streams y XObjects (imagenes) de una pagina."""
+    total = 0
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, ArrayObject) else [contents]
+        total += sum(_stream_size(stream) for stream in streams)
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is not None:
+        total += sum(_stream_size(xobject) for xobject in xobjects.get_object().values())
+    return total
+
+
+def write_pages(reader: PdfReader, pages: Sequence[int]) -> bytes:
+    """Serializa un subconjunto de paginas a un PDF en memoria."""
+    writer = PdfWriter()
+    for page_num in pages:
+        writer.add_page(reader.pages[page_num])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def merge_documents(readers: Sequence[PdfReader]) -> bytes:
+    """Concatena varios PDFs completos en un solo PDF en memoria."""
+    writer = PdfWriter()
+    for reader in readers:
+        for page in reader.pages:
+            writer.add_page(page)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def split_pdf_bytes(data: bytes, page_groups: list[list[int]]) -> list[bytes]:
+    """Divide un PDF en varios PDFs; funcion de nivel modulo para ProcessPool."""
+    reader = PdfReader(BytesIO(data))
+    return [write_pages(reader, group) for group in page_groups]
+
+
+class PdfChunk:
+    """Grupo de paginas listo para enviar al OCR.
+
+    Normalmente lleva los bytes del sub-PDF; si ``document_url`` apunta al
+    documento completo ya subido al proveedor, ``pages`` indica que paginas
+    de ese archivo deben procesarse.
+    """
+
+    def __init__(
+        self,
+        pages: Sequence[int],
+        data: Optional[Buffer] = None,
+        base64_payload: Optional[str] = None,
+        document_url: Optional[str] = None,
+    ):
+        self.pages = tuple(pages)
+        self.data = data
+        self.base64_payload = base64_payload
+        self.document_url = document_url
+
+    @property
+    def page_label(self) -> str:
+        return format_page_label(self.pages)
+
+    def to_base64(self) -> str:
+        if self.base64_payload is None:
+            self.base64_payload = base64.b64encode(self.data).decode("ascii")
+        return self.base64_payload
+
+    def release(self) -> None:
+        self.data = None
+        self.base64_payload = None
+        self.document_url = None
+
+
+class PdfDocument:
+    """PDF abierto una sola vez y compartido para contar, dividir y codificar.
+
+    El contenido vive en memoria (``bytes``) o mapeado desde disco (``mmap``);
+    ``close`` libera el mapeo y elimina los temporales registrados en
+    ``cleanup_paths``. Si el PDF llego como base64, ``base64_payload`` conserva
+    el texto original para reenviarlo sin volver a codificar.
+    """
+
+    def __init__(
+        self,
+        data: Buffer,
+        name: str = "document.pdf",
+        cleanup_paths: Optional[list[str]] = None,
+        base64_payload: Optional[str] = None,
+    ):
+        self.data = data
+        self.name = name
+        self.base64_payload = base64_payload
+        self.cleanup_paths = list(cleanup_paths or [])
+        self._reader: Optional[PdfReader] = None
+        self._digest: Optional[str] = None
+        self._handles: list = []
+
+    @classmethod
+    def from_path(
+        cls, path: str, name: Optional[str] = None, cleanup: bool = False
+    ) -> "PdfDocument":
+        handle = open(path, "rb")
+        try:
+            data: Buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            data = handle.read()
+            handle.close()
+            handle = None
+        document = cls(
+            data,
+            name=name or os.path.basename(path),
+            cleanup_paths=[path] if cleanup else None,
+        )
+        if handle is not None:
+            document._handles.append(handle)
+        return document
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def reader(self) -> PdfReader:
+        if self._reader is None:
+            stream = self.data if isinstance(self.data, mmap.mmap) else BytesIO(self.data)
+            self._reader = PdfReader(stream)
+        return self._reader
+
+    @property
+    def page_count(self) -> int:
+        try:
+            return len(self.reader.pages)
+        except Exception as exc:
+            logger.error("Error counting pages in %s: %s", self.name, exc)
+            return 0
+
+    def page_byte_sizes(self) -> list[int]:
+        """Peso estimado de cada pagina, para dimensionar los chunks."""
+        sizes: list[int] = []
+        for index, page in enumerate(self.reader.pages):
+            try:
+                sizes.append(estimate_page_bytes(page))
+            except Exception as exc:
+                logger.debug("No se pudo estimar el peso de la pagina %d: %s", index + 1, exc)
+                sizes.append(0)
+        return sizes
+
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    def whole_document_chunk(self) -> PdfChunk:
+        """Chunk con el PDF original completo, reutilizando el base64 recibido."""
+        return PdfChunk(
+            range(self.page_count), data=self.data, base64_payload=self.base64_payload
+        )
+
+    def build_chunks(
+        self,
+        page_groups: list[list[int]],
+        process_pool: Optional[ProcessPoolExecutor] = None,
+    ) -> list[PdfChunk]:
+        """Genera los bytes de cada grupo de paginas sin tocar disco."""
+        total_pages = self.page_count
+        if len(page_groups) == 1 and list(page_groups[0]) == list(range(total_pages)):
+            return [self.whole_document_chunk()]
+
+        if process_pool is not None and len(page_groups) > 1:
+            # Un lote por proceso; cada uno abre su copia del PDF y divide en paralelo
+            data = bytes(self.data)
+            batch = math.ceil(len(page_groups) / min(SPLIT_PROCESSES, len(page_groups)))
+            futures = [
+                process_pool.submit(split_pdf_bytes, data, page_groups[start:start + batch])
+                for start in range(0, len(page_groups), batch)
+            ]
+            payloads = [payload for future in futures for payload in future.result()]
+        else:
+            payloads = [write_pages(self.reader, group) for group in page_groups]
+
+        chunks = []
+        for group, payload in zip(page_groups, payloads):
+            chunks.append(PdfChunk(group, data=payload))
+            logger.info(
+                "Created chunk %d: pages %s", len(chunks), format_page_label(group)
+            )
+        return chunks
+
+    def close(self) -> None:
+        self._reader = None
+        self.base64_payload = None
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except Exception:
+                pass
+        for handle in self._handles:
+            try:
+                handle.close()
+            except Exception:
+                pass
+        self._handles = []
+        for path in self.cleanup_paths:
+            try:
+                os.unlink(path)
+            except Exception as exc:
+                logger.warning("Could not delete temporary file %s: %s", path, exc)
+        self.cleanup_paths = []
+
+
+_split_pool: Optional[ProcessPoolExecutor] = None
+_split_pool_lock = threading.Lock()
+
+
+def get_split_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido para dividir PDFs muy grandes."""
+    global _split_pool
+    with _split_pool_lock:
+        if _split_pool is None:
+            _split_pool = ProcessPoolExecutor(max_workers=SPLIT_PROCESSES)
+        return _split_pool
@@ -0,0 +1,268 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+import httpx
+
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _parse_retry_after(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(parsedate_to_datetime(str(value)).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def describe_failure(exc: BaseException) -> tuple[Optional[int], Optional[float]]:
+    """Extrae (status_code, retry_after) de una excepcion HTTP del SDK."""
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if not isinstance(status, int) or status < 0:
+        status = None
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = _parse_retry_after(headers.get("Retry-After"))
+        except Exception:
+            retry_after = None
+
+    if status is None and "timeout" in type(exc).__name__.lower():
+        status = 408
+    return status, retry_after
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Indica si reintentar mas tarde puede resolver el error: 408/429/5xx o red."""
+    status, _ = describe_failure(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(
+        exc, (ConnectionError, TimeoutError, asyncio.TimeoutError, httpx.TransportError)
+    )
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class OCRRateGovernor:
+    """Gobernador de llamadas OCR compartido por todo el proceso.
+
+    Combina un token bucket (``rate_per_second`` con rafagas de ``burst``) con un
+    limite de concurrencia adaptativo AIMD: cada exito suma ``1/limit`` al limite
+    y cada 429/5xx lo multiplica por ``decrease_factor``. Un ``Retry-After``
+    bloquea nuevas adquisiciones hasta que expire. Es seguro entre hilos y entre
+    event loops: quien espera un slot ocupado duerme hasta que otro lo libere.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 5.0,
+        burst: int = 10,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        decrease_factor: float = 0.5,
+        default_backoff: float = 2.0,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self.min_limit = max(1.0, float(min_limit))
+        self.max_limit = max(self.min_limit, float(max_limit))
+        self.limit = min(max(float(initial_limit), self.min_limit), self.max_limit)
+        self.decrease_factor = decrease_factor
+        self.default_backoff = default_backoff
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._cooldown_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        # Esperas por concurrencia llena; cada liberacion las despierta a todas
+        self._waiters: dict[asyncio.Future, asyncio.AbstractEventLoop] = {}
+        self._counters = {"acquired": 0, "succeeded": 0, "throttled": 0, "failed": 0}
+
+    def _refill(self, now: float) -> None:
+        if self.rate_per_second <= 0:
+            self._tokens = float(self.burst)
+            return
+        if now <= self._last_refill:
+            return
+        elapsed = now - self._last_refill
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate_per_second)
+        self._last_refill = now
+
+    def _try_acquire(self) -> Optional[float]:
+        """Intenta tomar un slot con el lock tomado.
+
+        Devuelve 0 si lo obtuvo, los segundos a esperar por cooldown o tokens, o
+        ``None`` si la concurrencia esta llena y hay que esperar una liberacion.
+        """
+        now = time.monotonic()
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+        if self._in_flight >= int(self.limit):
+            return None
+        self._refill(now)
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate_per_second
+        self._tokens -= 1
+        self._in_flight += 1
+        self._counters["acquired"] += 1
+        return 0.0
+
+    def _wake_waiters(self) -> None:
+        """Despierta, con el lock tomado, a quienes esperan un slot; cada uno reintenta."""
+        waiters, self._waiters = self._waiters, {}
+        for future, loop in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # Loop ya cerrado: nadie queda esperando ese future
+                pass
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                released = loop.create_future()
+                with self._lock:
+                    wait = self._try_acquire()
+                    if wait is None:
+                        # Registrada bajo el mismo lock: ninguna liberacion se pierde
+                        self._waiters[released] = loop
+                if wait is None:
+                    try:
+                        await released
+                    finally:
+                        with self._lock:
+                            self._waiters.pop(released, None)
+                elif wait <= 0:
+                    return
+                else:
+                    await asyncio.sleep(min(wait, 1.0))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(
+        self, status: Optional[int] = None, retry_after: Optional[float] = None, ok: bool = True
+    ) -> None:
+        """Libera el slot y ajusta el limite segun el resultado de la llamada."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._wake_waiters()
+            now = time.monotonic()
+            if ok:
+                self._counters["succeeded"] += 1
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                return
+
+            if status in RETRYABLE_STATUS:
+                self._counters["throttled"] += 1
+                # Una sola reduccion por ventana evita colapsar el limite
+                # cuando varias llamadas concurrentes reciben 429 a la vez.
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                pause = retry_after if retry_after is not None else (
+                    self.default_backoff if status == 429 else 0.0
+                )
+                if pause:
+                    self._cooldown_until = max(self._cooldown_until, now + pause)
+                    self._tokens = 0.0
+                    self._last_refill = now + pause
+            else:
+                self._counters["failed"] += 1
+
+    def abandon(self) -> None:
+        """Libera el slot de una llamada cancelada sin afectar el limite."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._wake_waiters()
+
+    def release_error(self, exc: BaseException) -> tuple[Optional[int], Optional[float]]:
+        status, retry_after = describe_failure(exc)
+        self.release(status=status, retry_after=retry_after, ok=False)
+        return status, retry_after
+
+    @asynccontextmanager
+    async def async_slot(self):
+        await self.acquire_async()
+        async with self._held_slot():
+            yield self
+
+    def try_slot(self):
+        """Slot sin esperar: context manager async si hay capacidad, si no ``None``."""
+        with self._lock:
+            if self._try_acquire() != 0:
+                return None
+        return self._held_slot()
+
+    @asynccontextmanager
+    async def _held_slot(self):
+        try:
+            yield self
+        except asyncio.CancelledError:
+            self.abandon()
+            raise
+        except BaseException as exc:
+            self.release_error(exc)
+            raise
+        else:
+            self.release()
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "tokens": round(self._tokens, 2),
+                "cooldown_remaining": round(max(0.0, self._cooldown_until - now), 2),
+                **self._counters,
+            }
+
+
+_governors: dict[str, OCRRateGovernor] = {}
+_governor_lock = threading.Lock()
+
+
+def get_ocr_governor(endpoint: str = "ocr") -> OCRRateGovernor:
+    """Instancia unica del gobernador por endpoint, configurada desde el entorno.
+
+    OCR, archivos y chat tienen cuotas distintas en Mistral: cada endpoint
+    lleva su propio bucket y limite AIMD, asi un 429 de uno no frena al resto.
+    """
+    with _governor_lock:
+        governor = _governors.get(endpoint)
+        if governor is None:
+            governor = _governors[endpoint] = OCRRateGovernor(
+                rate_per_second=float(os.getenv("OCR_RATE_PER_SECOND", "5")),
+                burst=int(os.getenv("OCR_RATE_BURST", "10")),
+                initial_limit=float(os.getenv("OCR_INITIAL_CONCURRENCY", "4")),
+                max_limit=float(os.getenv("OCR_MAX_CONCURRENCY", "32")),
+            )
+        return governor
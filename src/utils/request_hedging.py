@@ -0,0 +1,148 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional
+
+
+class HedgePolicy:
+    """Duplica llamadas lentas para recortar la latencia de cola.
+
+    Guarda la latencia reciente por unidad (pagina) de las llamadas exitosas.
+    Si una llamada no responde en el percentil ``percentile`` de esa ventana
+    (escalado a sus unidades) se lanza una copia; gana la primera respuesta
+    exitosa y la otra se cancela. Las copias nunca superan ``budget`` veces
+    las llamadas originales. Es compartida por todas las ramas del proceso.
+
+    ``call`` debe ser solo la llamada remota, con su slot ya tomado: la espera
+    en cola y los reintentos no cuentan como latencia ni disparan copias.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        budget: float = 0.1,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay: float = 1.0,
+    ):
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 1.0), 100.0)
+        self.budget = max(0.0, budget)
+        self.min_samples = max(1, min_samples)
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=max(1, window))
+        self._counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def record(self, seconds: float, units: float = 1.0) -> None:
+        with self._lock:
+            self._latencies.append(seconds / max(units, 1.0))
+
+    def hedge_delay(self, units: float = 1.0) -> Optional[float]:
+        """Segundos a esperar antes de duplicar, o ``None`` si aun no hay historico."""
+        if not self.enabled or self.budget <= 0:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        rank = max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return max(self.min_delay, ordered[rank] * max(units, 1.0))
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._counters["hedged"] + 1 > self.budget * self._counters["calls"]:
+                return False
+            self._counters["hedged"] += 1
+            return True
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        units: float = 1.0,
+        try_slot: Optional[Callable[[], Optional[AsyncContextManager]]] = None,
+    ) -> Any:
+        """Ejecuta ``call`` y, si tarda mas que el umbral, una copia en paralelo.
+
+        ``try_slot`` entrega sin esperar el slot de la copia (``None`` si no hay
+        capacidad); sin slot libre no se duplica, para no encolar otra llamada.
+        """
+        if not self.enabled:
+            return await call()
+
+        with self._lock:
+            self._counters["calls"] += 1
+        delay = self.hedge_delay(units)
+        started: dict[asyncio.Future, float] = {}
+
+        async def _in_slot(slot: AsyncContextManager) -> Any:
+            async with slot:
+                return await call()
+
+        def launch(slot: Optional[AsyncContextManager] = None) -> asyncio.Future:
+            task = asyncio.ensure_future(call() if slot is None else _in_slot(slot))
+            started[task] = time.monotonic()
+            return task
+
+        primary = launch()
+        pending = {primary}
+        failure: Optional[BaseException] = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self._spend():
+                    slot = try_slot() if try_slot is not None else None
+                    if try_slot is not None and slot is None:
+                        # Sin capacidad libre la copia solo esperaria en cola
+                        with self._lock:
+                            self._counters["hedged"] -= 1
+                    else:
+                        pending.add(launch(slot))
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        self.record(time.monotonic() - started[task], units)
+                        if task is not primary:
+                            with self._lock:
+                                self._counters["hedge_wins"] += 1
+                        return task.result()
+                    failure = failure or task.exception()
+            raise failure or asyncio.CancelledError()
+        finally:
+            # La copia perdedora se cancela; el gobernador libera su slot
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "samples": len(self._latencies)}
+
+
+_hedge_policy: Optional[HedgePolicy] = None
+_hedge_policy_lock = threading.Lock()
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Instancia unica de la politica de duplicacion, configurada desde el entorno."""
+    global _hedge_policy
+    with _hedge_policy_lock:
+        if _hedge_policy is None:
+            _hedge_policy = HedgePolicy(
+                enabled=os.getenv("OCR_HEDGE_ENABLED", "false").strip().lower()
+                in {"1", "true", "yes"},
+                percentile=float(os.getenv("OCR_HEDGE_PERCENTILE", "95")),
+                budget=float(os.getenv("OCR_HEDGE_BUDGET", "0.1")),
+                min_samples=int(os.getenv("OCR_HEDGE_MIN_SAMPLES", "20")),
+            )
+        return _hedge_policy
@@ -0,0 +1,163 @@
+import json
+import types
+from typing import Any, Optional, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+
+# Atributo ClassVar de los modelos de item con sus campos de llave natural
+MERGE_KEYS_ATTR = "merge_keys"
+
+
+def _unwrap(annotation: Any) -> Any:
+    """Quita Optional/Union con None de una anotacion."""
+    while get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return annotation
+        annotation = args[0]
+    return annotation
+
+
+def build_merge_plan(annotation: Any, _seen: Optional[set] = None) -> dict[str, Any]:
+    """Arbol de fusion derivado de las anotaciones del modelo de extraccion."""
+    annotation = _unwrap(annotation)
+    seen = _seen or set()
+    if get_origin(annotation) is list:
+        args = get_args(annotation)
+        return {"kind": "list", "item": build_merge_plan(args[0] if args else Any, seen)}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if annotation in seen:
+            return {"kind": "model", "fields": {}, "keys": ()}
+        seen = seen | {annotation}
+        return {
+            "kind": "model",
+            "keys": tuple(getattr(annotation, MERGE_KEYS_ATTR, ()) or ()),
+            "fields": {
+                name: build_merge_plan(field.annotation, seen)
+                for name, field in annotation.model_fields.items()
+            },
+        }
+    return {"kind": "scalar"}
+
+
+def _normalize_key(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.casefold().split())
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _is_keyed(identity: Any) -> bool:
+    return identity is not None and identity[0] == "key"
+
+
+def _boundary_overlap(tail: list, head: list) -> int:
+    """Largo del mayor prefijo de ``head`` que repite el final de ``tail`` (KMP, O(n))."""
+    # Las identidades None (items no serializables) nunca coinciden
+    sequence = [item if item is not None else object() for item in [*head, object(), *tail]]
+    prefix = [0] * len(sequence)
+    for i in range(1, len(sequence)):
+        k = prefix[i - 1]
+        while k and sequence[i] != sequence[k]:
+            k = prefix[k - 1]
+        if sequence[i] == sequence[k]:
+            k += 1
+        prefix[i] = k
+    return prefix[-1] if tail else 0
+
+
+class SchemaMerger:
+    """Fusiona anotaciones de chunks guiado por el modelo Pydantic.
+
+    Los modelos de item de ``src/config/models`` declaran su llave natural como
+    ``merge_keys: ClassVar[tuple[str, ...]]`` (p. ej. ``("nombre",)``); un
+    ClassVar no forma parte del JSON schema enviado al OCR. Los items de lista
+    se identifican por esa llave: una fila repetida en el borde de dos chunks
+    se completa en lugar de duplicarse. Los items sin llave (o con la llave
+    incompleta) se concatenan: solo se descartan las filas con que un chunk
+    empieza si repiten exactamente las ultimas del anterior, porque lecturas
+    replicadas identicas son datos validos. Cada lista mantiene un indice
+    hash, asi que fusionar N items cuesta O(N). Un ``None`` nunca borra un
+    valor ya extraido; entre dos valores, gana el del chunk posterior.
+    """
+
+    def __init__(self, extraction_model: Optional[type[BaseModel]] = None):
+        self.plan = build_merge_plan(extraction_model) if extraction_model else None
+        self._indexes: dict[int, dict[Any, Any]] = {}
+
+    def merge(self, target: dict, source: dict) -> None:
+        self._merge_dict(target, source, self.plan)
+
+    def _merge_dict(
+        self,
+        target: dict,
+        source: dict,
+        plan: Optional[dict],
+        protected: tuple[str, ...] = (),
+    ) -> None:
+        fields = plan.get("fields", {}) if plan and plan["kind"] == "model" else {}
+        for key, value in source.items():
+            current = target.get(key)
+            if key in protected and current is not None:
+                # La llave ya coincide; se conserva la grafia del primer chunk
+                continue
+            if value is None:
+                target.setdefault(key, None)
+            elif current is None:
+                target[key] = value
+            elif isinstance(current, list) and isinstance(value, list):
+                field_plan = fields.get(key)
+                item_plan = field_plan["item"] if field_plan and field_plan["kind"] == "list" else None
+                self._merge_list(current, value, item_plan)
+            elif isinstance(current, dict) and isinstance(value, dict):
+                self._merge_dict(current, value, fields.get(key))
+            else:
+                target[key] = value
+
+    def _merge_list(self, target: list, source: list, item_plan: Optional[dict]) -> None:
+        keys = item_plan.get("keys", ()) if item_plan and item_plan["kind"] == "model" else ()
+        index = self._indexes.get(id(target))
+        if index is None:
+            index = {}
+            for item in target:
+                identity = self._identity(item, keys)
+                if _is_keyed(identity):
+                    index.setdefault(identity, item)
+            self._indexes[id(target)] = index
+
+        identities = [self._identity(item, keys) for item in source]
+        tail = [self._identity(item, keys) for item in target[-len(source):]] if source else []
+        repeated = _boundary_overlap(tail, identities)
+
+        # Solo se compara contra lo fusionado de chunks anteriores: filas
+        # iguales dentro de un mismo chunk se respetan.
+        additions = []
+        for position, (identity, item) in enumerate(zip(identities, source)):
+            if not _is_keyed(identity):
+                if position >= repeated:
+                    additions.append((identity, item))
+                continue
+            existing = index.get(identity)
+            if existing is None:
+                additions.append((identity, item))
+            elif existing is not item and isinstance(existing, dict) and isinstance(item, dict):
+                self._merge_dict(existing, item, item_plan, keys)
+        for identity, item in additions:
+            target.append(item)
+            if _is_keyed(identity):
+                index.setdefault(identity, item)
+
+    @staticmethod
+    def _identity(item: Any, keys: tuple[str, ...]) -> Any:
+        if keys and isinstance(item, dict):
+            values = [item.get(key) for key in keys]
+            if all(value is not None for value in values):
+                return ("key",) + tuple(_normalize_key(value) for value in values)
+        try:
+            return ("value", json.dumps(item, sort_keys=True, ensure_ascii=False, default=str))
+        except (TypeError, ValueError):
+            return None
@@ -5,16 +5,27 @@ import os
 import urllib.parse
 import io
 import platform
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from io import BytesIO
 from langchain_core.document_loaders import Blob
 from langchain_core.documents.base import Document
 from langchain_community.document_loaders.parsers.pdf import PyPDFParser
 from langchain_core.document_loaders.base import BaseLoader
 from docx import Document as DocxDocument
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 
+GRAPH_ROOT = 'https://graph.microsoft.com/v1.0'
+GRAPH_BATCH_LIMIT = 20  # maximo de sub-solicitudes por llamada a $batch
+GRAPH_PAGE_SIZE = 999
+DRIVE_ITEM_SELECT = 'id,name,folder,file,size,eTag,cTag,webUrl,parentReference,@microsoft.graph.downloadUrl'
+
+
 def ensure_directory_exists(file_path):
     directory = os.path.dirname(file_path)
     if not os.path.exists(directory):
@@ -29,8 +40,89 @@ def get_long_path(path):
         # Return the normal path for Unix-based systems
         return os.path.abspath(path)
 
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after ``ttl_seconds``.
+
+    Concurrent misses for the same key share a single call to the loader:
+    the first thread runs it and the others wait for its result. Failures
+    are not cached, and neither are values rejected by ``cache_value``.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[object, Tuple[object, float]]" = OrderedDict()
+        self._pending: Dict[object, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, cache_value=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+                self.misses += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_exception(exc)
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            if cache_value is None or cache_value(value):
+                self._store(key, value)
+        pending.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class SharePointClient:
-    def __init__(self, tenant_id, client_id, client_secret, resource_url):
+    def __init__(
+        self,
+        tenant_id,
+        client_id,
+        client_secret,
+        resource_url,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
@@ -39,8 +131,44 @@ class SharePointClient:
         self.headers = {'Content-Type': 'application/x-www-form-urlencoded'}
         self.access_token = None
         self.access_token_expires_at = 0
+        self._token_lock = threading.Lock()
+        # Metadatos de sitio y biblioteca: cambian muy poco y se piden por cada archivo
+        self._metadata_cache = TTLCache(float(os.getenv("SHAREPOINT_METADATA_TTL_SECONDS", "900")))
+        self.session = self._build_session(
+            pool_size if pool_size is not None else int(os.getenv("SHAREPOINT_POOL_SIZE", "16")),
+            max_retries if max_retries is not None else int(os.getenv("SHAREPOINT_MAX_RETRIES", "3")),
+        )
         self.access_token = self.get_access_token()  # Initialize and store the access token upon instantiation
 
+    @staticmethod
+    def _build_session(pool_size: int, max_retries: int) -> requests.Session:
+        """
+        Build the keep-alive session shared by every call (and thread) of the client.
+
+        The connection pool keeps TLS connections to graph.microsoft.com and the
+        download hosts open between calls; transient failures (connection errors,
+        429 and 5xx) are retried at the transport level honouring Retry-After.
+        """
+        pool_size = max(1, pool_size)
+        retry = Retry(
+            total=max(0, max_retries),
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # Los POST del cliente (token y $batch de lecturas) son seguros de repetir
+            allowed_methods=frozenset({'GET', 'HEAD', 'POST'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
     def get_access_token(self):
         """
         This function retrieves an access token from Microsoft's OAuth2 endpoint.
@@ -51,7 +179,7 @@ class SharePointClient:
             'client_secret': self.client_secret,
             'scope': self.resource_url + '/.default'
         }
-        response = requests.post(self.base_url, headers=self.headers, data=body)
+        response = self.session.post(self.base_url, headers=self.headers, data=body)
 
         # ✅ **CAMBIO IMPORTANTE AQUÍ**
         # Verifica si la solicitud fue exitosa antes de obtener el token
@@ -69,19 +197,31 @@ class SharePointClient:
             # Lanza un error para detener la ejecución y mostrar el problema
             raise Exception(f"Error al obtener el token: {response.status_code} - {response.text}")
 
-    def _ensure_access_token(self):
-        if not self.access_token or time.time() >= self.access_token_expires_at:
-            self.get_access_token()
+    def _ensure_access_token(self) -> str:
+        token = self.access_token
+        if token and time.time() < self.access_token_expires_at:
+            return token
+        # Un solo hilo renueva el token; los demas reutilizan el nuevo
+        with self._token_lock:
+            if not self.access_token or time.time() >= self.access_token_expires_at:
+                self.get_access_token()
+            return self.access_token
+
+    def _refresh_access_token(self, rejected_token: str) -> str:
+        with self._token_lock:
+            if self.access_token == rejected_token:
+                self.get_access_token()
+            return self.access_token
 
     def _graph_request(self, method: str, url: str, retry: bool = True, **kwargs):
-        self._ensure_access_token()
+        token = self._ensure_access_token()
         headers = kwargs.pop('headers', {})
-        headers = {**headers, 'Authorization': f'Bearer {self.access_token}'}
-        response = requests.request(method, url, headers=headers, **kwargs)
+        headers = {**headers, 'Authorization': f'Bearer {token}'}
+        response = self.session.request(method, url, headers=headers, **kwargs)
         if response.status_code == 401 and retry:
-            self.get_access_token()
-            headers['Authorization'] = f'Bearer {self.access_token}'
-            response = requests.request(method, url, headers=headers, **kwargs)
+            response.close()
+            headers['Authorization'] = f'Bearer {self._refresh_access_token(token)}'
+            response = self.session.request(method, url, headers=headers, **kwargs)
         return response
 
     def _build_site_request_candidates(self, site_url: str) -> List[str]:
@@ -136,25 +276,37 @@ class SharePointClient:
 
         return candidates
 
+    def _lookup_site_candidate(self, candidate: str) -> Dict[str, object]:
+        full_url = f'https://graph.microsoft.com/v1.0/sites/{candidate}?$select=id,webUrl'
+        response = self._graph_request('get', full_url)
+        if response.status_code == 200:
+            payload = response.json()
+            payload['candidate'] = candidate
+            return {'status_code': 200, 'site': payload}
+        try:
+            details = response.json()
+        except ValueError:
+            details = {'status_code': response.status_code, 'text': response.text}
+        return {'status_code': response.status_code, 'error': details}
+
     def _resolve_site_info(self, site_url: str) -> Dict[str, str]:
         candidates = self._build_site_request_candidates(site_url)
         last_error = None
 
         for candidate in candidates:
-            full_url = f'https://graph.microsoft.com/v1.0/sites/{candidate}?$select=id,webUrl'
-            response = self._graph_request('get', full_url)
-            if response.status_code == 200:
-                payload = response.json()
-                payload['candidate'] = candidate
-                return payload
-            last_error = response
+            # Exitos y "no es un sitio" (400/404) se recuerdan; errores transitorios no
+            result = self._metadata_cache.get_or_load(
+                ('site', candidate.lower()),
+                lambda candidate=candidate: self._lookup_site_candidate(candidate),
+                cache_value=lambda value: value['status_code'] in (200, 400, 404),
+            )
+            if result['status_code'] == 200:
+                return dict(result['site'])
+            last_error = result['error']
 
         error_details = {'site_url': site_url}
         if last_error is not None:
-            try:
-                error_details['response'] = last_error.json()
-            except ValueError:
-                error_details['response'] = {'status_code': last_error.status_code, 'text': last_error.text}
+            error_details['response'] = last_error
 
         raise Exception(f"Unable to resolve site metadata: {error_details}")
 
@@ -212,10 +364,23 @@ class SharePointClient:
     def _resolve_sharepoint_download(self, sharepoint_path: str) -> Tuple[str, str]:
         split_info = self._split_sharepoint_path(sharepoint_path)
         candidate_path = split_info['host']
-        if split_info['segments_raw']:
-            candidate_path = f"{split_info['host']}/{'/'.join(split_info['segments_raw'])}"
-
-        site_info = self._resolve_site_info(candidate_path)
+        site_segments = split_info['segments_raw']
+        if len(site_segments) > 2:
+            # La ruta termina en biblioteca/.../archivo: esos dos niveles nunca son el sitio
+            site_segments = site_segments[:-2]
+        if site_segments:
+            candidate_path = f"{split_info['host']}/{'/'.join(site_segments)}"
+
+        # Otro archivo de la misma biblioteca ya resolvio el sitio
+        host_key = split_info['host'].lower()
+        site_info = None
+        for end_idx in range(len(split_info['segments_raw']), 0, -1):
+            prefix = '/'.join(split_info['segments_raw'][:end_idx]).lower()
+            site_info = self._metadata_cache.get(('library', host_key, prefix))
+            if site_info is not None:
+                break
+        if site_info is None:
+            site_info = self._resolve_site_info(candidate_path)
         site_id = site_info.get('id')
         if not site_id:
             raise Exception(f"Unable to determine site id for '{sharepoint_path}'")
@@ -248,6 +413,9 @@ class SharePointClient:
             available = [drive.get('name', '') for drive in drives]
             raise Exception(f"Document library '{library_segment}' not found. Available drives: {available}")
 
+        library_prefix = '/'.join(segments_raw[:site_segment_count + 1]).lower()
+        self._metadata_cache.put(('library', host_key, library_prefix), site_info)
+
         if not item_segments:
             raise Exception(f"The provided path does not include a file name: '{sharepoint_path}'")
 
@@ -274,11 +442,129 @@ class SharePointClient:
             - 'name': The name of the drive.
         """
         # Retrieve drive IDs and names associated with a site
-        drives_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives'
-        response = self._graph_request('get', drives_url)
-        drives = response.json().get('value', [])
-        return [{'id': drive['id'], 'name': drive.get('name', ''), 'webUrl': drive.get('webUrl', '')} for drive in drives]
+        def _load():
+            drives_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives'
+            response = self._graph_request('get', drives_url)
+            drives = response.json().get('value', [])
+            return [{'id': drive['id'], 'name': drive.get('name', ''), 'webUrl': drive.get('webUrl', '')} for drive in drives]
+
+        drives = self._metadata_cache.get_or_load(('drives', site_id), _load, cache_value=bool)
+        return [dict(drive) for drive in drives]
+
+
+    def graph_batch(self, sub_requests: List[Dict], max_rounds: int = 3) -> List[Dict]:
+        """
+        This function sends several Graph requests through the JSON $batch endpoint.
+
+        Sub-requests are grouped GRAPH_BATCH_LIMIT (20) per call; the ones throttled
+        with 429/503 are sent again after the largest Retry-After of the round.
+
+        Parameters:
+        sub_requests (list): Dictionaries with 'url' (absolute or relative to /v1.0) and
+            optional 'method' (default GET), 'headers' and 'body'.
+        max_rounds (int, optional): Extra rounds for throttled sub-requests. Defaults to 3.
+
+        Returns:
+        list: One dictionary per sub-request, in the same order, with the keys
+            'status', 'headers' and 'body'.
+        """
+        results: List[Optional[Dict]] = [None] * len(sub_requests)
+        pending = list(range(len(sub_requests)))
+        for round_index in range(max_rounds + 1):
+            throttled: List[int] = []
+            retry_after = 0.0
+            for start in range(0, len(pending), GRAPH_BATCH_LIMIT):
+                ids = pending[start:start + GRAPH_BATCH_LIMIT]
+                payload = {'requests': [self._batch_entry(i, sub_requests[i]) for i in ids]}
+                response = self._graph_request('post', f'{GRAPH_ROOT}/$batch', json=payload)
+                if response.status_code != 200:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = {'text': response.text}
+                    for i in ids:
+                        results[i] = {'status': response.status_code, 'headers': {}, 'body': body}
+                    continue
+                for entry in response.json().get('responses', []):
+                    i = int(entry['id'])
+                    status = int(entry.get('status', 0))
+                    headers = entry.get('headers') or {}
+                    results[i] = {'status': status, 'headers': headers, 'body': entry.get('body') or {}}
+                    if status in (429, 503) and round_index < max_rounds:
+                        throttled.append(i)
+                        try:
+                            retry_after = max(retry_after, float(headers.get('Retry-After', 1)))
+                        except (TypeError, ValueError):
+                            retry_after = max(retry_after, 1.0)
+            if not throttled:
+                break
+            time.sleep(min(retry_after, 30.0))
+            pending = sorted(throttled)
+        return [result or {'status': 0, 'headers': {}, 'body': {}} for result in results]
+
+    @staticmethod
+    def _batch_entry(index: int, sub_request: Dict) -> Dict:
+        url = sub_request['url']
+        if url.startswith(GRAPH_ROOT):
+            url = url[len(GRAPH_ROOT):]
+        entry = {'id': str(index), 'method': sub_request.get('method', 'GET').upper(), 'url': url}
+        if sub_request.get('headers'):
+            entry['headers'] = sub_request['headers']
+        if sub_request.get('body') is not None:
+            entry['body'] = sub_request['body']
+            entry.setdefault('headers', {}).setdefault('Content-Type', 'application/json')
+        return entry
+
+    def get_items_metadata(self, site_id, drive_id, item_ids: List[str], select: str = DRIVE_ITEM_SELECT) -> Dict[str, Optional[Dict]]:
+        """
+        This function retrieves the metadata of several drive items in batched requests.
+
+        Parameters:
+        site_id (str): The ID of the SharePoint site.
+        drive_id (str): The ID of the drive.
+        item_ids (list): The IDs of the items.
+        select (str, optional): $select projection of the returned fields.
 
+        Returns:
+        dict: Item ID -> metadata dictionary, or None if the item could not be read.
+        """
+        responses = self.graph_batch([
+            {'url': f'/sites/{site_id}/drives/{drive_id}/items/{item_id}?$select={select}'}
+            for item_id in item_ids
+        ])
+        return {
+            item_id: response['body'] if response['status'] == 200 else None
+            for item_id, response in zip(item_ids, responses)
+        }
+
+    def get_item_metadata(self, reference: str, select: str = DRIVE_ITEM_SELECT) -> Optional[Dict]:
+        """
+        This function retrieves the metadata of the file behind a download reference.
+
+        Parameters:
+        reference (str): SharePoint server-relative path or Graph '/content' URL, as accepted by download_file.
+        select (str, optional): $select projection of the returned fields.
+
+        Returns:
+        Optional[dict]: The driveItem metadata (including 'parentReference.driveId'), or None if
+            the reference does not address a drive item or the item could not be read.
+        """
+        url = reference.strip()
+        if not url.lower().startswith(('http://', 'https://')):
+            url, _ = self._resolve_sharepoint_download(url)
+        if not urllib.parse.urlparse(url).netloc.endswith('graph.microsoft.com'):
+            return None
+        base = url.split('?', 1)[0]
+        if base.endswith(':/content'):
+            base = base[:-len(':/content')]
+        elif base.endswith('/content'):
+            base = base[:-len('/content')]
+        else:
+            return None
+        response = self._graph_request('get', f'{base}?$select={select}')
+        if response.status_code != 200:
+            return None
+        return response.json()
 
     def get_folder_id(self, site_id, drive_id, folder_path):
         """
@@ -292,32 +578,77 @@ class SharePointClient:
         Returns:
         str: The ID of the specified subfolder.
         """
+        # Direccionamiento por ruta: una sola llamada en lugar de una por segmento
+        segments = [urllib.parse.quote(part) for part in folder_path.split('/') if part]
+        if not segments:
+            return 'root'
+        folder_url = (
+            f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/root:/{'/'.join(segments)}"
+            "?$select=id,folder"
+        )
+        response = self._graph_request('get', folder_url)
+        if response.status_code != 200:
+            return None
+        item = response.json()
+        if 'folder' not in item:
+            # If the path points to a file, there is no folder to return
+            return None
+        return item['id']
+
+    @staticmethod
+    def _format_drive_item(item: Dict) -> Dict:
+        path_parts = item.get('parentReference', {}).get('path', '').split('root:')
+        path = path_parts[1] if len(path_parts) > 1 else ''
+        full_path = f"{path}/{item['name']}" if path else item['name']
+        return {
+            'id': item['id'],
+            'name': item['name'],
+            'type': 'folder' if 'folder' in item else 'file',
+            'mimeType': item['file'].get('mimeType', '') if 'file' in item else '',
+            'uri': item.get('@microsoft.graph.downloadUrl', ''),
+            'path': path,
+            'fullpath': full_path,
+            'filename': item['name'],
+            'url': item.get('webUrl', ''),
+            'size': item.get('size', 0),
+            'eTag': item.get('eTag', ''),
+            'cTag': item.get('cTag', ''),
+        }
 
-        # Split the folder path into individual folders
-        folders = folder_path.split('/')
-
-        # Start with the root folder
-        current_folder_id = 'root'
-
-        # Loop through each folder in the path
-        for folder_name in folders:
-            # Build the URL to access the contents of the current folder
-            folder_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{current_folder_id}/children'
-            response = self._graph_request('get', folder_url)
-            items_data = response.json()
-
-            # Loop through the items and find the folder
-            for item in items_data['value']:
-                if 'folder' in item and item['name'] == folder_name:
-                    # Update the current folder ID and break the loop
-                    current_folder_id = item['id']
-                    break
-            else:
-                # If the folder was not found, return None
-                return None
+    def list_folders_contents(self, site_id, drive_id, folder_ids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        This function lists the contents of several folders, batching their page requests.
+
+        Parameters:
+        site_id (str): The ID of the site.
+        drive_id (str): The ID of the drive.
+        folder_ids (list): The IDs of the folders.
 
-        # Return the ID of the final folder in the path
-        return current_folder_id
+        Returns:
+        dict: Folder ID -> list of item dictionaries (see list_folder_contents).
+        """
+        contents: Dict[str, List[Dict]] = {folder_id: [] for folder_id in folder_ids}
+        pending = {
+            folder_id: (
+                f'/sites/{site_id}/drives/{drive_id}/items/{folder_id}/children'
+                f'?$select={DRIVE_ITEM_SELECT}&$top={GRAPH_PAGE_SIZE}'
+            )
+            for folder_id in contents
+        }
+        while pending:
+            folder_ids_round = list(pending)
+            responses = self.graph_batch([{'url': pending[folder_id]} for folder_id in folder_ids_round])
+            pending = {}
+            for folder_id, response in zip(folder_ids_round, responses):
+                if response['status'] != 200:
+                    print(f"Failed to list folder {folder_id}: {response['status']} - {response['body']}")
+                    continue
+                body = response['body']
+                contents[folder_id].extend(self._format_drive_item(item) for item in body.get('value', []))
+                next_link = body.get('@odata.nextLink')
+                if next_link:
+                    pending[folder_id] = next_link
+        return contents
 
     def list_folder_contents(self, site_id, drive_id, folder_id='root'):
         """
@@ -330,37 +661,10 @@ class SharePointClient:
 
         Returns:
         list: A list of dictionaries. Each dictionary contains details about an item in the folder.
-            The details include 'id', 'name', 'type', 'mimeType', 'uri', 'path', 'fullpath', 'filename', and 'url'.
+            The details include 'id', 'name', 'type', 'mimeType', 'uri', 'path', 'fullpath', 'filename', 'url',
+            'size', 'eTag' and 'cTag'.
         """
-        items_list = []
-        folder_contents_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{folder_id}/children'
-        while folder_contents_url:
-                contents_response = self._graph_request('get', folder_contents_url)
-                folder_contents = contents_response.json()
-                for item in folder_contents.get('value', []):
-                    path_parts = item['parentReference']['path'].split('root:')
-                    path = path_parts[1] if len(path_parts) > 1 else ''
-                    full_path = f"{path}/{item['name']}" if path else item['name']
-                    
-                    # Modifiez le site_web_url pour pointer vers l'élément spécifique
-                    item_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{item["id"]}'
-                    response = self._graph_request('get', item_url)
-                    item_data = response.json()
-                    item_web_url = item_data.get('webUrl', '')
-
-                    items_list.append({
-                        'id': item['id'],
-                        'name': item['name'],
-                        'type': 'folder' if 'folder' in item else 'file',
-                        'mimeType': item['file']['mimeType'] if 'file' in item else '',
-                        'uri': item.get('@microsoft.graph.downloadUrl', ''),
-                        'path': path,
-                        'fullpath': full_path,
-                        'filename': item['name'],
-                        'url': item_web_url
-                    })
-                folder_contents_url = folder_contents.get('@odata.nextLink')
-        return items_list
+        return self.list_folders_contents(site_id, drive_id, [folder_id])[folder_id]
 
     
     def download_file(self, download_url, local_path, file_name: Optional[str] = None):
@@ -371,6 +675,9 @@ class SharePointClient:
         download_url (str): Absolute download URL or SharePoint server-relative path.
         local_path (str): Local directory where the file will be stored.
         file_name (Optional[str]): Override for the saved file name.
+
+        Returns:
+        Optional[str]: The local path of the saved file, or None if the download failed.
         """
         if not download_url:
             raise ValueError("download_url must not be empty")
@@ -394,18 +701,21 @@ class SharePointClient:
         if parsed_url.netloc.endswith('graph.microsoft.com'):
             response = self._graph_request('get', resolved_url, stream=True)
         else:
-            response = requests.get(resolved_url, stream=True)
-        if response.status_code == 200:
-            full_path = os.path.join(local_path, resolved_name)
-            full_path = get_long_path(full_path)
-            ensure_directory_exists(full_path)
-            with open(full_path, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        file.write(chunk)
-            return
+            response = self.session.get(resolved_url, stream=True)
+        # El cierre devuelve la conexion al pool aunque la descarga falle
+        with response:
+            if response.status_code == 200:
+                full_path = os.path.join(local_path, resolved_name)
+                full_path = get_long_path(full_path)
+                ensure_directory_exists(full_path)
+                with open(full_path, 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if chunk:
+                            file.write(chunk)
+                return full_path
 
         print(f"Failed to download {resolved_name}: {response.status_code} - {response.reason}")
+        return None
 
 
     def download_folder_contents(self, site_id, drive_id, folder_id, local_folder_path, level=0):
@@ -417,28 +727,82 @@ class SharePointClient:
         drive_id (str): The ID of the drive on the SharePoint site.
         folder_id (str): The ID of the folder whose contents are to be downloaded.
         local_folder_path (str): The local path where the downloaded files will be saved.
-        level (int, optional): The current level of recursion (folder depth). Defaults to 0 for the root folder.
+        level (int, optional): Kept for compatibility; the tree is walked by download_folder_parallel.
+
+        Returns:
+        dict: The transfer report of download_folder_parallel.
+        """
+        return self.download_folder_parallel(site_id, drive_id, folder_id, local_folder_path)
+
+    def download_folder_parallel(self, site_id, drive_id, folder_id, local_folder_path,
+                                 max_workers: Optional[int] = None, preserve_drive_path: bool = False) -> Dict:
+        """
+        This function mirrors a folder tree, discovering it breadth-first and downloading files in parallel.
+
+        Each level of the tree is listed with batched requests; its files are handed to a
+        bounded pool of transfers as soon as they are discovered, while the next level is listed.
+
+        Parameters:
+        site_id (str): The ID of the SharePoint site.
+        drive_id (str): The ID of the drive on the SharePoint site.
+        folder_id (str): The ID of the folder to mirror.
+        local_folder_path (str): The local path where the tree will be written.
+        max_workers (int, optional): Concurrent file transfers. Defaults to SHAREPOINT_DOWNLOAD_WORKERS (8).
+        preserve_drive_path (bool, optional): Write files under their drive path instead of
+            relative to the mirrored folder. Defaults to False.
 
         Returns:
-        None. The function saves the downloaded files to the specified local path and prints a success message for each downloaded file.
+        dict: 'files', 'failed' (list of SharePoint paths), 'bytes', 'seconds' and 'mb_per_second'.
         """
-        # Recursively download all contents from a folder
-        folder_contents_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{folder_id}/children'
-        contents_response = self._graph_request('get', folder_contents_url)
-        folder_contents = contents_response.json()
-
-        if 'value' in folder_contents:
-            for item in folder_contents['value']:
-                if 'folder' in item:
-                    new_path = os.path.join(local_folder_path, item['name'])
-                    if not os.path.exists(new_path):
-                        os.makedirs(new_path)
-                    self.download_folder_contents(site_id, drive_id, item['id'], new_path,
-                                                  level + 1)  # Recursive call for subfolders
-                elif 'file' in item:
-                    file_name = item['name']
-                    file_download_url = f"{self.resource_url}/v1.0/sites/{site_id}/drives/{drive_id}/items/{item['id']}/content"
-                    self.download_file(file_download_url, local_folder_path, file_name)
+        workers = max(1, max_workers or int(os.getenv("SHAREPOINT_DOWNLOAD_WORKERS", "8")))
+        started = time.monotonic()
+        report = {'files': 0, 'failed': [], 'bytes': 0}
+        report_lock = threading.Lock()
+
+        def _download(item, target_dir):
+            url = item['uri'] or f"{GRAPH_ROOT}/sites/{site_id}/drives/{drive_id}/items/{item['id']}/content"
+            try:
+                saved = self.download_file(url, target_dir, item['name'])
+            except Exception as e:
+                print(f"An error occurred while downloading {item['fullpath']}: {e}")
+                saved = None
+            with report_lock:
+                if saved:
+                    report['files'] += 1
+                    report['bytes'] += os.path.getsize(saved)
+                else:
+                    report['failed'].append(item['fullpath'])
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sharepoint-download') as pool:
+            level = {folder_id: local_folder_path}
+            while level:
+                contents = self.list_folders_contents(site_id, drive_id, list(level))
+                next_level = {}
+                for parent_id, items in contents.items():
+                    for item in items:
+                        if preserve_drive_path:
+                            target_dir = os.path.normpath(os.path.join(local_folder_path, item['path'].lstrip('/')))
+                        else:
+                            target_dir = level[parent_id]
+                        if item['type'] == 'folder':
+                            child_dir = os.path.join(target_dir, item['name'])
+                            os.makedirs(get_long_path(child_dir), exist_ok=True)
+                            next_level[item['id']] = child_dir
+                        else:
+                            os.makedirs(get_long_path(target_dir), exist_ok=True)
+                            futures.append(pool.submit(_download, item, target_dir))
+                level = next_level
+            wait(futures)
+
+        seconds = time.monotonic() - started
+        report['seconds'] = round(seconds, 2)
+        report['mb_per_second'] = round(report['bytes'] / (1024 * 1024) / seconds, 2) if seconds else 0.0
+        print(
+            f"Downloaded {report['files']} files ({report['bytes'] / (1024 * 1024):.1f} MB) in "
+            f"{report['seconds']} s - {report['mb_per_second']} MB/s, {len(report['failed'])} failed"
+        )
+        return report
     
     def download_file_contents(self, site_id, drive_id, file_id, local_save_path):
         """
@@ -455,7 +819,10 @@ class SharePointClient:
         """
         try:
             # Get the file details
-            file_url = f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{file_id}'
+            file_url = (
+                f'https://graph.microsoft.com/v1.0/sites/{site_id}/drives/{drive_id}/items/{file_id}'
+                '?$select=name,parentReference,@microsoft.graph.downloadUrl'
+            )
             response = self._graph_request('get', file_url)
             file_data = response.json()
 
@@ -514,24 +881,7 @@ class SharePointClient:
             local_path (str): The local path where the downloaded files should be stored.
         """
         try:
-            folder_contents = self.list_folder_contents(site_id, drive_id, folder_id)
-            for item in folder_contents:
-                sharepoint_path = item['path']
-                sharepoint_path = sharepoint_path.lstrip('/')
-                new_local_path = os.path.normpath(os.path.join(local_path, sharepoint_path))
-                # Ensure the local directory exists before downloading
-                #"data2\\BASIC STUDIES\\1. Cross Category
-                #os.makedirs("data2\\BASIC STUDIES\\1. Cross Category", exist_ok=True)
-                
-                os.makedirs(new_local_path, exist_ok=True)
-                if item['type'] == 'folder':
-                    self.recursive_download(site_id, drive_id, item['id'], local_path)
-                elif item['type'] == 'file':
-                    # os.makedirs(os.path.dirname(new_local_path), exist_ok=True)
-                    self.download_file(item['uri'], new_local_path, item['name'])
+            # Los archivos conservan su ruta dentro del drive bajo local_path
+            return self.download_folder_parallel(site_id, drive_id, folder_id, local_path, preserve_drive_path=True)
         except Exception as e:
-            print(f"An error occurred while recursively downloading files:{new_local_path} {e}")
-
-
-
-
+            print(f"An error occurred while recursively downloading files:{local_path} {e}")
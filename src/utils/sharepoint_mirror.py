@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIRROR_DIR = os.path.join(os.path.expanduser("~"), ".cache", "valida", "sharepoint")
+
+
+class SharePointMirror:
+    """Copia local persistente de archivos SharePoint.
+
+    Cada archivo se guarda por (drive id, item id) junto a su eTag, cTag y
+    tamano; se reutiliza mientras los metadatos actuales del item coincidan,
+    asi que un archivo sin cambios no se vuelve a descargar entre corridas.
+    Las copias nuevas se escriben en un temporal y se publican con
+    ``os.replace``: un lector que ya abrio (o mapeo) la version anterior la
+    sigue leyendo completa. Cuando el total supera ``max_bytes`` se expulsan
+    por ultimo acceso, respetando las usadas en los ultimos ``grace_seconds``.
+    """
+
+    def __init__(
+        self,
+        mirror_dir: str = DEFAULT_MIRROR_DIR,
+        max_bytes: int = 2048 * 1024 * 1024,
+        grace_seconds: float = 300.0,
+    ):
+        self.mirror_dir = mirror_dir
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        os.makedirs(self.mirror_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def _entry_paths(self, drive_id: str, item_id: str) -> tuple[str, str]:
+        key = hashlib.sha256(f"{drive_id}:{item_id}".encode("utf-8")).hexdigest()
+        directory = os.path.join(self.mirror_dir, key[:2])
+        return os.path.join(directory, f"{key}.bin"), os.path.join(directory, f"{key}.json")
+
+    @staticmethod
+    def _identity(metadata: dict[str, Any]) -> Optional[tuple[str, str]]:
+        drive_id = (metadata.get("parentReference") or {}).get("driveId")
+        item_id = metadata.get("id")
+        if not drive_id or not item_id:
+            return None
+        return drive_id, item_id
+
+    @staticmethod
+    def _matches(entry: dict[str, Any], metadata: dict[str, Any]) -> bool:
+        if entry.get("size") != metadata.get("size"):
+            return False
+        # El cTag solo cambia con el contenido; el eTag tambien con los metadatos
+        if metadata.get("cTag") and entry.get("cTag"):
+            return entry["cTag"] == metadata["cTag"]
+        return bool(metadata.get("eTag")) and entry.get("eTag") == metadata["eTag"]
+
+    def lookup(self, metadata: dict[str, Any]) -> Optional[str]:
+        """Ruta de la copia local si sigue vigente para los metadatos del item."""
+        identity = self._identity(metadata)
+        if identity is None:
+            return None
+        data_path, meta_path = self._entry_paths(*identity)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                entry = json.load(fh)
+            if not self._matches(entry, metadata) or os.path.getsize(data_path) != entry["size"]:
+                return None
+            os.utime(data_path, None)
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+        return data_path
+
+    def fetch(
+        self,
+        metadata: dict[str, Any],
+        download: Callable[[str, str], Optional[str]],
+    ) -> Optional[str]:
+        """Copia vigente del item, descargandola con ``download(dir, nombre)`` si hace falta."""
+        identity = self._identity(metadata)
+        if identity is None:
+            return None
+        cached = self.lookup(metadata)
+        if cached is not None:
+            return cached
+
+        data_path, meta_path = self._entry_paths(*identity)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(data_path, threading.Lock())
+        # Un solo hilo descarga cada item; los demas reutilizan su copia
+        with key_lock:
+            cached = self.lookup(metadata)
+            if cached is not None:
+                return cached
+            directory = os.path.dirname(data_path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                saved = download(directory, os.path.basename(tmp_path))
+                if not saved or os.path.getsize(tmp_path) != metadata.get("size"):
+                    raise OSError(f"descarga incompleta de {metadata.get('name')}")
+                os.replace(tmp_path, data_path)
+                self._write_entry(meta_path, identity, metadata)
+            except Exception:
+                self._remove(tmp_path)
+                raise
+        self.evict()
+        return data_path
+
+    def _write_entry(
+        self, meta_path: str, identity: tuple[str, str], metadata: dict[str, Any]
+    ) -> None:
+        entry = {
+            "drive_id": identity[0],
+            "item_id": identity[1],
+            "name": metadata.get("name"),
+            "size": metadata.get("size"),
+            "eTag": metadata.get("eTag"),
+            "cTag": metadata.get("cTag"),
+            "stored_at": time.time(),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh, ensure_ascii=False)
+            os.replace(tmp_path, meta_path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    def evict(self) -> None:
+        """Recorta el espejo hasta ``max_bytes`` por orden de ultimo acceso."""
+        if not self.max_bytes:
+            return
+        entries: list[tuple[float, int, str]] = []
+        total = 0
+        for root, _, files in os.walk(self.mirror_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        now = time.time()
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if now - mtime < self.grace_seconds:
+                # Copias recien entregadas: un lector puede estar por abrirlas
+                continue
+            self._remove(path[: -len(".bin")] + ".json")
+            self._remove(path)
+            total -= size
+            logger.debug("Espejo SharePoint: expulsado %s (%d bytes)", path, size)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
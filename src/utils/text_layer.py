@@ -0,0 +1,229 @@
+import logging
+import re
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+from PyPDF2 import PdfReader
+
+from src.config.models.set_3 import Set3ExtractionModel
+
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = r"[-+]?\d[\d.,]*(?:[eE][-+]?\d+)?"
+
+
+def extract_page_texts(reader: PdfReader) -> list[str]:
+    """Texto embebido de cada pagina ("" si la pagina no tiene capa de texto)."""
+    texts: list[str] = []
+    for index, page in enumerate(reader.pages):
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception as exc:
+            logger.debug("No se pudo extraer texto de la pagina %d: %s", index + 1, exc)
+            texts.append("")
+    return texts
+
+
+def has_usable_text(text: str, min_chars: int = 200) -> bool:
+    """Heuristica: suficientes caracteres alfanumericos para no requerir OCR."""
+    if not text:
+        return False
+    alnum = sum(1 for ch in text if ch.isalnum())
+    return alnum >= min_chars and alnum / max(len(text), 1) >= 0.4
+
+
+def parse_number(raw: str) -> Optional[float]:
+    """Convierte numeros con separador decimal '.' o ',' y miles opcionales."""
+    value = raw.strip().rstrip(".,")
+    if not value:
+        return None
+    if "," in value and "." in value:
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif value.count(",") > 1:
+        value = value.replace(",", "")
+    elif "," in value:
+        head, _, tail = value.partition(",")
+        digits = head.lstrip("+-")
+        if len(tail) == 3 and digits.isdigit() and digits != "0":
+            value = value.replace(",", "")
+        else:
+            value = value.replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _find_value(block: str, *labels: str) -> Optional[float]:
+    for label in labels:
+        match = re.search(rf"{label}\s*[:=]?\s*({_NUMBER})", block, re.IGNORECASE)
+        if match:
+            return parse_number(match.group(1))
+    return None
+
+
+_LINEALIDAD_ROW = re.compile(
+    rf"^(?P<nivel>.*[A-Za-z].*?)\s+(?P<conc>{_NUMBER})\s+(?P<resp>{_NUMBER})\s+(?P<rf>{_NUMBER})\s*$"
+)
+_ANALYTE = re.compile(
+    r"^\s*(?:analyte|component|componente|activo|name|nombre)\s*[:\-]\s*(.+?)\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SECTION_END = re.compile(
+    r"intercept\w*\s+as\s+percentage[^\n]*\n|determination\s+coefficient[^\n]*\n",
+    re.IGNORECASE,
+)
+
+
+def _split_linealidad_sections(text: str) -> list[tuple[int, int]]:
+    """Rangos (inicio, fin) de ``text`` que contienen una seccion de linealidad."""
+    spans: list[tuple[int, int]] = []
+    start = 0
+    for match in _SECTION_END.finditer(text + "\n"):
+        tail = text[match.end():match.end() + 400]
+        # Si el porcentaje del intercepto sigue a r2, la seccion termina despues
+        if match.group(0).lower().startswith("determination") and re.search(
+            r"intercept\w*\s+as\s+percentage", tail, re.IGNORECASE
+        ):
+            continue
+        spans.append((start, min(match.end(), len(text))))
+        start = match.end()
+    return [
+        (begin, end) for begin, end in spans
+        if re.search(r"\bslope\b", text[begin:end], re.IGNORECASE)
+    ]
+
+
+def _parse_linealidad_section(section: str) -> Optional[dict[str, Any]]:
+    """Activo completo de la seccion (nombre y al menos una fila) o ``None``."""
+    pendiente = _find_value(section, r"\bslope\b")
+    intercepto = _find_value(section, r"\bintercept\b(?!\s+as)")
+    r = _find_value(section, r"correlation\s+coefficient\s*\(r\)")
+    r2 = _find_value(section, r"determination\s+coefficient\s*\(r2\)", r"\br2\b")
+    if pendiente is None or intercepto is None or (r is None and r2 is None):
+        return None
+
+    filas = []
+    for line in section.splitlines():
+        row = _LINEALIDAD_ROW.match(line.strip())
+        if not row or re.search(r"slope|intercept|coefficient|rsd", line, re.IGNORECASE):
+            continue
+        conc, resp, rf = (parse_number(row.group(k)) for k in ("conc", "resp", "rf"))
+        if None in (conc, resp, rf):
+            continue
+        filas.append(
+            {
+                "nivel": row.group("nivel").strip(),
+                "concentracion": conc,
+                "area_pico": resp,
+                "factor_respuesta": rf,
+            }
+        )
+
+    nombre = _ANALYTE.search(section)
+    if not nombre or not filas:
+        return None
+    return {
+        "nombre": nombre.group(1),
+        "linealidad_sistema": filas,
+        "rsd_factor": _find_value(section, r"rsd\s+response\s+factor"),
+        "pendiente": pendiente,
+        "intercepto": intercepto,
+        "r": r,
+        "r2": r2,
+        "porcentaje_intercepto": _find_value(
+            section, r"intercept\w*\s+as\s+percentage\s+of\s+y\s+at\s+100\s*%"
+        ),
+    }
+
+
+def extract_set3_linealidad(
+    pages: list[tuple[int, str]],
+) -> Optional[tuple[dict[str, Any], list[int]]]:
+    """Parser local del reporte LIMS de linealidad (campos de Set3ExtractionModel).
+
+    ``pages`` son pares (indice, texto). Devuelve la anotacion y las paginas
+    que consumio por completo; si alguna seccion con ``slope`` no se pudo
+    leer entera devuelve ``None`` y el documento va completo al OCR.
+    """
+    text = ""
+    bounds: list[tuple[int, int, int]] = []
+    for index, page_text in pages:
+        begin = len(text)
+        text += page_text + "\n"
+        bounds.append((index, begin, len(text)))
+
+    activos: list[dict[str, Any]] = []
+    covered: list[tuple[int, int]] = []
+    for begin, end in _split_linealidad_sections(text):
+        activo = _parse_linealidad_section(text[begin:end])
+        if activo is None:
+            return None
+        activos.append(activo)
+        covered.append((begin, end))
+    if not activos:
+        return None
+
+    consumed: list[int] = []
+    for index, begin, end in bounds:
+        rest: list[str] = []
+        cursor = begin
+        for b, e in covered:
+            if e <= cursor or b >= end:
+                continue
+            rest.append(text[cursor:b])
+            cursor = max(cursor, e)
+        if cursor == begin:
+            continue
+        rest.append(text[cursor:end])
+        # Texto de la pagina fuera de las secciones leidas: no debe traer datos de linealidad
+        if re.search(r"slope|intercept|coefficient", "".join(rest), re.IGNORECASE):
+            continue
+        consumed.append(index)
+    if not consumed:
+        return None
+    return {"activos_linealidad": activos}, consumed
+
+
+# Modelos de extraccion con una ruta local equivalente a la anotacion OCR
+LOCAL_EXTRACTORS: dict[
+    type[BaseModel],
+    Callable[[list[tuple[int, str]]], Optional[tuple[dict[str, Any], list[int]]]],
+] = {
+    Set3ExtractionModel: extract_set3_linealidad,
+}
+
+
+def extract_from_text_layer(
+    page_texts: list[str],
+    extraction_model: Optional[type[BaseModel]],
+    min_chars: int = 200,
+) -> Optional[tuple[dict[str, Any], list[int]]]:
+    """Aplica el extractor local sobre las paginas digitales.
+
+    Devuelve la anotacion (validada contra ``extraction_model``) y los indices
+    de pagina que el extractor consumio; las demas paginas van al OCR. Con
+    ``None`` (sin extractor o sin nada util) el documento completo va al OCR.
+    """
+    extractor = LOCAL_EXTRACTORS.get(extraction_model)
+    if extractor is None:
+        return None
+
+    text_pages = [i for i, text in enumerate(page_texts) if has_usable_text(text, min_chars)]
+    if not text_pages:
+        return None
+
+    result = extractor([(i, page_texts[i]) for i in text_pages])
+    if not result:
+        return None
+    annotation, consumed = result
+    try:
+        extraction_model(**annotation)
+    except Exception as exc:
+        logger.info("Extraccion local descartada para %s: %s", extraction_model.__name__, exc)
+        return None
+    return annotation, consumed
@@ -0,0 +1,181 @@
+import json
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Optional
+
+import pytest
+from PyPDF2 import PdfWriter
+
+from src.graph.state import FileDescriptor
+from src.utils.chunk_ledger import ChunkLedger
+from src.utils.ocr_cache import OCRResultCache
+from src.utils.rate_governor import OCRRateGovernor
+from src.utils.sharepoint_api import SharePointClient
+from src.utils.sharepoint_mirror import SharePointMirror
+
+
+@pytest.fixture
+def ocr_response():
+    """Respuesta OCR minima: ``document_annotation`` serializado como lo devuelve Mistral."""
+
+    def _build(annotation: Any) -> dict:
+        return {"document_annotation": json.dumps(annotation)}
+
+    return _build
+
+
+@pytest.fixture
+def ocr_cache(tmp_path) -> OCRResultCache:
+    return OCRResultCache(cache_dir=str(tmp_path / "ocr"))
+
+
+@pytest.fixture
+def sharepoint_mirror(tmp_path) -> SharePointMirror:
+    return SharePointMirror(mirror_dir=str(tmp_path / "mirror"))
+
+
+@pytest.fixture
+def chunk_ledger(tmp_path) -> ChunkLedger:
+    return ChunkLedger(str(tmp_path / "ledger.sqlite3"))
+
+
+class FakeOCR:
+    """Sustituto de ``client.ocr``: registra cada solicitud y delega en ``handler``."""
+
+    def __init__(self, handler: Callable[[dict], Awaitable[Any]]):
+        self.handler = handler
+        self.calls: list[dict] = []
+
+    async def process_async(self, **request):
+        self.calls.append(request)
+        return await self.handler(request)
+
+
+@pytest.fixture
+def fake_ocr():
+    """Construye un ``FakeOCR``; sin ``handler`` responde ``{"items": [1]}``."""
+
+    async def _default(request: dict) -> Any:
+        return SimpleNamespace(document_annotation=json.dumps({"items": [1]}), pages=[])
+
+    return lambda handler=None: FakeOCR(handler or _default)
+
+
+@pytest.fixture
+def index_node(tmp_path, monkeypatch):
+    """IndexNode aislado en ``tmp_path``, sin capa de texto, seleccion ni empaquetado."""
+    from src.graph.nodes.index_node import IndexNode
+
+    for name, value in {
+        "MISTRAL_API_KEY": "test",
+        "OCR_CACHE_DIR": str(tmp_path / "ocr"),
+        "OCR_LEDGER_PATH": str(tmp_path / "ledger.sqlite3"),
+        "PAGE_RANGE_MEMORY_PATH": str(tmp_path / "pages.json"),
+        "SHAREPOINT_MIRROR_DIR": str(tmp_path / "mirror"),
+        "TEXT_LAYER_FAST_PATH": "false",
+        "PAGE_SELECTION_ENABLED": "false",
+        "OCR_PACK_SMALL_DOCUMENTS": "false",
+        "OCR_MAX_RETRIES": "0",
+    }.items():
+        monkeypatch.setenv(name, value)
+    node = IndexNode()
+    # Gobernador propio: los 429/5xx simulados no afectan al resto de las pruebas
+    node.governor = OCRRateGovernor(rate_per_second=0)
+    node.files_governor = OCRRateGovernor(rate_per_second=0)
+    node.chat_governor = OCRRateGovernor(rate_per_second=0)
+    return node
+
+
+@pytest.fixture
+def blank_pdf(tmp_path):
+    """Escribe un PDF de ``pages`` paginas en blanco y devuelve su ``FileDescriptor``."""
+    written: list[str] = []
+
+    def _build(pages: int, name: str = "") -> FileDescriptor:
+        path = tmp_path / (name or f"doc{len(written)}.pdf")
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(612, 792)
+        with open(path, "wb") as fh:
+            writer.write(fh)
+        written.append(str(path))
+        return FileDescriptor(name=path.name, url=str(path), size=path.stat().st_size)
+
+    return _build
+
+
+class FakeResponse:
+    """Respuesta HTTP minima con la interfaz de ``requests.Response`` que usa el cliente."""
+
+    def __init__(
+        self,
+        status_code: int = 200,
+        json_body: Any = None,
+        content: bytes = b"",
+        headers: Optional[dict] = None,
+    ):
+        self.status_code = status_code
+        self._json = json_body
+        self.content = content
+        self.headers = headers or {}
+        self.reason = "OK" if status_code < 400 else "Error"
+        self.text = json.dumps(json_body) if json_body is not None else ""
+
+    def json(self) -> Any:
+        if self._json is None:
+            raise ValueError("sin cuerpo JSON")
+        return self._json
+
+    def iter_content(self, chunk_size: int = 8192):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class FakeSession:
+    """Sustituto de ``requests.Session``: ``handler(method, url, kwargs)`` responde."""
+
+    def __init__(self, handler: Callable[[str, str, dict], FakeResponse]):
+        self.handler = handler
+        self.requests: list[tuple[str, str, dict]] = []
+
+    def request(self, method: str, url: str, **kwargs) -> FakeResponse:
+        method = method.upper()
+        self.requests.append((method, url, kwargs))
+        if "login.microsoftonline.com" in url:
+            return FakeResponse(json_body={"access_token": "token", "expires_in": 3600})
+        return self.handler(method, url, kwargs)
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> FakeResponse:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def http_response():
+    """Construye respuestas ``FakeResponse`` para los handlers de ``sharepoint_client``."""
+    return FakeResponse
+
+
+@pytest.fixture
+def sharepoint_client(monkeypatch):
+    """Construye un ``SharePointClient`` cuyo ``session`` es un ``FakeSession``."""
+
+    def _build(handler: Callable[[str, str, dict], FakeResponse]) -> SharePointClient:
+        session = FakeSession(handler)
+        monkeypatch.setattr(SharePointClient, "_build_session", staticmethod(lambda *a: session))
+        return SharePointClient("tenant", "client", "secret", "https://graph.microsoft.com")
+
+    return _build
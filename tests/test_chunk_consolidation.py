@@ -0,0 +1,79 @@
+from src.utils.chunk_consolidation import ChunkConsolidator, parse_annotation
+
+
+def _concat(target: dict, source: dict) -> None:
+    target.setdefault("items", []).extend(source.get("items", []))
+
+
+def test_out_of_order_chunks_merge_in_page_order(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.expect([0, 8, 16])
+
+    consolidator.add(16, ocr_response({"items": [3]}))
+    consolidator.add(8, ocr_response({"items": [2]}))
+    assert consolidator.data == {}
+    assert consolidator.pending == 2
+
+    consolidator.add(0, ocr_response({"items": [1]}))
+    assert consolidator.data == {"items": [1, 2, 3]}
+    assert consolidator.pending == 0
+    assert consolidator.merged == 3
+
+
+def test_failed_chunk_releases_the_following_ones(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.expect([0, 8])
+
+    consolidator.add(8, ocr_response({"items": [2]}))
+    consolidator.add(0, None)
+
+    assert consolidator.data == {"items": [2]}
+    assert consolidator.merged == 1
+
+
+def test_late_expectation_still_orders_the_merge(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.expect([4])
+    consolidator.add(4, ocr_response({"items": [2]}))
+    consolidator.expect([0])
+    consolidator.add(0, ocr_response({"items": [1]}))
+
+    # Una posicion registrada tarde no reordena lo que ya se fusiono
+    assert consolidator.data == {"items": [2, 1]}
+
+
+def test_positions_registered_up_front_keep_page_order(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.expect([0, 4])
+    consolidator.add(4, ocr_response({"items": [2]}))
+    consolidator.add(0, {"document_annotation": {"items": [1]}})
+
+    assert consolidator.data == {"items": [1, 2]}
+
+
+def test_finish_merges_unexpected_arrivals_in_order(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.add(9, ocr_response({"items": [3]}))
+    consolidator.add(1, ocr_response({"items": [1]}))
+    consolidator.expect([0])
+
+    assert consolidator.finish() == {"items": [1, 3]}
+
+
+def test_unparseable_annotation_counts_as_failed(ocr_response):
+    consolidator = ChunkConsolidator(_concat)
+    consolidator.expect([0, 1])
+    consolidator.add(0, {"document_annotation": "{no es json"})
+    consolidator.add(1, ocr_response({"items": [2]}))
+
+    assert consolidator.data == {"items": [2]}
+
+
+def test_parse_annotation_accepts_objects_dicts_and_strings():
+    class Respuesta:
+        document_annotation = '{"a": 1}'
+
+    assert parse_annotation(Respuesta()) == {"a": 1}
+    assert parse_annotation({"document_annotation": {"a": 1}}) == {"a": 1}
+    assert parse_annotation(None) is None
+    assert parse_annotation({"document_annotation": ""}) is None
@@ -0,0 +1,158 @@
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from src.utils.chunk_ledger import ChunkLedger
+
+
+class Items(BaseModel):
+    items: list[int] = []
+
+
+def test_completed_chunks_survive_a_restart(chunk_ledger):
+    chunk_ledger.record_success("k1", "doc", "1-8", "s", 8, 1600.0, {"document_annotation": "{}"})
+    chunk_ledger.record_failure("k2", "doc", "9-16", "s", 8)
+
+    # Nueva corrida tras una caida: solo falta el chunk fallido
+    resumed = ChunkLedger(chunk_ledger.path)
+    assert resumed.completed("k1") == {"document_annotation": "{}"}
+    assert resumed.completed("k2") is None
+
+
+def test_empty_annotation_counts_as_completed(chunk_ledger):
+    chunk_ledger.record_success("k", "doc", "1-8", "s", 8, 900.0, {"document_annotation": None})
+
+    assert chunk_ledger.completed("k") == {"document_annotation": None}
+
+
+def test_cache_backed_success_stores_no_response(chunk_ledger):
+    chunk_ledger.record_success("k", "doc", "1-8", "s", 8, 900.0, None)
+
+    assert chunk_ledger.completed("k") is None
+    assert chunk_ledger.latency_history() == [(900.0, 8)]
+
+
+def test_failures_record_attempts_and_error_class(chunk_ledger):
+    assert chunk_ledger.record_failure("k", "doc", "1-8", "s", 8, transient=True) == 1
+    assert chunk_ledger.record_failure("k", "doc", "1-8", "s", 8, transient=False) == 2
+    error = chunk_ledger._conn.execute("SELECT error FROM chunks WHERE key = 'k'").fetchone()
+    assert error == ("permanent",)
+
+    chunk_ledger.record_success("k", "doc", "1-8", "s", 8, 900.0, {"document_annotation": "{}"})
+    assert chunk_ledger._conn.execute("SELECT error FROM chunks").fetchone() == (None,)
+
+
+def test_release_responses_keeps_latency_history(chunk_ledger):
+    chunk_ledger.record_success("k1", "doc", "1-8", "s", 8, 1600.0, {"document_annotation": "{}"})
+    chunk_ledger.record_success("k2", "otro", "1-8", "s", 8, 1600.0, {"document_annotation": "{}"})
+
+    chunk_ledger.release_responses("doc")
+
+    assert chunk_ledger.completed("k1") is None
+    assert chunk_ledger.completed("k2") is not None
+    assert len(chunk_ledger.latency_history()) == 2
+
+
+def test_prune_drops_stale_rows(chunk_ledger):
+    chunk_ledger.record_success("k", "doc", "1-8", "s", 8, 1600.0, {"document_annotation": "{}"})
+    chunk_ledger.max_age_seconds = 60
+    with chunk_ledger._conn:
+        chunk_ledger._conn.execute("UPDATE chunks SET updated_at = ?", (time.time() - 120,))
+
+    chunk_ledger.prune()
+
+    assert chunk_ledger.completed("k") is None
+
+
+def test_ledger_without_error_column_is_migrated(tmp_path):
+    path = str(tmp_path / "viejo.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE chunks (key TEXT PRIMARY KEY, document TEXT NOT NULL, "
+            "page_range TEXT NOT NULL, schema TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, pages INTEGER NOT NULL DEFAULT 0, "
+            "latency_ms REAL, response TEXT, updated_at REAL NOT NULL)"
+        )
+    conn.close()
+
+    ledger = ChunkLedger(path)
+
+    assert ledger.record_failure("k", "doc", "1-8", "s", 8, transient=False) == 1
+
+
+def test_read_only_ledger_reads_without_writing(chunk_ledger):
+    chunk_ledger.record_success("k", "doc", "1-8", "s", 8, 1600.0, {"document_annotation": "{}"})
+
+    reader = ChunkLedger(chunk_ledger.path, read_only=True)
+    assert reader.completed("k") == {"document_annotation": "{}"}
+    with pytest.raises(sqlite3.OperationalError):
+        reader.record_failure("k2", "doc", "1-8", "s", 8)
+
+
+def test_resume_without_cache_skips_completed_chunks(index_node, fake_ocr, blank_pdf):
+    index_node.ocr_cache = None
+    index_node.max_pages_per_chunk = 2
+    document = blank_pdf(6)
+    fails = {"first": True}
+
+    async def _second_chunk_fails_once(request: dict):
+        if len(fake.calls) == 2 and fails.pop("first", False):
+            raise RuntimeError("400 Bad Request")
+        return SimpleNamespace(document_annotation=None, pages=[])
+
+    fake = fake_ocr(_second_chunk_fails_once)
+    index_node.client.ocr = fake
+    stats: dict = {}
+    asyncio.run(index_node.process_document(document, Items, stats))
+    assert len(fake.calls) == 3
+    assert stats["chunks_failed"] == 1
+
+    # Los chunks con anotacion vacia tambien quedan completados
+    fake.calls.clear()
+    stats = {}
+    asyncio.run(index_node.process_document(document, Items, stats))
+    assert len(fake.calls) == 1
+    assert stats["pages_resumed"] == 4
+
+    # Documento completo: el registro libera las respuestas
+    rows = index_node.chunk_ledger._conn.execute(
+        "SELECT COUNT(*) FROM chunks WHERE response IS NOT NULL"
+    ).fetchone()
+    assert rows == (0,)
+
+
+def test_only_transient_failures_get_retry_rounds(index_node, fake_ocr, blank_pdf, monkeypatch):
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda delay, *args: real_sleep(0, *args))
+    index_node.chunk_retry_rounds = 2
+
+    class Rejected(Exception):
+        status_code = 400
+
+    class Unavailable(Exception):
+        status_code = 503
+
+    async def _reject(request: dict):
+        raise Rejected("schema invalido")
+
+    rejected = fake_ocr(_reject)
+    index_node.client.ocr = rejected
+    asyncio.run(index_node.process_document(blank_pdf(1), Items, {}))
+    assert len(rejected.calls) == 1
+
+    async def _unavailable_twice(request: dict):
+        if len(unavailable.calls) <= 2:
+            raise Unavailable("servicio no disponible")
+        return SimpleNamespace(document_annotation='{"items": [7]}', pages=[])
+
+    unavailable = fake_ocr(_unavailable_twice)
+    index_node.client.ocr = unavailable
+    stats: dict = {}
+    result = asyncio.run(index_node.process_document(blank_pdf(1), Items, stats))
+    assert len(unavailable.calls) == 3
+    assert "chunks_failed" not in stats
+    assert result[0]["document_annotation"] == '{"items": [7]}'
@@ -0,0 +1,179 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Optional
+
+from PIL import Image
+from pydantic import BaseModel
+
+from src.graph.state import FileDescriptor
+
+from src.utils.document_packing import (
+    PACK_FIELD_PREFIX,
+    build_packed_model,
+    plan_packs,
+    split_packed_annotation,
+)
+
+
+class Soporte(BaseModel):
+    nombre_archivo: Optional[str] = None
+    areas: list[float] = []
+
+
+def test_plan_packs_keeps_order_within_page_ceiling():
+    sizes = [("a", 3, 10), ("b", 4, 10), ("c", 2, 10), ("d", 8, 10), ("e", 1, 10)]
+
+    packs = plan_packs(sizes, max_pages=8)
+
+    assert packs == [["a", "b"], ["c"], ["d"], ["e"]]
+    assert [item for pack in packs for item in pack] == ["a", "b", "c", "d", "e"]
+
+
+def test_plan_packs_respects_byte_ceiling():
+    sizes = [("a", 1, 600), ("b", 1, 600), ("c", 1, 300)]
+
+    assert plan_packs(sizes, max_pages=8, max_bytes=1000) == [["a"], ["b", "c"]]
+
+
+def test_oversized_document_gets_its_own_pack():
+    assert plan_packs([("a", 12, 10), ("b", 1, 10)], max_pages=8) == [["a"], ["b"]]
+
+
+def test_packed_annotation_roundtrip():
+    documents = [
+        ("uno.pdf", Soporte(nombre_archivo="uno.pdf", areas=[1.0, 2.0])),
+        ("dos.pdf", None),
+        ("tres.pdf", Soporte(nombre_archivo="tres.pdf", areas=[3.0])),
+    ]
+    sections = [("uno.pdf", 1, 2), ("dos.pdf", 3, 3), ("tres.pdf", 4, 6)]
+    packed_model = build_packed_model(Soporte, sections)
+
+    fields = packed_model.model_fields
+    assert list(fields) == [f"{PACK_FIELD_PREFIX}{i}" for i in (1, 2, 3)]
+    assert "paginas 4-6" in fields[f"{PACK_FIELD_PREFIX}3"].description
+
+    # Lo que devolveria el OCR con el modelo empaquetado como document_annotation_format
+    annotation = packed_model(
+        **{f"{PACK_FIELD_PREFIX}{i}": model for i, (_, model) in enumerate(documents, start=1)}
+    ).model_dump_json()
+    results = split_packed_annotation({"document_annotation": annotation}, len(documents))
+
+    assert results[1] is None
+    for (_, model), result in zip(documents, results):
+        if model is not None:
+            assert Soporte.model_validate(result["document_annotation"]) == model
+
+
+def test_split_unreadable_annotation_fails_every_document():
+    class Respuesta:
+        document_annotation = "{roto"
+
+    assert split_packed_annotation(Respuesta(), 2) == [None, None]
+    assert split_packed_annotation({"document_annotation": json.dumps([1])}, 1) == [None]
+
+
+def _pack_run(index_node, documents) -> tuple[dict, list]:
+    """Empaqueta ``documents`` y devuelve las estadisticas y ``(respuestas, abierto)``."""
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        slots = {i: loop.create_future() for i in range(len(documents))}
+        stats: dict = {}
+        await index_node._pack_small_documents(documents, slots, Soporte, stats)
+        outcomes = [slot.result() for slot in slots.values()]
+        # Los documentos devueltos a la ruta individual siguen abiertos
+        for descriptor, (_, document) in zip(documents, outcomes):
+            if document is not None:
+                await index_node._close_document(descriptor, document)
+        return stats, [(responses, document is not None) for responses, document in outcomes]
+
+    return asyncio.run(_run())
+
+
+def test_cached_pack_counts_as_cached_pages(index_node, fake_ocr, blank_pdf):
+    documents = [blank_pdf(1), blank_pdf(2)]
+
+    async def _packed(request: dict):
+        annotation = {
+            f"{PACK_FIELD_PREFIX}{i}": {"nombre_archivo": document.name}
+            for i, document in enumerate(documents, start=1)
+        }
+        return SimpleNamespace(document_annotation=json.dumps(annotation), pages=[])
+
+    fake = fake_ocr(_packed)
+    index_node.client.ocr = fake
+
+    stats, outcomes = _pack_run(index_node, documents)
+    assert len(fake.calls) == 1
+    assert stats["pages_ocr"] == 3
+    assert stats["documents_packed"] == 2
+    assert "pages_cached" not in stats
+    assert [responses[0]["document_annotation"]["nombre_archivo"] for responses, _ in outcomes] == [
+        document.name for document in documents
+    ]
+
+    # Segunda corrida: el paquete sale de la cache y no es trabajo OCR
+    stats, outcomes = _pack_run(index_node, documents)
+    assert len(fake.calls) == 1
+    assert stats["pages_cached"] == 3
+    assert "pages_ocr" not in stats
+    assert outcomes[1][0][0]["document_annotation"]["nombre_archivo"] == documents[1].name
+
+
+def test_failed_pack_sends_documents_down_the_individual_path(index_node, fake_ocr, blank_pdf):
+    async def _reject(request: dict):
+        raise RuntimeError("400 Bad Request")
+
+    index_node.client.ocr = fake_ocr(_reject)
+
+    stats, outcomes = _pack_run(index_node, [blank_pdf(1), blank_pdf(1)])
+
+    assert stats == {}
+    assert outcomes == [(None, True), (None, True)]
+
+
+def _photo(tmp_path, name: str) -> FileDescriptor:
+    path = tmp_path / name
+    Image.new("RGB", (120, 160), "white").save(path)
+    return FileDescriptor(name=name, url=str(path), size=path.stat().st_size)
+
+
+def test_images_are_batched_even_without_document_packing(index_node, tmp_path, blank_pdf):
+    assert not index_node.pack_small_documents
+    documents = [_photo(tmp_path, "foto1.png"), blank_pdf(1), _photo(tmp_path, "foto2.jpg")]
+
+    assert index_node._packing_enabled(Soporte)
+    assert index_node._pack_candidates(documents, Soporte) == [0, 2]
+
+    index_node.pack_small_documents = True
+    assert index_node._pack_candidates(documents, Soporte) == [0, 1, 2]
+
+
+def test_images_go_one_by_one_in_shared_mode_or_without_model(index_node):
+    assert not index_node._packing_enabled(None)
+    index_node.shared_ocr = True
+    assert not index_node._packing_enabled(Soporte)
+
+
+def test_photos_share_one_ocr_request(index_node, fake_ocr, tmp_path):
+    photos = [_photo(tmp_path, "foto1.png"), _photo(tmp_path, "foto2.png")]
+
+    async def _packed(request: dict):
+        annotation = {
+            f"{PACK_FIELD_PREFIX}{i}": {"nombre_archivo": photo.name}
+            for i, photo in enumerate(photos, start=1)
+        }
+        return SimpleNamespace(document_annotation=json.dumps(annotation), pages=[])
+
+    fake = fake_ocr(_packed)
+    index_node.client.ocr = fake
+
+    stats, outcomes = _pack_run(index_node, photos)
+
+    assert len(fake.calls) == 1
+    assert stats["documents_packed"] == 2
+    assert [responses[0]["document_annotation"]["nombre_archivo"] for responses, _ in outcomes] == [
+        "foto1.png",
+        "foto2.png",
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import os
+
+import pytest
+
+from src.graph.dry_run import BYTES_PER_PAGE, _probe_document
+from src.graph.state import FileDescriptor
+
+
+class FakeSharePoint:
+    """Cliente SharePoint que solo responde metadatos; descargar es un error."""
+
+    def __init__(self, metadata: dict):
+        self.metadata = metadata
+
+    def get_item_metadata(self, reference: str):
+        return self.metadata
+
+    def download_file(self, *args, **kwargs):
+        raise AssertionError("el dry run no debe descargar documentos")
+
+
+def _item(size: int) -> dict:
+    return {
+        "id": "item-1",
+        "name": "bitacora.pdf",
+        "size": size,
+        "cTag": '"c:{E1},1"',
+        "parentReference": {"driveId": "drive-1"},
+    }
+
+
+@pytest.fixture
+def planner(index_node, sharepoint_mirror):
+    index_node.sharepoint_mirror = sharepoint_mirror
+    index_node.compression_enabled = True
+    index_node.compression_min_bytes = 0
+    return index_node
+
+
+def _sharepoint_descriptor() -> FileDescriptor:
+    return FileDescriptor(
+        name="bitacora.pdf",
+        url="https://contoso.sharepoint.com/sites/lab/bitacora.pdf",
+        source="sharepoint",
+    )
+
+
+def test_local_pdf_is_read_without_compressing(planner, blank_pdf, monkeypatch):
+    monkeypatch.setattr(planner, "_compress_document", None)
+
+    probe = asyncio.run(_probe_document(planner, blank_pdf(3)))
+
+    assert probe["pages"] == 3
+    assert probe["digest"] and not probe["estimated"]
+
+
+def test_sharepoint_pages_are_estimated_from_metadata(planner):
+    planner._sharepoint_client = FakeSharePoint(_item(BYTES_PER_PAGE * 9 + 1))
+
+    probe = asyncio.run(_probe_document(planner, _sharepoint_descriptor()))
+
+    assert probe["pages"] == 10
+    assert probe["estimated"] and probe["digest"] is None
+    assert [len(group) for group in probe["groups"]] == [8, 2]
+    assert os.listdir(planner.sharepoint_mirror.mirror_dir) == []
+
+
+def test_mirrored_sharepoint_copy_gives_exact_pages(planner, blank_pdf):
+    path = blank_pdf(2).url
+    with open(path, "rb") as fh:
+        content = fh.read()
+    item = _item(len(content))
+
+    def _copy(directory: str, name: str) -> str:
+        target = os.path.join(directory, name)
+        with open(target, "wb") as fh:
+            fh.write(content)
+        return target
+
+    planner.sharepoint_mirror.fetch(item, _copy)
+    planner._sharepoint_client = FakeSharePoint(item)
+
+    probe = asyncio.run(_probe_document(planner, _sharepoint_descriptor()))
+
+    assert probe["pages"] == 2
+    assert not probe["estimated"]
+
+
+def test_unknown_size_is_unreadable(planner):
+    descriptor = FileDescriptor(name="remoto.pdf", url="https://example.com/remoto.pdf")
+
+    with pytest.raises(ValueError):
+        asyncio.run(_probe_document(planner, descriptor))
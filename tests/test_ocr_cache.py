@@ -0,0 +1,81 @@
+import os
+import time
+
+from src.utils.ocr_cache import OCRResultCache
+
+
+def _age(cache: OCRResultCache, key: str, seconds: float) -> None:
+    stamp = time.time() - seconds
+    os.utime(cache._entry_path(key), (stamp, stamp))
+
+
+def test_put_then_get_roundtrip(ocr_cache, ocr_response):
+    key = OCRResultCache.build_key("doc", "schema", "1-8", "mistral-ocr-latest")
+
+    assert ocr_cache.get(key) is None
+    ocr_cache.put(key, ocr_response({"items": [1]}))
+
+    assert ocr_cache.get(key) == ocr_response({"items": [1]})
+
+
+def test_key_depends_on_pages_schema_and_model():
+    base = OCRResultCache.build_key("doc", "schema", "1-8", "ocr")
+    assert base != OCRResultCache.build_key("doc", "schema", "9-16", "ocr")
+    assert base != OCRResultCache.build_key("doc", "otro", "1-8", "ocr")
+    assert base != OCRResultCache.build_key("doc", "schema", "1-8", "otro")
+
+
+def test_expired_entry_is_dropped(ocr_cache, ocr_response):
+    ocr_cache.max_age_seconds = 60
+    ocr_cache.put("ab01", ocr_response({}))
+    _age(ocr_cache, "ab01", 120)
+
+    assert ocr_cache.get("ab01") is None
+    assert not os.path.exists(ocr_cache._entry_path("ab01"))
+
+
+def test_corrupt_entry_is_dropped(ocr_cache, ocr_response):
+    ocr_cache.put("ab02", ocr_response({}))
+    with open(ocr_cache._entry_path("ab02"), "w", encoding="utf-8") as fh:
+        fh.write("{")
+
+    assert ocr_cache.get("ab02") is None
+
+
+def test_eviction_trims_least_recently_used_below_limit(ocr_cache, ocr_response):
+    ocr_cache.max_age_seconds = 0
+    payload = ocr_response({"texto": "x" * 1000})
+    keys = [f"{i:02d}" + "0" * 62 for i in range(5)]
+    for offset, key in enumerate(keys):
+        ocr_cache.put(key, payload)
+        _age(ocr_cache, key, 100 - offset)
+    ocr_cache.max_bytes = os.path.getsize(ocr_cache._entry_path(keys[0])) * 5
+    # Leer la entrada mas antigua la vuelve la mas reciente
+    assert ocr_cache.get(keys[0]) is not None
+
+    ocr_cache.put("ff" + "0" * 62, payload)
+
+    remaining = [key for key in keys if os.path.exists(ocr_cache._entry_path(key))]
+    assert remaining == [keys[0], keys[3], keys[4]]
+
+
+def test_put_below_limit_does_not_walk_directory(ocr_cache, ocr_response, monkeypatch):
+    walks = []
+    monkeypatch.setattr(ocr_cache, "evict", lambda: walks.append(1))
+
+    for i in range(20):
+        ocr_cache.put(f"{i:064d}", ocr_response({}))
+
+    assert walks == []
+
+
+def test_read_only_cache_does_not_write(ocr_cache, ocr_response, tmp_path):
+    ocr_cache.put("ab03", ocr_response({}))
+    reader = OCRResultCache(cache_dir=ocr_cache.cache_dir, read_only=True)
+
+    assert reader.get("ab03") == ocr_response({})
+    reader.put("ab04", ocr_response({}))
+    assert ocr_cache.get("ab04") is None
+
+    OCRResultCache(cache_dir=str(tmp_path / "ausente"), read_only=True)
+    assert not os.path.exists(tmp_path / "ausente")
@@ -0,0 +1,142 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from src.graph.state import FileDescriptor
+from src.utils.ocr_planner import (
+    SharedOCRRuns,
+    SharedOCRWork,
+    build_ocr_plan,
+    shared_consumers,
+)
+
+
+class Items(BaseModel):
+    items: list[int] = []
+
+
+def test_plan_groups_documents_shared_by_sets():
+    plan = build_ocr_plan(
+        {
+            "Protocolo": [FileDescriptor(name="a.pdf"), FileDescriptor(name="b.pdf")],
+            "Set 7": [FileDescriptor(name="a.pdf"), FileDescriptor(name="")],
+        },
+        lambda descriptor: descriptor.name or None,
+    )
+
+    assert plan["a.pdf"].sets == ["Protocolo", "Set 7"]
+    assert shared_consumers(plan) == {"a.pdf": 2}
+
+
+def test_shared_document_is_loaded_once():
+    work = SharedOCRWork({"k": 2})
+    loads = []
+
+    async def _load():
+        loads.append(1)
+        await asyncio.sleep(0)
+        return "pdf"
+
+    async def _run():
+        return await asyncio.gather(
+            work.fetch_document("k", 2, _load), work.fetch_document("k", 2, _load)
+        )
+
+    assert asyncio.run(_run()) == ["pdf", "pdf"]
+    assert len(loads) == 1
+    work.release_document("k", 2)
+    work.release_document("k", 2)
+    assert work.metrics()["documents_held"] == 0
+
+
+def test_page_markdown_reports_own_and_reused_pages():
+    work = SharedOCRWork()
+    fetched = []
+
+    async def _fetch(pages):
+        fetched.append(pages)
+        return {page: f"pagina {page}" for page in pages}
+
+    async def _run():
+        first, second = {}, {}
+        await work.page_markdown("d", [0, 1], _fetch, first)
+        markdown = await work.page_markdown("d", [1, 2], _fetch, second)
+        return first, second, markdown
+
+    first, second, markdown = asyncio.run(_run())
+    assert fetched == [[0, 1], [2]]
+    assert first == {"pages_ocr": 2, "pages_reused": 0}
+    assert second == {"pages_ocr": 1, "pages_reused": 1}
+    assert markdown == {1: "pagina 1", 2: "pagina 2"}
+
+
+def test_failed_pages_can_be_claimed_again():
+    work = SharedOCRWork()
+
+    async def _fail(pages):
+        raise RuntimeError("503")
+
+    async def _fetch(pages):
+        return {page: "ok" for page in pages}
+
+    async def _run():
+        with pytest.raises(RuntimeError):
+            await work.page_markdown("d", [0], _fail)
+        report = {}
+        return await work.page_markdown("d", [0], _fetch, report), report
+
+    assert asyncio.run(_run()) == ({0: "ok"}, {"pages_ocr": 1, "pages_reused": 0})
+
+
+def test_runs_are_discarded_after_their_last_branch():
+    runs = SharedOCRRuns(max_runs=2)
+    work = runs.open("r1", 2, {"k": 2})
+
+    assert runs.open("r1", 2, None) is work
+    runs.close("r1")
+    assert runs.open("r1", 2, None) is work
+    runs.close("r1")
+    assert runs.open("r1", 1, None) is not work
+
+
+def test_oldest_run_is_evicted_past_the_limit():
+    runs = SharedOCRRuns(max_runs=2)
+    first = runs.open("r1", 1, None)
+    runs.open("r2", 1, None)
+    runs.open("r3", 1, None)
+
+    assert runs.open("r1", 1, None) is not first
+
+
+def test_shared_pages_count_once_on_the_owning_set(index_node, fake_ocr, blank_pdf):
+    index_node.shared_ocr = True
+    index_node.ocr_cache = None
+
+    async def _markdown(request: dict):
+        return SimpleNamespace(
+            document_annotation=None,
+            pages=[SimpleNamespace(index=0, markdown="hallazgo")],
+        )
+
+    async def _annotate(**request):
+        message = SimpleNamespace(content='{"items": [1]}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    ocr = fake_ocr(_markdown)
+    index_node.client.ocr = ocr
+    index_node.client.chat = SimpleNamespace(complete_async=_annotate)
+    document = blank_pdf(1)
+    shared = SharedOCRWork()
+
+    async def _run():
+        owner, reader = {}, {}
+        await index_node.process_document(document, Items, owner, shared=shared)
+        await index_node.process_document(document, Items, reader, shared=shared)
+        return owner, reader
+
+    owner, reader = asyncio.run(_run())
+    assert len(ocr.calls) == 1
+    assert owner["pages_ocr"] == 1 and owner["pages_reused"] == 0
+    assert reader["pages_ocr"] == 0 and reader["pages_reused"] == 1
@@ -0,0 +1,58 @@
+import json
+
+from src.utils.page_selector import (
+    PageRangeMemory,
+    normalize_text,
+    score_pages,
+    select_relevant_pages,
+)
+
+
+TEXT = "Tabla de resultados de linealidad con areas y concentraciones " * 5
+OTHER = "Informacion general del laboratorio y firmas de aprobacion " * 5
+
+
+def test_keywords_match_without_accents_or_case():
+    assert normalize_text("  Precisión   INTERMEDIA ") == "precision intermedia"
+    assert score_pages(["LINEALIDAD y linealidad", "nada"], ["Linealidad"]) == [2.0, 0.0]
+
+
+def test_hits_keep_their_neighbours():
+    pages = [OTHER, OTHER, TEXT, OTHER, OTHER, OTHER]
+
+    assert select_relevant_pages(pages, ["linealidad"], context=1) == [1, 2, 3]
+
+
+def test_no_hits_returns_none():
+    assert select_relevant_pages([OTHER, OTHER], ["exactitud"]) is None
+
+
+def test_learned_pages_count_as_hits():
+    assert select_relevant_pages([OTHER, OTHER, OTHER], [], learned_pages=[2], context=0) == [2]
+
+
+def test_scanned_pages_use_the_text_layer_threshold():
+    # 60 caracteres: escaneo con el umbral por defecto, texto con uno menor
+    short = "Encabezado de pagina escaneada con poco texto embebido abc"
+    pages = [TEXT, OTHER, short]
+
+    assert select_relevant_pages(pages, ["linealidad"], context=0) == [0, 2]
+    assert select_relevant_pages(pages, ["linealidad"], context=0, min_chars=20) == [0]
+
+
+def test_memory_persists_between_instances(tmp_path):
+    path = str(tmp_path / "memoria" / "paginas.json")
+    PageRangeMemory(path).record("Set 3", "abc", [4, 2, 4])
+
+    assert PageRangeMemory(path).get("Set 3", "abc") == [2, 4]
+    assert PageRangeMemory(path).get("Set 4", "abc") == []
+
+
+def test_unreadable_memory_starts_empty(tmp_path):
+    path = tmp_path / "paginas.json"
+    path.write_text("{roto", encoding="utf-8")
+    memory = PageRangeMemory(str(path))
+
+    assert memory.get("Set 3", "abc") == []
+    memory.record("Set 3", "abc", [1])
+    assert json.loads(path.read_text(encoding="utf-8")) == {"Set 3|abc": [1]}
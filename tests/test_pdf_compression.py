@@ -0,0 +1,69 @@
+import random
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+from PyPDF2 import PdfReader
+
+from src.utils.pdf_compression import CompressionProfile, _stream_length, compress_pdf
+
+
+@pytest.fixture
+def scanned_pdf() -> bytes:
+    """PDF de dos paginas A4 escaneadas a 300 dpi, como las que llegan de SharePoint."""
+    rng = random.Random(0)
+    pages = []
+    for _ in range(2):
+        image = Image.new("RGB", (2480, 3508), "white")
+        draw = ImageDraw.Draw(image)
+        for _ in range(4000):
+            shade = rng.randint(0, 255)
+            draw.point((rng.randint(0, 2479), rng.randint(0, 3507)), fill=(shade, shade, shade))
+        pages.append(image)
+    buffer = BytesIO()
+    pages[0].save(buffer, format="PDF", resolution=300, save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+def test_compress_pdf_rewrites_page_images(scanned_pdf):
+    profile = CompressionProfile(target_dpi=100, jpeg_quality=60, min_image_bytes=1024)
+
+    result = compress_pdf(scanned_pdf, profile)
+
+    assert result is not None
+    assert len(result) < len(scanned_pdf)
+    reader = PdfReader(BytesIO(result))
+    assert len(reader.pages) == 2
+    for page in reader.pages:
+        images = page.images
+        assert len(images) == 1
+        with Image.open(BytesIO(images[0].data)) as image:
+            assert image.size == (827, 1169)
+
+
+def test_compress_pdf_keeps_small_images(scanned_pdf):
+    profile = CompressionProfile(min_image_bytes=len(scanned_pdf))
+
+    assert compress_pdf(scanned_pdf, profile) is None
+
+
+def test_encoded_stream_length_reads_pypdf2_internals(scanned_pdf):
+    # Unico interno de PyPDF2 3.0.1 que se usa; si una version nueva lo quita, falla aqui
+    reader = PdfReader(BytesIO(scanned_pdf))
+    xobjects = reader.pages[0]["/Resources"]["/XObject"].get_object()
+    image = next(iter(xobjects.values())).get_object()
+
+    assert isinstance(image._data, bytes)
+    # DCTDecode no se decodifica: los bytes codificados son el JPEG completo
+    assert _stream_length(image) == len(image.get_data()) > 0
+
+
+def test_pypdf2_matches_the_pinned_version():
+    import PyPDF2
+
+    requirements = Path(__file__).resolve().parents[1] / "requirements.txt"
+    with open(requirements, encoding="utf-8") as fh:
+        pins = [line.strip() for line in fh if line.lower().startswith("pypdf2")]
+
+    assert pins == [f"PyPDF2=={PyPDF2.__version__}"]
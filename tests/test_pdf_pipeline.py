@@ -0,0 +1,119 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+
+from src.utils.pdf_pipeline import PdfDocument, format_page_label
+
+
+def _pdf(pages: int) -> bytes:
+    # El ancho de cada pagina identifica su posicion en el original
+    writer = PdfWriter()
+    for index in range(pages):
+        writer.add_blank_page(100 + index, 792)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _widths(data: bytes) -> list[int]:
+    return [int(page.mediabox.width) - 100 for page in PdfReader(BytesIO(data)).pages]
+
+
+GROUPS = [[0, 1, 2], [3, 4], [5], [6, 7, 8, 9]]
+
+
+def test_page_label():
+    assert format_page_label([0, 1, 2]) == "1-3"
+    assert format_page_label([2, 4, 8]) == "3,5,9"
+    assert format_page_label([]) == "none"
+
+
+def test_chunks_keep_the_requested_pages_in_order():
+    document = PdfDocument(_pdf(10))
+
+    chunks = document.build_chunks(GROUPS)
+
+    assert [chunk.pages for chunk in chunks] == [tuple(group) for group in GROUPS]
+    assert [_widths(chunk.data) for chunk in chunks] == GROUPS
+
+
+def test_single_group_covering_the_document_reuses_its_bytes():
+    data = _pdf(3)
+    document = PdfDocument(data, base64_payload="cmVjaWJpZG8=")
+
+    [chunk] = document.build_chunks([[0, 1, 2]])
+
+    assert chunk.data is data
+    assert chunk.to_base64() == "cmVjaWJpZG8="
+
+
+@pytest.mark.parametrize("processes, tasks", [(1, 1), (3, 2), (8, 4)])
+def test_process_pool_splits_in_batches_and_keeps_order(monkeypatch, processes, tasks):
+    monkeypatch.setattr("src.utils.pdf_pipeline.SPLIT_PROCESSES", processes)
+    document = PdfDocument(_pdf(10))
+    submitted = []
+
+    class RecordingPool(ProcessPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[1])
+            return super().submit(fn, *args, **kwargs)
+
+    with RecordingPool(max_workers=2) as pool:
+        chunks = document.build_chunks(GROUPS, process_pool=pool)
+
+    assert len(submitted) == tasks
+    assert [group for batch in submitted for group in batch] == GROUPS
+    assert [_widths(chunk.data) for chunk in chunks] == GROUPS
+
+
+def _scanned_pdf(image_sides: list[int]) -> bytes:
+    """Una pagina por imagen; el lado de cada imagen fija el peso de su pagina."""
+    images = [Image.effect_noise((side, side), 64).convert("RGB") for side in image_sides]
+    buffer = BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def test_page_byte_sizes_follow_the_page_images():
+    document = PdfDocument(_scanned_pdf([40, 400]))
+
+    light, heavy = document.page_byte_sizes()
+
+    assert 0 < light and heavy > 10 * light
+
+
+def test_blank_pages_weigh_nothing():
+    assert PdfDocument(_pdf(2)).page_byte_sizes() == [0, 0]
+
+
+def test_heavy_pages_close_chunks_early(index_node):
+    index_node.max_pages_per_chunk = 4
+    index_node.max_chunk_bytes = 1000
+
+    groups = index_node._chunk_page_groups(list(range(6)), [300, 300, 300, 1500, 100, 100])
+
+    # Una pagina mas pesada que el techo viaja sola
+    assert groups == [[0, 1, 2], [3], [4, 5]]
+
+
+def test_page_ceiling_applies_without_sizes(index_node):
+    index_node.max_pages_per_chunk = 4
+
+    assert index_node._chunk_page_groups(list(range(6))) == [[0, 1, 2, 3], [4, 5]]
+
+
+def test_small_documents_skip_byte_estimation(index_node, blank_pdf, monkeypatch):
+    document = PdfDocument.from_path(blank_pdf(3).url)
+    monkeypatch.setattr(document, "page_byte_sizes", None)
+    index_node.max_pages_per_chunk = 2
+
+    try:
+        groups = asyncio.run(index_node._plan_page_groups(document, [0, 1, 2]))
+    finally:
+        document.close()
+
+    assert groups == [[0, 1], [2]]
@@ -0,0 +1,125 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from src.utils.rate_governor import OCRRateGovernor, get_ocr_governor, is_transient
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+def test_throttle_halves_the_limit_once_per_window():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=8, default_backoff=0)
+
+    for _ in range(2):
+        assert governor._try_acquire() == 0
+    governor.release(status=429, ok=False)
+    # Varias llamadas concurrentes con 429 cuentan como una sola senal
+    governor.release(status=429, ok=False)
+
+    assert governor.limit == 4
+    assert governor.metrics()["throttled"] == 2
+
+
+def test_successes_recover_the_limit_additively():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=4, max_limit=5)
+
+    for _ in range(4):
+        governor._try_acquire()
+        governor.release()
+    assert 4.9 < governor.limit < 5
+
+    for _ in range(4):
+        governor._try_acquire()
+        governor.release()
+    assert governor.limit == 5
+
+
+def test_permanent_errors_do_not_shrink_the_limit():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=4)
+    governor._try_acquire()
+
+    governor.release(status=400, ok=False)
+
+    assert governor.limit == 4
+    assert governor.metrics()["failed"] == 1
+
+
+def test_retry_after_blocks_new_slots_until_it_expires():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=4)
+    governor._try_acquire()
+    governor.release(status=429, retry_after=0.05, ok=False)
+
+    assert governor.try_slot() is None
+    assert governor.metrics()["cooldown_remaining"] > 0
+
+    async def _acquire_after_cooldown():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with governor.async_slot():
+            return loop.time() - started
+
+    assert asyncio.run(_acquire_after_cooldown()) >= 0.04
+
+
+def test_release_wakes_a_waiter_without_polling():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=1)
+
+    async def _run():
+        await governor.acquire_async()
+        waiter = asyncio.create_task(governor.acquire_async())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert governor.metrics()["queue_depth"] == 1
+
+        # Liberado desde otro hilo, como un set que corre en su propio loop
+        await asyncio.to_thread(governor.release)
+        await asyncio.wait_for(waiter, timeout=1)
+        return governor.metrics()
+
+    metrics = asyncio.run(_run())
+    assert metrics["in_flight"] == 1
+    assert metrics["queue_depth"] == 0
+
+
+def test_cancelled_call_frees_its_slot_without_penalty():
+    governor = OCRRateGovernor(rate_per_second=0, initial_limit=2)
+
+    async def _run():
+        async with governor.async_slot():
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_run())
+    assert governor.limit == 2
+    assert governor.metrics()["in_flight"] == 0
+
+
+def test_transient_errors():
+    assert is_transient(Throttled())
+    assert is_transient(ConnectionError())
+    assert not is_transient(ValueError("schema invalido"))
+
+
+def test_each_endpoint_has_its_own_governor():
+    assert get_ocr_governor() is get_ocr_governor("ocr")
+    assert get_ocr_governor("chat") is not get_ocr_governor("ocr")
+
+
+def test_annotation_calls_do_not_use_the_ocr_governor(index_node):
+    class Items(BaseModel):
+        items: list[int] = []
+
+    async def _complete(**request):
+        message = SimpleNamespace(content='{"items": []}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    index_node.client.chat = SimpleNamespace(complete_async=_complete)
+
+    asyncio.run(index_node._annotate_markdown("texto", Items, "doc"))
+
+    assert index_node.chat_governor.metrics()["succeeded"] == 1
+    assert index_node.governor.metrics()["acquired"] == 0
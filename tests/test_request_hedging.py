@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.utils.request_hedging import HedgePolicy
+
+
+class FakeCall:
+    """Llamada remota simulada: ``behaviours[i]`` decide como responde la i-esima."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.started = 0
+        self.cancelled: list[int] = []
+
+    async def __call__(self):
+        index = self.started
+        self.started += 1
+        try:
+            return await self.behaviours[min(index, len(self.behaviours) - 1)](self)
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+
+
+async def _never(call: FakeCall):
+    await asyncio.Event().wait()
+
+
+async def _answer(call: FakeCall):
+    return f"respuesta {call.started}"
+
+
+async def _slow(call: FakeCall):
+    await asyncio.sleep(0.5)
+    return "lenta"
+
+
+def _policy(**kwargs) -> HedgePolicy:
+    # Historico minimo: cualquier llamada que no responda enseguida se duplica
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.01, **kwargs)
+    policy.record(0.0)
+    return policy
+
+
+def test_no_history_means_no_hedge():
+    policy = HedgePolicy(enabled=True, min_samples=5)
+    call = FakeCall(_answer)
+
+    assert asyncio.run(policy.run(call)) == "respuesta 1"
+    assert call.started == 1
+    assert policy.hedge_delay() is None
+
+
+def test_fast_primary_is_never_duplicated():
+    policy = _policy(budget=1.0)
+    call = FakeCall(_answer)
+
+    assert asyncio.run(policy.run(call)) == "respuesta 1"
+    assert call.started == 1
+    assert policy.metrics()["hedged"] == 0
+
+
+def test_hedge_wins_and_cancels_the_stuck_primary():
+    policy = _policy(budget=1.0)
+    call = FakeCall(_never, _answer)
+
+    assert asyncio.run(policy.run(call)) == "respuesta 2"
+    assert call.cancelled == [0]
+    assert policy.metrics()["hedge_wins"] == 1
+
+
+def test_primary_finishing_first_cancels_the_hedge():
+    policy = _policy(budget=1.0)
+    primary_done = None
+
+    async def _primary(call: FakeCall):
+        await primary_done.wait()
+        return "primaria"
+
+    async def _hedge(call: FakeCall):
+        # La copia arranco: la primaria responde antes que ella
+        primary_done.set()
+        await asyncio.Event().wait()
+
+    async def _run():
+        nonlocal primary_done
+        primary_done = asyncio.Event()
+        return await policy.run(call)
+
+    call = FakeCall(_primary, _hedge)
+    assert asyncio.run(_run()) == "primaria"
+    assert call.cancelled == [1]
+    assert policy.metrics()["hedge_wins"] == 0
+
+
+def test_failed_primary_falls_back_to_the_hedge():
+    policy = _policy(budget=1.0)
+
+    async def _fails_late(call: FakeCall):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("503")
+
+    call = FakeCall(_fails_late, _answer)
+
+    assert asyncio.run(policy.run(call)) == "respuesta 2"
+
+
+def test_both_failing_raises_the_earliest_error():
+    policy = _policy(budget=1.0)
+
+    async def _fails(call: FakeCall):
+        attempt = call.started
+        await asyncio.sleep(0.05 if attempt == 1 else 0)
+        raise RuntimeError(f"fallo {attempt}")
+
+    # La copia falla primero; su error es el que se propaga
+    with pytest.raises(RuntimeError, match="fallo 2"):
+        asyncio.run(policy.run(FakeCall(_fails)))
+
+
+def test_budget_caps_hedges_as_a_fraction_of_calls():
+    policy = _policy(budget=0.5, percentile=1)
+
+    async def _run():
+        for _ in range(4):
+            await policy.run(FakeCall(_slow, _answer))
+
+    asyncio.run(_run())
+    # 4 llamadas con presupuesto 0.5: solo la 2a y la 4a se duplican
+    assert policy.metrics()["calls"] == 4
+    assert policy.metrics()["hedged"] == 2
+
+
+def test_no_free_slot_means_no_hedge_and_no_budget_spent():
+    policy = _policy(budget=1.0)
+    call = FakeCall(_slow, _answer)
+
+    assert asyncio.run(policy.run(call, try_slot=lambda: None)) == "lenta"
+    assert call.started == 1
+    assert policy.metrics()["hedged"] == 0
+
+
+def test_hedge_runs_inside_the_granted_slot():
+    policy = _policy(budget=1.0)
+    held = []
+
+    @asynccontextmanager
+    async def _slot():
+        held.append("tomado")
+        yield
+        held.append("liberado")
+
+    call = FakeCall(_never, _answer)
+
+    assert asyncio.run(policy.run(call, try_slot=_slot)) == "respuesta 2"
+    assert held == ["tomado", "liberado"]
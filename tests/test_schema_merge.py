@@ -0,0 +1,148 @@
+from typing import ClassVar, Optional
+
+from pydantic import BaseModel
+
+from src.utils.schema_merge import SchemaMerger
+
+
+class Fila(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nivel", "replica")
+
+    nivel: Optional[str] = None
+    replica: Optional[int] = None
+    area: Optional[float] = None
+    concentracion: Optional[float] = None
+
+
+class Activo(BaseModel):
+    merge_keys: ClassVar[tuple[str, ...]] = ("nombre",)
+
+    nombre: Optional[str] = None
+    filas: list[Fila] = []
+    pendiente: Optional[float] = None
+
+
+class Extraccion(BaseModel):
+    activos: list[Activo] = []
+    notas: list[str] = []
+    lote: Optional[str] = None
+
+
+def test_merge_keys_stay_out_of_json_schema():
+    schema = Extraccion.model_json_schema()
+    assert "merge_keys" not in schema["$defs"]["Activo"]["properties"]
+    assert "merge_keys" not in schema["$defs"]["Fila"]["properties"]
+
+
+def test_keyed_rows_split_across_chunks_are_completed():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"activos": [{"nombre": "Acetaminofen", "filas": [
+        {"nivel": "N1", "replica": 1, "area": 10.0},
+        {"nivel": "N2", "replica": 1, "area": None},
+    ]}]})
+    merger.merge(data, {"activos": [{"nombre": "  ACETAMINOFEN ", "pendiente": 2.5, "filas": [
+        {"nivel": "n2", "replica": 1, "area": 20.0, "concentracion": 0.2},
+        {"nivel": "N3", "replica": 1, "area": 30.0},
+    ]}]})
+
+    assert len(data["activos"]) == 1
+    activo = data["activos"][0]
+    # La llave conserva la grafia del primer chunk
+    assert activo["nombre"] == "Acetaminofen"
+    assert activo["pendiente"] == 2.5
+    assert [(f["nivel"], f["area"]) for f in activo["filas"]] == [
+        ("N1", 10.0),
+        ("N2", 20.0),
+        ("N3", 30.0),
+    ]
+    assert activo["filas"][1]["concentracion"] == 0.2
+
+
+def test_none_never_overwrites_extracted_value():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"lote": "L-001"})
+    merger.merge(data, {"lote": None})
+
+    assert data["lote"] == "L-001"
+
+
+def test_unkeyed_rows_repeated_at_the_chunk_boundary_are_dropped():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"notas": ["a", "b", "c"]})
+    merger.merge(data, {"notas": ["b", "c", "d"]})
+
+    assert data["notas"] == ["a", "b", "c", "d"]
+
+
+def test_identical_unkeyed_rows_away_from_the_boundary_are_kept():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"notas": ["x", "y"]})
+    merger.merge(data, {"notas": ["z", "x", "y"]})
+
+    assert data["notas"] == ["x", "y", "z", "x", "y"]
+
+
+def test_replicate_readings_without_key_are_not_collapsed():
+    class Lectura(BaseModel):
+        valor: Optional[float] = None
+
+    class Corrida(BaseModel):
+        lecturas: list[Lectura] = []
+
+    merger = SchemaMerger(Corrida)
+    data: dict = {}
+    merger.merge(data, {"lecturas": [{"valor": 99.8}, {"valor": 100.1}]})
+    merger.merge(data, {"lecturas": [{"valor": 99.8}, {"valor": 99.9}]})
+
+    assert [row["valor"] for row in data["lecturas"]] == [99.8, 100.1, 99.8, 99.9]
+
+
+def test_rows_with_incomplete_key_are_not_merged():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"activos": [{"nombre": "A", "filas": [{"nivel": "N1", "area": 1.0}]}]})
+    merger.merge(data, {"activos": [{"nombre": "A", "filas": [{"nivel": "N1", "area": 2.0}]}]})
+
+    assert [f["area"] for f in data["activos"][0]["filas"]] == [1.0, 2.0]
+
+
+def test_repeated_rows_within_one_chunk_are_kept():
+    merger = SchemaMerger(Extraccion)
+    data: dict = {}
+    merger.merge(data, {"notas": ["x", "x"]})
+
+    assert data["notas"] == ["x", "x"]
+
+
+def test_set7_replicas_merge_by_key():
+    from src.config.models.set_7 import Set7ExtractionModel
+
+    merger = SchemaMerger(Set7ExtractionModel)
+    data: dict = {}
+    fila = {"replica": "1", "porcentaje_an1": 99.5, "porcentaje_an2": 99.5}
+    merger.merge(data, {"activos_precision_intermedia": [
+        {"nombre": "A", "precision_intermedia": [fila, {**fila, "replica": "2"}]}
+    ]})
+    merger.merge(data, {"activos_precision_intermedia": [
+        {"nombre": "A", "precision_intermedia": [{**fila, "replica": "3"}, fila]}
+    ]})
+
+    replicas = data["activos_precision_intermedia"][0]["precision_intermedia"]
+    assert [row["replica"] for row in replicas] == ["1", "2", "3"]
+
+
+def test_merger_without_model_keeps_rows_not_repeated_at_the_boundary():
+    merger = SchemaMerger()
+    data: dict = {}
+    merger.merge(data, {"activos": [{"nombre": "A", "pendiente": 1.0}]})
+    merger.merge(data, {"activos": [{"nombre": "A", "pendiente": 2.0}, {"nombre": "A", "pendiente": 1.0}]})
+
+    assert data["activos"] == [
+        {"nombre": "A", "pendiente": 1.0},
+        {"nombre": "A", "pendiente": 2.0},
+        {"nombre": "A", "pendiente": 1.0},
+    ]
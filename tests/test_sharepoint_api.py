@@ -0,0 +1,271 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.sharepoint_api import GRAPH_ROOT, SharePointClient, TTLCache
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(ttl_seconds=0.05)
+    cache.put("k", "v")
+
+    assert cache.get("k") == "v"
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = TTLCache(ttl_seconds=0)
+    cache.put("k", "v")
+
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entry_is_dropped_past_the_limit():
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    start = threading.Barrier(5)
+    results = []
+
+    def _load():
+        calls.append(1)
+        time.sleep(0.1)
+        return "sitio"
+
+    def _worker():
+        start.wait()
+        results.append(cache.get_or_load("site", _load))
+
+    threads = [threading.Thread(target=_worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["sitio"] * 5
+    assert len(calls) == 1
+    assert cache.misses == 1
+
+
+def test_failures_and_rejected_values_are_not_cached():
+    cache = TTLCache(ttl_seconds=60)
+
+    def _fail():
+        raise RuntimeError("503")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", _fail)
+    assert cache.get_or_load("k", lambda: [], cache_value=bool) == []
+    assert cache.get_or_load("k", lambda: ["drive"], cache_value=bool) == ["drive"]
+    assert cache.get("k") == ["drive"]
+
+
+def test_drive_listing_is_cached_per_site(sharepoint_client, http_response):
+    def _drives(method, url, kwargs):
+        return http_response(json_body={"value": [{"id": "d1", "name": "Documentos"}]})
+
+    client = sharepoint_client(_drives)
+
+    first = client.get_drive_id("site-1")
+    first[0]["name"] = "modificado"
+    second = client.get_drive_id("site-1")
+
+    assert second == [{"id": "d1", "name": "Documentos", "webUrl": ""}]
+    drive_calls = [url for _, url, _ in client.session.requests if url.endswith("/drives")]
+    assert len(drive_calls) == 1
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """Registra las esperas de ``graph_batch`` sin dormir."""
+    delays: list[float] = []
+    monkeypatch.setattr("src.utils.sharepoint_api.time.sleep", delays.append)
+    return delays
+
+
+def _batch_handler(http_response, answer):
+    """Handler de ``$batch``: ``answer(id, url)`` da (status, headers, body) por sub-solicitud."""
+    batches: list[list[str]] = []
+
+    def _handle(method, url, kwargs):
+        assert method == "POST" and url.endswith("/$batch")
+        entries = kwargs["json"]["requests"]
+        batches.append([entry["id"] for entry in entries])
+        responses = []
+        for entry in entries:
+            status, headers, body = answer(entry["id"], entry["url"])
+            responses.append({"id": entry["id"], "status": status, "headers": headers, "body": body})
+        return http_response(json_body={"responses": list(reversed(responses))})
+
+    return _handle, batches
+
+
+def test_batch_groups_twenty_requests_per_call_and_keeps_order(
+    sharepoint_client, http_response, no_sleep
+):
+    handler, batches = _batch_handler(http_response, lambda i, url: (200, {}, {"url": url}))
+    client = sharepoint_client(handler)
+
+    results = client.graph_batch([{"url": f"/items/{i}"} for i in range(25)])
+
+    assert [len(batch) for batch in batches] == [20, 5]
+    assert [result["body"]["url"] for result in results] == [f"/items/{i}" for i in range(25)]
+    assert no_sleep == []
+
+
+def test_throttled_sub_requests_are_retried_after_retry_after(
+    sharepoint_client, http_response, no_sleep
+):
+    throttled = {"3": 1, "7": 2}
+
+    def _answer(i, url):
+        if throttled.get(i):
+            throttled[i] -= 1
+            return 429, {"Retry-After": "4" if i == "7" else "2"}, {"error": "throttled"}
+        return 200, {}, {"id": i}
+
+    handler, batches = _batch_handler(http_response, _answer)
+    client = sharepoint_client(handler)
+
+    results = client.graph_batch([{"url": f"/items/{i}"} for i in range(10)])
+
+    # Solo se reenvian las sub-solicitudes con 429, tras el mayor Retry-After de la ronda
+    assert batches[1:] == [["3", "7"], ["7"]]
+    assert no_sleep == [4.0, 4.0]
+    assert all(result["status"] == 200 for result in results)
+
+
+def test_persistent_throttling_gives_up_after_max_rounds(
+    sharepoint_client, http_response, no_sleep
+):
+    handler, batches = _batch_handler(http_response, lambda i, url: (503, {}, {}))
+    client = sharepoint_client(handler)
+
+    [result] = client.graph_batch([{"url": "/items/1"}], max_rounds=2)
+
+    assert len(batches) == 3
+    assert no_sleep == [1.0, 1.0]
+    assert result["status"] == 503
+
+
+def test_failed_batch_call_marks_every_sub_request(sharepoint_client, http_response, no_sleep):
+    client = sharepoint_client(
+        lambda method, url, kwargs: http_response(400, json_body={"error": "invalid"})
+    )
+
+    results = client.graph_batch([{"url": "/items/1"}, {"url": "/items/2"}])
+
+    assert [result["status"] for result in results] == [400, 400]
+    assert results[0]["body"] == {"error": "invalid"}
+
+
+def test_batch_entries_are_relative_and_carry_json_bodies():
+    entry = SharePointClient._batch_entry(
+        4, {"url": f"{GRAPH_ROOT}/sites/s", "method": "patch", "body": {"name": "x"}}
+    )
+
+    assert entry == {
+        "id": "4",
+        "method": "PATCH",
+        "url": "/sites/s",
+        "body": {"name": "x"},
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+def test_expired_token_is_refreshed_once(sharepoint_client, http_response):
+    seen: list[str] = []
+
+    def _handler(method, url, kwargs):
+        seen.append(kwargs["headers"]["Authorization"])
+        return http_response(401 if len(seen) == 1 else 200, json_body={})
+
+    client = sharepoint_client(_handler)
+
+    assert client._graph_request("get", "https://graph.microsoft.com/v1.0/me").status_code == 200
+    assert len(seen) == 2
+    logins = [url for _, url, _ in client.session.requests if "login" in url]
+    assert len(logins) == 2
+
+
+TREE = {
+    "root-folder": [
+        {"id": "f1", "name": "protocolo.pdf", "file": {}, "size": 5},
+        {"id": "sub", "name": "Soportes", "folder": {}},
+    ],
+    "sub": [
+        {"id": "f2", "name": "cromatograma.pdf", "file": {}, "size": 7},
+        {"id": "f3", "name": "roto.pdf", "file": {}, "size": 3},
+    ],
+}
+CONTENT = {"f1": b"%PDF1", "f2": b"%PDF-22", "f3": b""}
+
+
+def _drive_handler(http_response):
+    """Lista ``TREE`` por ``$batch`` y sirve el contenido desde la URL de descarga."""
+
+    def _answer(i, url):
+        folder = url.split("/items/")[1].split("/")[0]
+        items = [
+            {
+                **item,
+                "parentReference": {"path": f"/drive/root:/Lab/{folder}"},
+                **(
+                    {"@microsoft.graph.downloadUrl": f"https://download.example/{item['id']}"}
+                    if "file" in item
+                    else {}
+                ),
+            }
+            for item in TREE[folder]
+        ]
+        return 200, {}, {"value": items}
+
+    batch, _ = _batch_handler(http_response, _answer)
+
+    def _handle(method, url, kwargs):
+        if url.startswith("https://download.example/"):
+            item_id = url.rsplit("/", 1)[1]
+            if not CONTENT[item_id]:
+                return http_response(404)
+            return http_response(content=CONTENT[item_id])
+        return batch(method, url, kwargs)
+
+    return _handle
+
+
+def test_folder_tree_is_mirrored_in_parallel(sharepoint_client, http_response, tmp_path):
+    client = sharepoint_client(_drive_handler(http_response))
+
+    report = client.download_folder_parallel("s", "d", "root-folder", str(tmp_path), max_workers=4)
+
+    assert (tmp_path / "protocolo.pdf").read_bytes() == b"%PDF1"
+    assert (tmp_path / "Soportes" / "cromatograma.pdf").read_bytes() == b"%PDF-22"
+    assert report["files"] == 2
+    assert report["bytes"] == 12
+    assert report["failed"] == ["/Lab/sub/roto.pdf"]
+    # Un $batch por nivel del arbol
+    batches = [url for method, url, _ in client.session.requests if url.endswith("/$batch")]
+    assert len(batches) == 2
+
+
+def test_drive_paths_can_be_preserved(sharepoint_client, http_response, tmp_path):
+    client = sharepoint_client(_drive_handler(http_response))
+
+    client.download_folder_parallel(
+        "s", "d", "root-folder", str(tmp_path), preserve_drive_path=True
+    )
+
+    assert (tmp_path / "Lab" / "root-folder" / "protocolo.pdf").exists()
+    assert (tmp_path / "Lab" / "sub" / "cromatograma.pdf").exists()
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+
+CONTENT = b"%PDF-1.4 contenido"
+
+ITEM = {
+    "id": "item-1",
+    "name": "reporte.pdf",
+    "size": len(CONTENT),
+    "eTag": '"{E1},1"',
+    "cTag": '"c:{E1},1"',
+    "parentReference": {"driveId": "drive-1"},
+}
+
+
+def _download(directory: str, name: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as fh:
+        fh.write(CONTENT)
+    return path
+
+
+@pytest.fixture
+def mirror(sharepoint_mirror):
+    assert sharepoint_mirror.fetch(ITEM, _download) is not None
+    return sharepoint_mirror
+
+
+def test_lookup_returns_the_stored_copy(mirror):
+    path = mirror.lookup(ITEM)
+
+    assert path is not None
+    with open(path, "rb") as fh:
+        assert fh.read() == CONTENT
+
+
+def test_metadata_only_change_keeps_copy_when_ctag_matches(mirror):
+    # Renombrar el archivo cambia el eTag pero no el cTag
+    assert mirror.lookup({**ITEM, "eTag": '"{E1},2"', "name": "renombrado.pdf"}) is not None
+
+
+def test_content_change_invalidates_by_ctag(mirror):
+    assert mirror.lookup({**ITEM, "cTag": '"c:{E1},2"'}) is None
+
+
+def test_etag_decides_when_ctag_is_missing(mirror):
+    assert mirror.lookup({**ITEM, "cTag": None}) is not None
+    assert mirror.lookup({**ITEM, "cTag": None, "eTag": '"{E1},2"'}) is None
+
+
+def test_size_change_invalidates_copy(mirror):
+    assert mirror.lookup({**ITEM, "size": len(CONTENT) + 1}) is None
+
+
+def test_changed_item_is_downloaded_again(mirror):
+    changed = {**ITEM, "cTag": '"c:{E1},2"'}
+    calls = []
+
+    def _counting_download(directory: str, name: str) -> str:
+        calls.append(name)
+        return _download(directory, name)
+
+    assert mirror.fetch(ITEM, _counting_download) is not None
+    assert calls == []
+    assert mirror.fetch(changed, _counting_download) is not None
+    assert len(calls) == 1
+    assert mirror.lookup(changed) is not None
+    assert mirror.lookup(ITEM) is None
+
+
+def test_item_without_drive_id_is_not_mirrored(sharepoint_mirror):
+    orphan = {**ITEM, "parentReference": {}}
+
+    assert sharepoint_mirror.lookup(orphan) is None
+    assert sharepoint_mirror.fetch(orphan, _download) is None
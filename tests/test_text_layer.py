@@ -0,0 +1,94 @@
+import pytest
+
+from src.config.models.set_3 import Set3ExtractionModel
+from src.utils.text_layer import (
+    extract_from_text_layer,
+    extract_set3_linealidad,
+    has_usable_text,
+    parse_number,
+)
+
+
+def _report(analyte: str, slope: str = "1520.3") -> str:
+    """Seccion de linealidad tal como sale del texto embebido del reporte LIMS."""
+    return "\n".join(
+        [
+            f"Analyte: {analyte}",
+            "Level Concentration Response Response factor",
+            "Nivel 1 0.050 76.1 1522.0",
+            "Nivel 2 0.100 152.4 1524.0",
+            "Nivel 3 0,150 228,3 1522,0",
+            "RSD Response Factor: 0.08",
+            f"Slope: {slope}",
+            "Intercept: -0.12",
+            "Correlation coefficient (r): 0.9999",
+            "Determination coefficient (r2): 0.9998",
+            "Intercept as percentage of Y at 100%: -0.08",
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("1,234.5", 1234.5),
+        ("1.234,5", 1234.5),
+        ("0,150", 0.15),
+        ("1,500", 1500.0),
+        ("1,2,3", 123.0),
+        ("-2.5e-3", -0.0025),
+        ("12.", 12.0),
+        ("", None),
+        ("abc", None),
+    ],
+)
+def test_parse_number_handles_decimal_separators(raw, expected):
+    assert parse_number(raw) == expected
+
+
+def test_usable_text_needs_enough_alphanumerics():
+    assert has_usable_text("a" * 200)
+    assert not has_usable_text("a" * 50)
+    assert has_usable_text("a" * 50, min_chars=20)
+    assert not has_usable_text("a . " * 100)
+    assert not has_usable_text("")
+
+
+def test_linealidad_report_is_parsed_per_analyte():
+    pages = [(0, _report("Acetaminofen")), (1, _report("Cafeina", slope="980.5"))]
+
+    annotation, consumed = extract_set3_linealidad(pages)
+
+    assert consumed == [0, 1]
+    first, second = annotation["activos_linealidad"]
+    assert first["nombre"] == "Acetaminofen"
+    assert first["pendiente"] == 1520.3 and first["intercepto"] == -0.12
+    assert first["r"] == 0.9999 and first["r2"] == 0.9998
+    assert first["porcentaje_intercepto"] == -0.08
+    assert [row["concentracion"] for row in first["linealidad_sistema"]] == [0.05, 0.1, 0.15]
+    assert first["linealidad_sistema"][2]["area_pico"] == 228.3
+    assert second["nombre"] == "Cafeina" and second["pendiente"] == 980.5
+
+
+def test_incomplete_section_sends_the_document_to_ocr():
+    broken = _report("Acetaminofen").replace("Analyte: Acetaminofen\n", "")
+
+    assert extract_set3_linealidad([(0, broken)]) is None
+
+
+def test_pages_with_unread_linealidad_data_are_not_consumed():
+    pages = [(0, _report("Acetaminofen")), (1, "Anexo\nSlope del equipo en revision")]
+
+    _, consumed = extract_set3_linealidad(pages)
+
+    assert consumed == [0]
+
+
+def test_text_layer_only_applies_to_models_with_a_local_extractor():
+    page = _report("Acetaminofen") + "\n" + "Observaciones del analista " * 5
+
+    annotation, consumed = extract_from_text_layer([page, ""], Set3ExtractionModel)
+
+    assert consumed == [0]
+    assert Set3ExtractionModel(**annotation).activos_linealidad[0].nombre == "Acetaminofen"
+    assert extract_from_text_layer([page], None) is None